@@ -0,0 +1,124 @@
+"""
+Benchmark: JSON serialize time and bytes on the wire for /login and
+/api/get-conversations, with Flask's default provider vs the orjson
+provider, uncompressed and with gzip/brotli.
+
+Run from the repository root:
+
+    python benchmarks/bench_json.py [--profiles small typical huge] [--conversations 50] [--repeat 20]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+import umsApi  # noqa: E402
+from compression import compress, supported_encodings  # noqa: E402
+from json_provider import get_json_provider_class  # noqa: E402
+from server import format_student_data  # noqa: E402
+from ums_fixtures import PROFILES, build_fixtures  # noqa: E402
+
+
+def login_payload(profile):
+    """The /login response body for a student of the given profile"""
+    fixtures = build_fixtures(profile)
+
+    def d(name):
+        return json.loads(fixtures[name])["d"]
+
+    data = {
+        "student_info": umsApi.parse_student_basic_info(fixtures["GetStudentBasicInformation"]),
+        "result_page": umsApi.parse_result_page(fixtures["result_page"]),
+        "attendance": umsApi.parse_attendance(d("GetStudentCourses")),
+        "attendance_summary": umsApi.parse_attendance_summary(d("StudentAttendanceSummary")),
+        "student_messages": umsApi.parse_student_messages(d("GetStudentMessages")),
+        "contact_info": umsApi.parse_student_contact(d("GetStudentContactNo")),
+        "announcements": umsApi.parse_announcements(d("AnnouncementDetails")),
+        "assignments": umsApi.parse_assignments(fixtures["assignment_view_all"]),
+        "term_wise_marks": umsApi.parse_term_wise_marks(d("TermWiseMarks")),
+    }
+    formatted_data, _ = format_student_data(umsApi.build_output(data))
+    return {"success": True, "student_data": formatted_data}
+
+
+def conversations_payload(count):
+    """The /api/get-conversations response body for a user with count conversations"""
+    user = "12345678"
+    conversations = []
+    for index in range(count):
+        other = f"1{index:07d}"
+        conversation_id = "_".join(sorted([user, other]))
+        timestamp = 1735689600 + index * 37
+        conversations.append({
+            "conversation_id": conversation_id,
+            "other_user": other,
+            "latest_message": {
+                "id": f"6f1c2a4e-0000-4000-8000-{index:012d}",
+                "conversation_id": conversation_id,
+                "sender": other,
+                "recipient": user,
+                "text": "Hey, did you get the notes for the next CA? " * (1 + index % 3),
+                "timestamp": timestamp,
+                "read": index % 4 == 0,
+            },
+            "unread_count": index % 5,
+            "timestamp": timestamp,
+        })
+    return {"success": True, "conversations": conversations}
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def bench(label, payload, providers, repeat):
+    print(f"\n{label}")
+    print(f"{'provider':<22}{'serialize ms':>14}{'raw KB':>10}"
+          + "".join(f"{encoding + ' KB':>10}{encoding + ' ms':>10}" for encoding in supported_encodings()))
+    for name, provider in providers:
+        elapsed = best_of(lambda: provider.response(payload).get_data(), repeat)
+        body = provider.response(payload).get_data()
+        row = f"{name:<22}{elapsed * 1000:>14.2f}{len(body) / 1024:>10.1f}"
+        for encoding in supported_encodings():
+            compressed = compress(body, encoding)
+            compress_time = best_of(lambda: compress(body, encoding), max(1, repeat // 4))
+            row += f"{len(compressed) / 1024:>10.1f}{compress_time * 1000:>10.2f}"
+        print(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--profiles", nargs="+", choices=sorted(PROFILES), default=["small", "typical", "huge"])
+    parser.add_argument("--conversations", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    providers = [("flask default (json)", DefaultJSONProvider(app))]
+    fast_class = get_json_provider_class()
+    if fast_class is not DefaultJSONProvider:
+        providers.append((fast_class.__name__, fast_class(app)))
+    else:
+        print("orjson is not installed; only the default provider is measured")
+
+    for profile in args.profiles:
+        bench(f"/login ({profile} student)", login_payload(profile), providers, args.repeat)
+    for count in args.conversations:
+        bench(f"/api/get-conversations ({count} conversations)", conversations_payload(count), providers, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
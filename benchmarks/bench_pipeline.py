@@ -0,0 +1,157 @@
+"""
+Benchmark: per-extractor parse time and allocations, and end-to-end
+login_and_fetch_all_result latency against the local UMS stand-in.
+
+Run from the repository root:
+
+    python benchmarks/bench_pipeline.py [--profiles small typical huge] [--repeat 5] [--runs 10]
+        [--latency 0.05] [--fixtures DIR] [--parser lxml|html.parser]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from ums_fixtures import PROFILES, load_fixtures  # noqa: E402
+from ums_standin import start_standin  # noqa: E402
+
+REG_NO = "12345678"
+PASSWORD = "password"
+
+
+def extractor_cases(fixtures):
+    """(extractor name, fixture name, callable) for each umsApi extractor"""
+    import umsApi
+
+    def d(name):
+        return json.loads(fixtures[name])["d"]
+
+    courses, messages, contact = d("GetStudentCourses"), d("GetStudentMessages"), d("GetStudentContactNo")
+    announcements, summary, marks = d("AnnouncementDetails"), d("StudentAttendanceSummary"), d("TermWiseMarks")
+    return [
+        ("build_login_payload", "login_page",
+         lambda: umsApi.build_login_payload(fixtures["login_page"], REG_NO, PASSWORD)),
+        ("is_login_form", "dashboard", lambda: umsApi.is_login_form(fixtures["dashboard"])),
+        ("parse_result_page", "result_page", lambda: umsApi.parse_result_page(fixtures["result_page"])),
+        ("build_view_all_payload", "assignment_page",
+         lambda: umsApi.build_view_all_payload(fixtures["assignment_page"])),
+        ("parse_assignments", "assignment_view_all",
+         lambda: umsApi.parse_assignments(fixtures["assignment_view_all"])),
+        ("parse_attendance", "GetStudentCourses", lambda: umsApi.parse_attendance(courses)),
+        ("parse_student_messages", "GetStudentMessages", lambda: umsApi.parse_student_messages(messages)),
+        ("parse_student_contact", "GetStudentContactNo", lambda: umsApi.parse_student_contact(contact)),
+        ("parse_announcements", "AnnouncementDetails", lambda: umsApi.parse_announcements(announcements)),
+        ("parse_attendance_summary", "StudentAttendanceSummary",
+         lambda: umsApi.parse_attendance_summary(summary)),
+        ("parse_term_wise_marks", "TermWiseMarks", lambda: umsApi.parse_term_wise_marks(marks)),
+        ("parse_student_basic_info", "GetStudentBasicInformation",
+         lambda: umsApi.parse_student_basic_info(fixtures["GetStudentBasicInformation"])),
+    ]
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def allocations(fn):
+    """
+    Returns:
+        tuple: (peak traced memory in bytes, number of live blocks allocated)
+    """
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+        del result
+        return peak - baseline, blocks
+    finally:
+        tracemalloc.stop()
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def bench_extractors(fixtures, profile, repeat):
+    print(f"\n[{profile}] extractors")
+    print(f"{'extractor':<28}{'input':>10}{'best ms':>10}{'peak KB':>10}{'blocks':>9}")
+    for name, fixture, fn in extractor_cases(fixtures):
+        fn()  # warm up imports and parser caches
+        elapsed = best_of(fn, repeat)
+        peak, blocks = allocations(fn)
+        print(f"{name:<28}{len(fixtures[fixture]) / 1024:>8.1f}KB{elapsed * 1000:>10.2f}{peak / 1024:>10.1f}{blocks:>9}")
+
+
+def bench_end_to_end(server, profile, runs):
+    import umsApi
+
+    def run(cold):
+        if cold:
+            umsApi.SESSION_CACHE.clear()
+        start = time.perf_counter()
+        result = umsApi.login_and_fetch_all_result(REG_NO, PASSWORD)
+        elapsed = time.perf_counter() - start
+        if "error" in result:
+            raise SystemExit(f"Stand-in login failed for the {profile} profile")
+        return elapsed
+
+    print(f"\n[{profile}] login_and_fetch_all_result")
+    print(f"{'session':<28}{'runs':>10}{'median ms':>12}{'p95 ms':>10}{'max ms':>10}")
+    for label, cold in (("cold (login + fetch)", True), ("warm (cached session)", False)):
+        run(cold)
+        timings = [run(cold) for _ in range(runs)]
+        print(f"{label:<28}{runs:>10}{statistics.median(timings) * 1000:>12.1f}"
+              f"{percentile(timings, 0.95) * 1000:>10.1f}{max(timings) * 1000:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--profiles", nargs="+", choices=sorted(PROFILES), default=["small", "typical", "huge"])
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions per extractor (best is reported)")
+    parser.add_argument("--runs", type=int, default=10, help="End-to-end scrapes per profile and session mode")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated UMS latency per response, in seconds")
+    parser.add_argument("--fixtures", help="Directory of recorded (anonymized) responses to replay")
+    parser.add_argument("--parser", help="HTML parser backend (sets UMS_HTML_PARSER)")
+    args = parser.parse_args()
+
+    # umsApi reads its base URL and parser at import time, so start the
+    # stand-in and set the environment first
+    server = start_standin(args.profiles[0], fixtures_dir=args.fixtures, latency=args.latency, password=PASSWORD)
+    os.environ["UMS_BASE_URL"] = server.base_url
+    if args.parser:
+        os.environ["UMS_HTML_PARSER"] = args.parser
+
+    import umsApi
+    print(f"UMS stand-in at {server.base_url}, HTML parser: {umsApi.HTML_PARSER}, latency: {args.latency * 1000:.0f} ms")
+
+    try:
+        for profile in args.profiles:
+            fixtures = load_fixtures(args.fixtures, profile, REG_NO)
+            server.fixtures = fixtures
+            umsApi.SESSION_CACHE.clear()
+            bench_extractors(fixtures, profile, args.repeat)
+            bench_end_to_end(server, profile, args.runs)
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark: /api/search-users lookups with the in-memory search index vs the
+previous linear scan over every registration number.
+
+Run from the repository root:
+
+    python benchmarks/bench_search_index.py [--students 100000 250000] [--queries 2000]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_index import StudentSearchIndex  # noqa: E402
+
+FIRST_NAMES = ["Aarav", "Vivaan", "Aditya", "Ananya", "Diya", "Ishaan", "Kavya", "Rohan",
+               "Saanvi", "Arjun", "Meera", "Kabir", "Priya", "Rahul", "Sneha", "Harpreet"]
+LAST_NAMES = ["Sharma", "Verma", "Singh", "Kaur", "Gupta", "Mehta", "Reddy", "Nair",
+              "Iyer", "Das", "Bose", "Malhotra", "Chopra", "Joshi", "Patel", "Yadav"]
+
+
+def synthetic_rows(count, seed=0):
+    """Rows shaped like SupabaseHelper.get_student_search_rows output"""
+    rng = random.Random(seed)
+    rows, seen = [], set()
+    while len(rows) < count:
+        reg_no = f"{rng.choice((11, 12, 122, 123))}{rng.randint(0, 99999999):08d}"[:8]
+        if reg_no in seen:
+            continue
+        seen.add(reg_no)
+        rows.append({
+            "id": len(rows) + 1,
+            "registration_number": reg_no,
+            "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "program": "B.Tech. (CSE)",
+        })
+    return rows
+
+
+def legacy_search(reg_numbers, query, limit=10):
+    """The old endpoint's filter (minus its per-result Supabase lookups)"""
+    return [reg_no for reg_no in reg_numbers if query.lower() in reg_no.lower()][:limit]
+
+
+def sample_queries(rows, count, seed=1):
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        row = rng.choice(rows)
+        kind = rng.random()
+        if kind < 0.5:
+            queries.append(row["registration_number"][:rng.randint(3, 8)])  # prefix
+        elif kind < 0.8:
+            start = rng.randint(0, 4)
+            queries.append(row["registration_number"][start:start + rng.randint(3, 4)])  # infix
+        else:
+            name = row["name"].split()[rng.randint(0, 1)]
+            queries.append(name[:rng.randint(3, len(name))])  # name
+    return queries
+
+
+def timings_ms(fn, queries):
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return timings
+
+
+def report(label, timings):
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print(f"  {label:<24}{statistics.median(timings):>10.4f}{p99:>10.4f}{max(timings):>10.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--students", type=int, nargs="+", default=[100000, 250000])
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    for count in args.students:
+        rows = synthetic_rows(count)
+        queries = sample_queries(rows, args.queries)
+
+        start = time.perf_counter()
+        index = StudentSearchIndex(load_rows=lambda after_id: rows)
+        index.build()
+        build_seconds = time.perf_counter() - start
+
+        tracemalloc.start()
+        StudentSearchIndex(load_rows=lambda after_id: rows).build()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # Incremental refresh: new rows arrive after the build
+        extra = synthetic_rows(count + 1000, seed=0)[count:]
+        start = time.perf_counter()
+        index.add_rows(extra)
+        refresh_ms = (time.perf_counter() - start) * 1000
+
+        all_rows = rows + extra
+        for query in queries[:100]:
+            matches = {row["registration_number"] for row in all_rows
+                       if query.lower() in row["registration_number"] or query.lower() in row["name"].lower()}
+            found = [result["regNo"] for result in index.search(query)]
+            if not set(found) <= matches or len(found) != min(10, len(matches)):
+                raise SystemExit(f"Index results differ from a full scan for {query!r}")
+
+        reg_numbers = [row["registration_number"] for row in rows]
+        print(f"\n{count} students: build {build_seconds:.2f} s, peak {peak / 2 ** 20:.0f} MiB, "
+              f"{len(index._grams)} trigrams, 1000-row refresh {refresh_ms:.1f} ms")
+        print(f"  {'lookup':<24}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        report("index.search (cold)", timings_ms(index.search, queries))
+        report("index.search (warm)", timings_ms(index.search, queries))
+        report("linear scan (legacy)", timings_ms(lambda q: legacy_search(reg_numbers, q), queries[:200]))
+
+
+if __name__ == "__main__":
+    main()
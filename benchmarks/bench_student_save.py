@@ -0,0 +1,191 @@
+"""
+Benchmark: SupabaseHelper.save_student_login with the single round-trip
+upsert/RPC path vs the legacy SELECT-then-UPDATE/INSERT flow.
+
+Runs against an in-memory stand-in for the student_logins table that sleeps
+for a simulated network round trip on every request and implements the
+save_student_login function from supabase/save_student_login.sql, so the
+stored rows of both flows can be compared as well as their latency.
+
+Run from the repository root:
+
+    python benchmarks/bench_student_save.py [--latency-ms 5 20 50] [--saves 50]
+"""
+import argparse
+import copy
+import os
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from supabase_helper import SupabaseHelper  # noqa: E402
+
+PLACEHOLDER_NAME = "Not logged in yet"
+EMPTY_CONTACT = {"contactNumber": "", "isVerified": ""}
+
+
+class FakeQuery:
+    def __init__(self, table, action, payload=None):
+        self.table = table
+        self.action = action
+        self.payload = payload
+        self.filters = {}
+
+    def eq(self, column, value):
+        self.filters[column] = value
+        return self
+
+    def execute(self):
+        return self.table.client.round_trip(lambda: self.table.run(self))
+
+
+class FakeTable:
+    def __init__(self, client, rows):
+        self.client = client
+        self.rows = rows
+
+    def select(self, columns):
+        return FakeQuery(self, "select")
+
+    def update(self, values):
+        return FakeQuery(self, "update", values)
+
+    def insert(self, values):
+        return FakeQuery(self, "insert", values)
+
+    def upsert(self, values, on_conflict=None):
+        assert on_conflict == "registration_number"
+        return FakeQuery(self, "upsert", values)
+
+    def run(self, query):
+        reg_no = query.filters.get("registration_number")
+        if query.action == "select":
+            row = self.rows.get(reg_no)
+            return [copy.deepcopy(row)] if row else []
+        if query.action == "update":
+            if reg_no in self.rows:
+                self.rows[reg_no].update(copy.deepcopy(query.payload))
+            return [copy.deepcopy(self.rows.get(reg_no))]
+        if query.action == "insert" and query.payload["registration_number"] in self.rows:
+            raise RuntimeError("duplicate key value violates unique constraint")
+        row = copy.deepcopy(query.payload)
+        self.rows.setdefault(row["registration_number"], {"id": len(self.rows) + 1}).update(row)
+        return [copy.deepcopy(self.rows[row["registration_number"]])]
+
+
+class FakeSupabase:
+    """The parts of the supabase client that save_student_login uses"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.rows = {}
+        self.round_trips = 0
+
+    def round_trip(self, fn):
+        self.round_trips += 1
+        time.sleep(self.latency)
+        return SimpleNamespace(data=fn())
+
+    def table(self, name):
+        assert name == "student_logins"
+        return FakeTable(self, self.rows)
+
+    def rpc(self, name, params):
+        assert name == "save_student_login"
+        return SimpleNamespace(execute=lambda: self.round_trip(lambda: self.save_student_login(**params)))
+
+    def save_student_login(self, p_registration_number, p_password, p_student_info):
+        """Python rendering of the SQL function"""
+        existing = self.rows.get(p_registration_number)
+        if existing is None:
+            info = p_student_info or {
+                "studentName": PLACEHOLDER_NAME, "regNo": p_registration_number, "program": "N/A",
+                "section": "N/A", "cgpa": "N/A", "contactInfo": dict(EMPTY_CONTACT),
+            }
+            existing = self.rows[p_registration_number] = {
+                "id": len(self.rows) + 1, "registration_number": p_registration_number,
+            }
+        elif not p_student_info:
+            info = existing["student_info"]
+        else:
+            old = existing["student_info"] or {}
+            info = dict(p_student_info)
+            if info.get("studentName") == PLACEHOLDER_NAME and (old.get("studentName") or PLACEHOLDER_NAME) != PLACEHOLDER_NAME:
+                info["studentName"] = old["studentName"]
+            if "contactInfo" not in info:
+                info["contactInfo"] = old.get("contactInfo", dict(EMPTY_CONTACT))
+        existing.update(password=p_password, student_info=copy.deepcopy(info))
+        return [copy.deepcopy(existing)]
+
+
+def helper(client, single_round_trip):
+    with mock.patch("supabase_helper.create_client", lambda url, key: client):
+        instance = SupabaseHelper()
+    instance.upsert_enabled = instance.rpc_enabled = single_round_trip
+    return instance
+
+
+def student(reg_no, name="Aarav Sharma", contact=True):
+    data = {"cgpa": "8.1", "regNo": reg_no, "program": "B.Tech. (CSE)", "section": "K21AB", "studentName": name}
+    if contact:
+        data["contactInfo"] = {"isVerified": "Y", "contactNumber": "98xxxxxx01"}
+    return data
+
+
+# (label, [(reg_no, student_data or None), ...]) saves applied in order to a fresh table
+SCENARIOS = [
+    ("first login", [("12100001", student("12100001"))]),
+    ("returning login", [("12100001", student("12100001")), ("12100001", student("12100001"))]),
+    ("password-only save", [("12100001", student("12100001")), ("12100001", {})]),
+    ("placeholder name", [("12100001", student("12100001")), ("12100001", student("12100001", PLACEHOLDER_NAME))]),
+    ("no contact info", [("12100001", student("12100001")), ("12100001", student("12100001", contact=False))]),
+    ("new placeholder", [("12100001", None)]),
+]
+
+
+def run_scenario(saves, latency, single_round_trip):
+    """Returns (stored rows, round trips and seconds of the last save)"""
+    client = FakeSupabase(latency)
+    instance = helper(client, single_round_trip)
+    for reg_no, data in saves[:-1]:
+        instance.save_student_login(reg_no, "secret", copy.deepcopy(data))
+    reg_no, data = saves[-1]
+    client.round_trips = 0
+    start = time.perf_counter()
+    instance.save_student_login(reg_no, "secret", copy.deepcopy(data))
+    return client.rows, client.round_trips, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency-ms", type=float, nargs="+", default=[5, 20, 50])
+    parser.add_argument("--saves", type=int, default=50)
+    args = parser.parse_args()
+
+    for label, saves in SCENARIOS:
+        legacy_rows = run_scenario(saves, 0, False)[0]
+        upsert_rows = run_scenario(saves, 0, True)[0]
+        for row in legacy_rows.values():
+            # The legacy insert path does not add regNo to new records
+            if row["student_info"]:
+                row["student_info"].setdefault("regNo", row["registration_number"])
+        if legacy_rows != upsert_rows:
+            raise SystemExit(f"Stored rows differ for {label!r}:\n{legacy_rows}\n{upsert_rows}")
+
+    for latency_ms in args.latency_ms:
+        print(f"\n{latency_ms:g} ms per round trip")
+        print(f"  {'scenario':<22}{'legacy trips':>14}{'legacy ms':>12}{'upsert trips':>14}{'upsert ms':>12}")
+        for label, saves in SCENARIOS:
+            row = []
+            for single_round_trip in (False, True):
+                runs = [run_scenario(saves, latency_ms / 1000, single_round_trip) for _ in range(args.saves)]
+                row += [runs[0][1], statistics.median(seconds for _, _, seconds in runs) * 1000]
+            print(f"  {label:<22}{row[0]:>14}{row[1]:>12.1f}{row[2]:>14}{row[3]:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
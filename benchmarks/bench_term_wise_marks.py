@@ -0,0 +1,118 @@
+"""
+Benchmark: indexed single-pass term-wise marks extractor vs the previous
+search-per-term implementation.
+
+Run from the repository root:
+
+    python benchmarks/bench_term_wise_marks.py [--terms 4 8 16 32] [--repeat 5]
+"""
+import argparse
+import html
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from umsApi import NESTING_HTML_PARSER, make_soup, parse_term_wise_marks  # noqa: E402
+
+
+def legacy_parse_term_wise_marks(html_content):
+    """The extractor as it was before indexing (kept here for comparison only)"""
+    html_content = html.unescape(html_content)
+    soup = make_soup(html_content, NESTING_HTML_PARSER)
+    term_wise_marks = []
+
+    def collect(collapse_div, term_id):
+        term_data = {"term_id": term_id, "courses": []}
+        for course_section in collapse_div.find_all('h4'):
+            course_name = course_section.get_text(strip=True)
+            table = course_section.find_next('table')
+            if not table:
+                continue
+            course_data = {"course_name": course_name, "components": []}
+            for row in table.find_all('tr'):
+                cells = row.find_all('td')
+                if len(cells) >= 3:
+                    course_data["components"].append({
+                        "type": cells[0].get_text(strip=True),
+                        "marks": cells[1].get_text(strip=True),
+                        "weightage": cells[2].get_text(strip=True)
+                    })
+            if course_data["components"]:
+                term_data["courses"].append(course_data)
+        if term_data["courses"]:
+            term_wise_marks.append(term_data)
+
+    for section in soup.find_all('a', {'class': 'btn btn-link collapsed text-left'}):
+        term_id_match = re.search(r'Term Id : (\d+)', section.get_text(strip=True))
+        term_id = term_id_match.group(1) if term_id_match else "Unknown"
+        collapse_id = section.get('data-target', '')
+        if not collapse_id:
+            continue
+        collapse_div = soup.find('div', {'id': collapse_id.replace('#', '')})
+        if collapse_div:
+            collect(collapse_div, term_id)
+
+    if not term_wise_marks:
+        for term_id in re.findall(r'collapse(\d+)', html_content):
+            term_section = soup.find('div', {'id': f'collapse{term_id}'})
+            if term_section:
+                collect(term_section, term_id)
+
+    return term_wise_marks
+
+
+def build_page(terms, courses_per_term=8, components_per_course=6, anchor_class="btn btn-link collapsed text-left"):
+    """Synthetic TermWiseMarks payload shaped like the UMS accordion"""
+    parts = ['<div class="accordion" id="accordion">']
+    for term in range(terms):
+        term_id = 11900 + term
+        parts.append(
+            f'<div class="card"><div class="card-header"><h2 class="mb-0">'
+            f'<a class="{anchor_class}" data-toggle="collapse" data-target="#collapse{term_id}">'
+            f'Term Id : {term_id}</a></h2></div>'
+            f'<div id="collapse{term_id}" class="collapse" data-parent="#accordion"><div class="card-body">'
+        )
+        for course in range(courses_per_term):
+            parts.append(f'<h4>CSE{term:02d}{course:02d} :: Course {course}</h4>')
+            parts.append('<table class="table"><tr><th>Type</th><th>Marks</th><th>Weightage</th></tr>')
+            for component in range(components_per_course):
+                parts.append(f'<tr><td>CA {component}</td><td>{component * 3}/30</td><td>{5 + component}</td></tr>')
+            parts.append('</table>')
+        parts.append('</div></div></div>')
+    parts.append('</div>')
+    return "".join(parts)
+
+
+def best_of(fn, payload, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(payload)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--terms", type=int, nargs="+", default=[4, 8, 16, 32])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'page':<22}{'size':>10}{'legacy ms':>12}{'indexed ms':>12}{'speedup':>10}")
+    for layout, anchor_class in (("accordion", "btn btn-link collapsed text-left"), ("fallback", "btn btn-link")):
+        for terms in args.terms:
+            payload = build_page(terms, anchor_class=anchor_class)
+            if legacy_parse_term_wise_marks(payload) != parse_term_wise_marks(payload):
+                raise SystemExit(f"Output mismatch for {layout} page with {terms} terms")
+
+            legacy = best_of(legacy_parse_term_wise_marks, payload, args.repeat)
+            indexed = best_of(parse_term_wise_marks, payload, args.repeat)
+            label = f"{layout} {terms} terms"
+            print(f"{label:<22}{len(payload) // 1024:>8}KB{legacy * 1000:>12.1f}{indexed * 1000:>12.1f}{legacy / indexed:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Anonymized UMS responses for the stand-in server and the benchmarks.
+
+Each profile reproduces the markup UMS serves for every endpoint umsApi.py
+calls, with synthetic names, numbers and text in place of student data and
+sized like a small, a typical and a huge student record.
+
+Real captures can be replayed instead: save them (anonymized) into a
+directory as <fixture name>.html / <fixture name>.json, using the names in
+FIXTURE_NAMES, and pass the directory to load_fixtures(). Missing files fall
+back to the synthetic profile.
+"""
+import json
+import os
+import random
+
+PROFILES = {
+    "small": {"terms": 1, "courses": 4, "components": 3, "messages": 2,
+              "announcements": 3, "assignments": 2, "viewstate_kb": 8},
+    "typical": {"terms": 6, "courses": 7, "components": 5, "messages": 20,
+                "announcements": 30, "assignments": 15, "viewstate_kb": 48},
+    "huge": {"terms": 12, "courses": 10, "components": 8, "messages": 200,
+             "announcements": 300, "assignments": 100, "viewstate_kb": 160},
+}
+
+# Fixture name -> endpoint it answers (paths are relative to UMS_BASE_URL)
+FIXTURE_NAMES = {
+    "login_page": "GET  /",
+    "login_failed": "POST / (wrong password)",
+    "dashboard": "POST / (logged in), GET StudentDashboard.aspx",
+    "result_page": "GET  frmStudentResult.aspx",
+    "assignment_page": "GET  frmstudentdownloadassignment.aspx",
+    "assignment_view_all": "POST frmstudentdownloadassignment.aspx",
+    "GetStudentBasicInformation": "POST StudentDashboard.aspx/GetStudentBasicInformation",
+    "GetStudentCourses": "POST StudentDashboard.aspx/GetStudentCourses",
+    "GetStudentMessages": "POST StudentDashboard.aspx/GetStudentMessages",
+    "GetStudentContactNo": "POST StudentDashboard.aspx/GetStudentContactNo",
+    "AnnouncementDetails": "POST StudentDashboard.aspx/AnnouncementDetails",
+    "StudentAttendanceSummary": "POST StudentDashboard.aspx/StudentAttendanceSummary",
+    "TermWiseMarks": "POST StudentDashboard.aspx/TermWiseMarks",
+}
+
+WORDS = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+         "incididunt ut labore et dolore magna aliqua enim ad minim veniam quis nostrud").split()
+GRADES = ("O", "A+", "A", "B+", "B", "C", "D")
+
+
+def _sentence(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _viewstate(rng, kb):
+    alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+    return "".join(rng.choice(alphabet) for _ in range(kb * 1024))
+
+
+def _hidden(name, value):
+    return f'<input type="hidden" name="{name}" id="{name}" value="{value}" />'
+
+
+def _page(title, body, viewstate):
+    return (
+        '<!DOCTYPE html><html xmlns="http://www.w3.org/1999/xhtml"><head>'
+        f'<title>{title}</title><link href="css/bootstrap.min.css" rel="stylesheet" />'
+        '<script src="js/jquery.min.js"></script></head><body>'
+        '<form method="post" id="form1">'
+        + _hidden("__VIEWSTATE", viewstate)
+        + _hidden("__VIEWSTATEGENERATOR", "C2EE9ABB")
+        + _hidden("__EVENTVALIDATION", viewstate[:512])
+        + body
+        + '</form></body></html>'
+    )
+
+
+def _courses(profile):
+    return [f"CSE{300 + i}" for i in range(profile["courses"])]
+
+
+def login_page(rng, profile):
+    body = (
+        '<div class="login-box"><div class="form-group">'
+        '<input name="txtU" type="text" id="txtU" class="form-control" placeholder="Username" />'
+        '<input name="TxtpwdAutoId_8767" type="password" id="TxtpwdAutoId_8767" class="form-control" />'
+        '<input type="submit" name="iBtnLogins150203125" value="Login" id="iBtnLogins150203125" />'
+        '</div></div>'
+    )
+    return _page("Login", body, _viewstate(rng, profile["viewstate_kb"]))
+
+
+def dashboard(rng, profile):
+    body = '<div class="dashboard">' + "".join(
+        f'<div class="card"><p>{_sentence(rng, 12)}</p></div>' for _ in range(20)) + '</div>'
+    return _page("Student Dashboard", body, _viewstate(rng, profile["viewstate_kb"] // 4))
+
+
+def result_page(rng, profile):
+    rows = []
+    for term in range(profile["terms"]):
+        rows.append(f'<tr><td colspan="6"><p>TermId: {11900 + term}; TGPA: {rng.uniform(6, 10):.2f}</p></td></tr>')
+        for index, course in enumerate(_courses(profile)):
+            css = "rgRow" if index % 2 == 0 else "rgAltRow"
+            rows.append(
+                f'<tr class="{css}"><td>{index + 1}</td><td>{11900 + term}</td>'
+                f'<td>{course}{term}::{_sentence(rng, 3)}</td><td>{rng.choice((2, 3, 4))}</td>'
+                f'<td>{rng.choice(GRADES)}</td><td></td></tr>'
+            )
+    body = ('<table class="rgMasterTable" id="ctl00_cphHeading_rgResult_ctl00">'
+            + "".join(rows) + '</table>')
+    return _page("Student Result", body, _viewstate(rng, profile["viewstate_kb"] // 2))
+
+
+def assignment_page(rng, profile, view_all=False):
+    theory, practical = [], []
+    count = profile["assignments"] if view_all else min(profile["assignments"], 5)
+    for index in range(count):
+        css = "rgRow" if index % 2 == 0 else "rgAltRow"
+        course = f"CSE{300 + index % profile['courses']}"
+        cells = [str(index + 1), course] + [_sentence(rng, 2) for _ in range(7)] + [str(rng.randint(0, 30)), "30"]
+        theory.append(f'<tr class="{css}">' + "".join(f"<td>{cell}</td>" for cell in cells) + '</tr>')
+        cells = [str(index + 1), course] + [str(rng.randint(0, 10)) for _ in range(14)] + [str(rng.randint(0, 100)), "100"]
+        practical.append(f'<tr class="{css}">' + "".join(f"<td>{cell}</td>" for cell in cells) + '</tr>')
+    body = (
+        '<input type="submit" name="ctl00$cphHeading$Button1" value="View All" />'
+        '<table id="ctl00_cphHeading_rgAssignment_ctl00" class="rgMasterTable">' + "".join(theory) + '</table>'
+        '<table id="ctl00_cphHeading_gvPracticalComponent_ctl00" class="rgMasterTable">' + "".join(practical) + '</table>'
+    )
+    return _page("Assignments", body, _viewstate(rng, profile["viewstate_kb"] // 2))
+
+
+def student_courses(rng, profile):
+    return "".join(
+        f'<div class="col-md-4 mycoursesdiv"><div class="c100 p{percent}"><span>{percent}%</span></div>'
+        f'<p class="font-weight-medium mb-0">{course} :: {_sentence(rng, 3)}</p></div>'
+        for course, percent in ((course, rng.randint(50, 100)) for course in _courses(profile))
+    )
+
+
+def student_messages(rng, profile):
+    return "".join(
+        f'<div class="mycoursesdiv"><p class="font-weight-medium">{_sentence(rng, 4)}</p>'
+        f'<p class="text-small text-muted">{_sentence(rng, 30)}</p></div>'
+        for _ in range(profile["messages"])
+    )
+
+
+def announcements(rng, profile):
+    return [
+        {
+            "subject": _sentence(rng, 5),
+            "announcement": "&lt;p&gt;" + "&lt;br /&gt;".join(_sentence(rng, 15) for _ in range(3)) + "&lt;/p&gt;",
+            "time": f"{rng.randint(1, 12)}:{rng.randint(0, 59):02d} PM",
+            "date": f"{rng.randint(1, 28):02d} Jan 2025",
+            "announcementid": str(100000 + index),
+            "uploadedby": str(20000 + index),
+            "employeename": f"Employee {index:04d}",
+        }
+        for index in range(profile["announcements"])
+    ]
+
+
+def attendance_summary(rng, profile):
+    # UMS uses <tr> as a row separator without closing the rows
+    rows = []
+    for course in _courses(profile):
+        delivered = rng.randint(20, 60)
+        attended = rng.randint(0, delivered)
+        rows.append(f'<tr><td>{course} :: {_sentence(rng, 3)}</td><td>{rng.randint(1, 28):02d}/01/2025</td>'
+                    f'<td>{rng.randint(0, 3)}</td><td>{delivered}</td><td>{attended}</td>'
+                    f'<td>{attended * 100 // delivered}</td>')
+    rows.append('<tr><td>Aggregate Attendance</td><td></td><td>0</td><td>100</td><td>80</td><td>80</td>')
+    return '<table class="table">' + "".join(rows) + '</table>'
+
+
+def term_wise_marks(rng, profile):
+    parts = ['<div class="accordion" id="accordion">']
+    for term in range(profile["terms"]):
+        term_id = 11900 + term
+        parts.append(
+            f'<div class="card"><div class="card-header"><h2 class="mb-0">'
+            f'<a class="btn btn-link collapsed text-left" data-toggle="collapse" data-target="#collapse{term_id}">'
+            f'Term Id : {term_id}</a></h2></div>'
+            f'<div id="collapse{term_id}" class="collapse" data-parent="#accordion"><div class="card-body">'
+        )
+        for course in _courses(profile):
+            parts.append(f'<h4>{course} :: {_sentence(rng, 3)}</h4>')
+            parts.append('<table class="table"><tr><th>Type</th><th>Marks</th><th>Weightage</th></tr>')
+            for component in range(profile["components"]):
+                parts.append(f'<tr><td>CA {component + 1}</td><td>{rng.randint(0, 30)}/30</td><td>{rng.randint(5, 25)}</td></tr>')
+            parts.append('</table>')
+        parts.append('</div></div></div>')
+    parts.append('</div>')
+    return "".join(parts)
+
+
+def basic_information(rng, reg_no):
+    return [{
+        "StudentName": f"Student {reg_no[-4:]}",
+        "Registrationnumber": reg_no,
+        "Program": "B.Tech. (Computer Science and Engineering)",
+        "Section": f"K{rng.randint(10, 99)}",
+        "DateofBirth": "01 Jan 2004",
+        "AggAttendance": str(rng.randint(60, 100)),
+        "CGPA": f"{rng.uniform(6, 10):.2f}",
+        "RollNumber": f"RK{rng.randint(1000, 9999)}B{rng.randint(10, 99)}",
+        "PendingFee": "0",
+        "StudentPicture": "iVBORw0KGgo" + "A" * 2048,
+    }]
+
+
+def build_fixtures(profile="typical", reg_no="12345678", seed=0):
+    """
+    Returns:
+        dict: Fixture name (see FIXTURE_NAMES) -> response body as text
+    """
+    spec = PROFILES[profile]
+    rng = random.Random(f"{profile}:{seed}")
+
+    def webmethod(value):
+        return json.dumps({"d": value})
+
+    login = login_page(rng, spec)
+    return {
+        "login_page": login,
+        "login_failed": login,
+        "dashboard": dashboard(rng, spec),
+        "result_page": result_page(rng, spec),
+        "assignment_page": assignment_page(rng, spec),
+        "assignment_view_all": assignment_page(rng, spec, view_all=True),
+        "GetStudentBasicInformation": webmethod(basic_information(rng, reg_no)),
+        "GetStudentCourses": webmethod(student_courses(rng, spec)),
+        "GetStudentMessages": webmethod(student_messages(rng, spec)),
+        "GetStudentContactNo": webmethod(f"9{rng.randint(100000000, 999999999)}:Y"),
+        "AnnouncementDetails": webmethod(announcements(rng, spec)),
+        "StudentAttendanceSummary": webmethod(attendance_summary(rng, spec)),
+        "TermWiseMarks": webmethod(term_wise_marks(rng, spec)),
+    }
+
+
+def load_fixtures(directory=None, profile="typical", reg_no="12345678"):
+    """
+    Synthetic fixtures for the profile, overridden by any recorded captures
+    found in directory
+    """
+    fixtures = build_fixtures(profile, reg_no)
+    if directory:
+        for name in FIXTURE_NAMES:
+            for extension in (".html", ".json"):
+                path = os.path.join(directory, name + extension)
+                if os.path.exists(path):
+                    with open(path, encoding="utf-8") as f:
+                        fixtures[name] = f.read()
+    return fixtures
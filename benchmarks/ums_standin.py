@@ -0,0 +1,175 @@
+"""
+Local stand-in for ums.lpu.in that replays fixture responses.
+
+Serves every endpoint umsApi.py calls under /lpuums/: the login form, the
+result page, the assignment page and its "View All" postback, the
+StudentDashboard.aspx page and its WebMethods. Data calls without a logged-in
+session cookie get the login form back, like the real portal.
+
+Run from the repository root, then point the app at it:
+
+    python benchmarks/ums_standin.py --profile typical --port 8765
+    UMS_BASE_URL=http://127.0.0.1:8765/lpuums/ python server.py
+
+Any registration number is accepted with the password "password" (--password).
+"""
+import argparse
+import os
+import secrets
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ums_fixtures import PROFILES, load_fixtures  # noqa: E402
+
+BASE_PATH = "/lpuums/"
+SESSION_COOKIE = "ASP.NET_SessionId"
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _session_id(self):
+        for cookie in self.headers.get("Cookie", "").split(";"):
+            name, _, value = cookie.strip().partition("=")
+            if name == SESSION_COOKIE:
+                return value
+        return None
+
+    def _logged_in(self):
+        return self._session_id() in self.server.sessions
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length).decode("utf-8") if length else ""
+
+    def _send(self, name, status=200, cookie=None):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        body = self.server.fixtures[name].encode("utf-8")
+        content_type = "application/json; charset=utf-8" if body[:1] == b"{" else "text/html; charset=utf-8"
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if cookie:
+            self.send_header("Set-Cookie", f"{SESSION_COOKIE}={cookie}; path=/; HttpOnly")
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.count(name)
+
+    def _route(self):
+        if not self.path.startswith(BASE_PATH):
+            return None
+        return self.path[len(BASE_PATH):].split("?", 1)[0]
+
+    def do_GET(self):
+        route = self._route()
+        if route is None:
+            self.send_error(404)
+        elif route == "":
+            self._send("login_page")
+        elif not self._logged_in():
+            self._send("login_page")
+        elif route == "StudentDashboard.aspx":
+            self._send("dashboard")
+        elif route == "frmStudentResult.aspx":
+            self._send("result_page")
+        elif route == "frmstudentdownloadassignment.aspx":
+            self._send("assignment_page")
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        route = self._route()
+        body = self._read_body()
+        if route is None:
+            self.send_error(404)
+        elif route == "":
+            form = parse_qs(body)
+            password = form.get("TxtpwdAutoId_8767", [""])[0]
+            if form.get("txtU") and password == self.server.password:
+                session_id = secrets.token_hex(12)
+                self.server.sessions.add(session_id)
+                self._send("dashboard", cookie=session_id)
+            else:
+                self._send("login_failed")
+        elif not self._logged_in():
+            self._send("login_page")
+        elif route == "frmstudentdownloadassignment.aspx":
+            self._send("assignment_view_all")
+        elif route.startswith("StudentDashboard.aspx/") and route.split("/", 1)[1] in self.server.fixtures:
+            self._send(route.split("/", 1)[1])
+        else:
+            self.send_error(404)
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, fixtures, password="password", latency=0.0, verbose=False):
+        super().__init__(address, StandInHandler)
+        self.fixtures = fixtures
+        self.password = password
+        self.latency = latency
+        self.verbose = verbose
+        self.sessions = set()
+        self.requests = {}
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{BASE_PATH}"
+
+    def count(self, name):
+        with self._lock:
+            self.requests[name] = self.requests.get(name, 0) + 1
+
+    def expire_sessions(self):
+        """Forget every login, so cached client sessions get the login form back"""
+        self.sessions.clear()
+
+
+def start_standin(profile="typical", port=0, fixtures_dir=None, latency=0.0, password="password"):
+    """
+    Start a stand-in server on a background thread
+
+    Returns:
+        StandInServer: Use .base_url as UMS_BASE_URL and .shutdown() to stop it
+    """
+    fixtures = load_fixtures(fixtures_dir, profile)
+    server = StandInServer(("127.0.0.1", port), fixtures, password=password, latency=latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="typical")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", help="Directory of recorded (anonymized) responses to replay")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before every response")
+    parser.add_argument("--password", default="password")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.fixtures, args.profile)
+    server = StandInServer(("127.0.0.1", args.port), fixtures, password=args.password,
+                           latency=args.latency, verbose=args.verbose)
+    print(f"Serving the {args.profile} profile at {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
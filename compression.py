@@ -0,0 +1,85 @@
+"""
+Response compression negotiated from Accept-Encoding.
+
+compress_response() is registered as an after_request hook. It compresses
+JSON and text bodies above COMPRESS_MIN_SIZE with brotli (when the Brotli
+package is installed and the client accepts "br") or gzip. It leaves alone
+streamed responses, file passthroughs, already-encoded bodies and bodies too
+small for compression to pay off.
+"""
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+# Bodies smaller than this are sent as-is: the headers would eat the savings
+COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.environ.get("COMPRESS_GZIP_LEVEL", "6"))
+# Brotli quality 0-11; 4-5 compresses better than gzip -6 at a similar speed
+BROTLI_QUALITY = int(os.environ.get("COMPRESS_BROTLI_QUALITY", "4"))
+
+COMPRESSIBLE_TYPES = {
+    "application/json", "application/javascript", "application/xml",
+    "image/svg+xml", "text/html", "text/css", "text/plain", "text/javascript",
+}
+
+
+def supported_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def choose_encoding(accept_encodings):
+    """
+    Pick the best encoding the client accepts
+
+    Args:
+        accept_encodings: request.accept_encodings
+
+    Returns:
+        str or None if the client accepts none of ours
+    """
+    return accept_encodings.best_match(supported_encodings())
+
+
+def strip_encoding(etag):
+    """The ETag of the uncompressed representation, from one compress_response() suffixed"""
+    for encoding in ("br", "gzip"):
+        if etag.endswith(f"-{encoding}"):
+            return etag[:-len(encoding) - 1]
+    return etag
+
+
+def compress_response(response, request):
+    """Compress the response body in place if it is worth it; returns the response"""
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    response.set_data(compress(data, encoding))
+    response.headers["Content-Encoding"] = encoding
+    # Each encoding is a different representation, so it needs its own
+    # validator; conditional requests match it through strip_encoding()
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak)
+    return response
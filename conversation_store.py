@@ -0,0 +1,189 @@
+"""
+In-memory conversation summaries for /api/get-conversations.
+
+A user's summaries (other participant, latest message, unread count per
+conversation) are built once from their messages in Supabase and then kept
+up to date from the messages this process saves, marks as read and deletes,
+so listing conversations costs O(conversations) instead of reading every
+message the user ever sent or received.
+
+Changes made by other processes are picked up when a user's summaries expire
+after CONVERSATION_SUMMARY_TTL seconds and are rebuilt from Supabase.
+"""
+import os
+import threading
+
+from ttl_cache import TTLCache
+
+CONVERSATION_SUMMARY_USERS = int(os.environ.get("CONVERSATION_SUMMARY_USERS", "4096"))
+CONVERSATION_SUMMARY_TTL = int(os.environ.get("CONVERSATION_SUMMARY_TTL", "300"))
+
+
+def conversation_id(user1_reg_no, user2_reg_no):
+    participants = sorted([user1_reg_no, user2_reg_no])
+    return f"{participants[0]}_{participants[1]}"
+
+
+def summarize_messages(user_reg_no, messages):
+    """
+    Group a user's messages into conversation summaries
+
+    Returns:
+        dict: Conversation id -> summary dict with conversation_id,
+            other_user, latest_message, unread_count and timestamp
+    """
+    summaries = {}
+    for message in messages:
+        sender, recipient = message.get('sender'), message.get('recipient')
+        # Ensure the user is part of this conversation
+        if sender != user_reg_no and recipient != user_reg_no:
+            continue
+        other_user = recipient if sender == user_reg_no else sender
+        if not other_user or other_user == user_reg_no:
+            continue
+
+        conv_id = message.get('conversation_id')
+        summary = summaries.get(conv_id)
+        if summary is None:
+            summary = summaries[conv_id] = {
+                'conversation_id': conv_id,
+                'other_user': other_user,
+                'latest_message': message,
+                'unread_count': 0,
+                'timestamp': message.get('timestamp', 0)
+            }
+        elif message.get('timestamp', 0) >= summary['timestamp']:
+            summary['latest_message'] = message
+            summary['timestamp'] = message.get('timestamp', 0)
+
+        if recipient == user_reg_no and not message.get('read'):
+            summary['unread_count'] += 1
+    return summaries
+
+
+class ConversationSummaryStore:
+    def __init__(self, max_users=CONVERSATION_SUMMARY_USERS, ttl=CONVERSATION_SUMMARY_TTL):
+        self._users = TTLCache(max_size=max_users, ttl=ttl)
+        self._lock = threading.Lock()
+        # Users being seeded -> whether a change touched them meanwhile
+        self._seeding = {}
+
+    def conversations(self, user_reg_no):
+        """
+        Returns:
+            list: The user's conversations, most recent first, or None if
+                their summaries are not loaded
+        """
+        with self._lock:
+            summaries = self._users.get(user_reg_no)
+            if summaries is None:
+                return None
+            result = [dict(summary) for summary in summaries.values()]
+        result.sort(key=lambda x: x.get('timestamp', 0), reverse=True)
+        return result
+
+    def unread_count(self, user_reg_no, other_reg_no=None):
+        """
+        Returns:
+            int or None: The user's unread messages (only those from
+                other_reg_no if given), or None if their summaries are not loaded
+        """
+        with self._lock:
+            summaries = self._users.get(user_reg_no)
+            if summaries is None:
+                return None
+            if other_reg_no:
+                summary = summaries.get(conversation_id(user_reg_no, other_reg_no))
+                return summary['unread_count'] if summary else 0
+            return sum(summary['unread_count'] for summary in summaries.values())
+
+    def begin_seed(self, user_reg_no):
+        """Call before reading the messages that seed() will summarize"""
+        with self._lock:
+            self._seeding[user_reg_no] = False
+
+    def seed(self, user_reg_no, messages):
+        """
+        Load a user's summaries from all of their messages
+
+        Skipped if a message was saved, read or deleted for the user since
+        begin_seed(), because the messages may predate it; the next lookup
+        seeds again.
+
+        Returns:
+            list: The user's conversations, most recent first
+        """
+        summaries = summarize_messages(user_reg_no, messages)
+        result = sorted((dict(summary) for summary in summaries.values()),
+                        key=lambda x: x.get('timestamp', 0), reverse=True)
+        with self._lock:
+            if not self._seeding.pop(user_reg_no, True):
+                self._users.set(user_reg_no, summaries)
+        return result
+
+    def _touch(self, user_reg_no):
+        if user_reg_no in self._seeding:
+            self._seeding[user_reg_no] = True
+        return self._users.get(user_reg_no)
+
+    def record_message(self, message):
+        """Apply a newly saved message to both participants' summaries"""
+        sender, recipient = message.get('sender'), message.get('recipient')
+        with self._lock:
+            for user_reg_no, other_user in ((sender, recipient), (recipient, sender)):
+                summaries = self._touch(user_reg_no)
+                if summaries is None:
+                    continue
+                conv_id = message.get('conversation_id')
+                summary = summaries.setdefault(conv_id, {
+                    'conversation_id': conv_id,
+                    'other_user': other_user,
+                    'latest_message': message,
+                    'unread_count': 0,
+                    'timestamp': message.get('timestamp', 0)
+                })
+                if message.get('timestamp', 0) >= summary['timestamp']:
+                    summary['latest_message'] = message
+                    summary['timestamp'] = message.get('timestamp', 0)
+                if user_reg_no == recipient and not message.get('read'):
+                    summary['unread_count'] += 1
+
+    def mark_read(self, recipient_reg_no, sender_reg_no=None):
+        """Apply mark_messages_as_read to the recipient's and senders' summaries"""
+        with self._lock:
+            summaries = self._touch(recipient_reg_no)
+            senders = [sender_reg_no] if sender_reg_no else \
+                [summary['other_user'] for summary in (summaries or {}).values()]
+            if summaries is not None:
+                for summary in summaries.values():
+                    if sender_reg_no is None or summary['other_user'] == sender_reg_no:
+                        summary['unread_count'] = 0
+                        self._mark_latest_read(summary, recipient_reg_no)
+
+            for other_user in senders:
+                sender_summaries = self._touch(other_user)
+                summary = (sender_summaries or {}).get(conversation_id(recipient_reg_no, other_user))
+                if summary is not None:
+                    self._mark_latest_read(summary, recipient_reg_no)
+
+    @staticmethod
+    def _mark_latest_read(summary, recipient_reg_no):
+        latest = summary['latest_message']
+        if latest.get('recipient') == recipient_reg_no and not latest.get('read'):
+            summary['latest_message'] = {**latest, 'read': True}
+
+    def remove_conversation(self, user1_reg_no, user2_reg_no):
+        conv_id = conversation_id(user1_reg_no, user2_reg_no)
+        with self._lock:
+            for user_reg_no in (user1_reg_no, user2_reg_no):
+                summaries = self._touch(user_reg_no)
+                if summaries is not None:
+                    summaries.pop(conv_id, None)
+
+    def invalidate(self, user_reg_no):
+        with self._lock:
+            self._touch(user_reg_no)
+            self._users.pop(user_reg_no)
+
+    def stats(self):
+        return self._users.stats()
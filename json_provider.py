@@ -0,0 +1,54 @@
+"""
+Flask JSON provider backed by orjson.
+
+orjson serializes the large /login payloads and the chat message lists
+several times faster than the standard json module and writes bytes
+directly into the response. Output matches Flask's defaults: sorted keys,
+HTTP dates for datetimes, and the same fallbacks for Decimal, UUID,
+dataclasses and __html__ objects. Without orjson installed, the app keeps
+using Flask's DefaultJSONProvider.
+"""
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+if orjson is not None:
+    # Datetimes and dataclasses go through DefaultJSONProvider.default so they
+    # serialize exactly as they did with the json module
+    ORJSON_OPTIONS = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+                      | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    def _dumps_bytes(self, obj, indent=False):
+        option = ORJSON_OPTIONS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        # Anything orjson cannot honour (custom cls, other indents, ...) keeps the json module
+        indent = kwargs.pop("indent", None)
+        kwargs.pop("separators", None)
+        if kwargs or indent not in (None, 2):
+            if indent is not None:
+                kwargs["indent"] = indent
+            return super().dumps(obj, **kwargs)
+        return self._dumps_bytes(obj, indent=indent == 2).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self._dumps_bytes(obj, indent=indent) + b"\n",
+                                        mimetype=self.mimetype)
+
+
+def get_json_provider_class():
+    """OrjsonProvider when orjson is installed, otherwise Flask's default provider"""
+    return OrjsonProvider if orjson is not None else DefaultJSONProvider
@@ -0,0 +1,232 @@
+"""
+Push notifications for new chat messages, served to the dashboard as a
+long-poll (/api/wait-messages).
+
+When a message is saved, its recipient and its (timestamp, id) are
+published through a notifier. The hub in every worker process records the
+newest mark per recipient and wakes the requests waiting for that recipient,
+so a waiting dashboard learns about a message within milliseconds and an idle
+one costs no database queries at all.
+
+Timestamps are in whole seconds and message ids are random, so a mark is the
+newest timestamp together with every message id delivered at it; a message
+is new to a client unless its cursor names it or a later second.
+
+Notifiers:
+
+- LocalNotifier (default) delivers within the process; enough for the single
+  gunicorn worker in the Procfile
+- RedisNotifier fans out through a Redis pub/sub channel, so every worker
+  hears about messages saved by any other; used when MESSAGE_HUB_REDIS_URL is
+  set and the redis package is installed
+
+Each waiting request holds a server thread, so the number of waiters is
+capped; requests over the cap are told to fall back to interval polling.
+"""
+import json
+import os
+import re
+import threading
+import time
+
+MESSAGE_HUB_REDIS_URL = os.environ.get("MESSAGE_HUB_REDIS_URL")
+MESSAGE_HUB_CHANNEL = os.environ.get("MESSAGE_HUB_CHANNEL", "umz:messages")
+# Seconds a long-poll waits before answering "no change"; below gunicorn's 30 s timeout
+MESSAGE_HUB_WAIT = float(os.environ.get("MESSAGE_HUB_WAIT", "25"))
+# Concurrent waiters; each one holds a gthread worker thread. The Procfile
+# adds this many threads on top of WEB_THREADS, so waiters never take
+# threads from logins; keep the two defaults in step.
+MESSAGE_HUB_MAX_WAITERS = int(os.environ.get("MESSAGE_HUB_MAX_WAITERS", "32"))
+
+_MARK_IDS = re.compile(r'^[0-9A-Za-z-]+(\.[0-9A-Za-z-]+)*$')
+
+
+def format_mark(mark):
+    """Cursor for a (timestamp, message ids) mark: "<timestamp>_<id>.<id>..." """
+    timestamp, message_ids = mark
+    return f"{timestamp}_{'.'.join(sorted(message_ids))}"
+
+
+def parse_mark(cursor):
+    """
+    Parse a cursor made by format_mark; a message cursor ("<timestamp>_<id>")
+    is a mark with one id
+
+    Returns:
+        tuple: (timestamp, frozenset of message ids)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    timestamp, _, message_ids = cursor.partition('_')
+    if not _MARK_IDS.match(message_ids):
+        raise ValueError(f"Invalid message cursor: {cursor}")
+    return int(timestamp), frozenset(message_ids.split('.'))
+
+
+def is_newer(mark, since):
+    """Whether mark holds a message that the client at since has not seen"""
+    if since is None:
+        return True
+    return mark[0] > since[0] or (mark[0] == since[0] and not mark[1] <= since[1])
+
+
+class HubFull(Exception):
+    """Raised when the hub already has max_waiters waiting requests"""
+
+
+class LocalNotifier:
+    """Deliver notifications to this process's hub only"""
+
+    def start(self, deliver):
+        self._deliver = deliver
+
+    def publish(self, reg_no, mark):
+        self._deliver(reg_no, mark)
+
+
+class RedisNotifier:
+    """
+    Deliver notifications to the hubs of every process subscribed to a Redis
+    pub/sub channel, including this one
+
+    Raises:
+        ImportError: If the redis package is not installed
+    """
+
+    def __init__(self, url, channel=MESSAGE_HUB_CHANNEL):
+        import redis
+
+        self.channel = channel
+        self._client = redis.Redis.from_url(url)
+
+    def start(self, deliver):
+        def listen():
+            while True:
+                try:
+                    pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+                    pubsub.subscribe(self.channel)
+                    for item in pubsub.listen():
+                        reg_no, timestamp, message_id = json.loads(item["data"])
+                        deliver(reg_no, (timestamp, message_id))
+                except Exception as e:
+                    print(f"Message hub subscription failed, reconnecting: {str(e)}")
+                    time.sleep(1)
+
+        threading.Thread(target=listen, name="message-hub-redis", daemon=True).start()
+
+    def publish(self, reg_no, mark):
+        self._client.publish(self.channel, json.dumps([reg_no, *mark]))
+
+
+def create_notifier():
+    if MESSAGE_HUB_REDIS_URL:
+        try:
+            return RedisNotifier(MESSAGE_HUB_REDIS_URL)
+        except ImportError:
+            print("MESSAGE_HUB_REDIS_URL is set but redis is not installed; notifying this process only")
+    return LocalNotifier()
+
+
+class MessageHub:
+    """
+    Args:
+        notifier: LocalNotifier, RedisNotifier or anything with
+            start(deliver) and publish(reg_no, mark); create_notifier() by default
+    """
+
+    def __init__(self, notifier=None, max_waiters=MESSAGE_HUB_MAX_WAITERS):
+        self.notifier = notifier or create_notifier()
+        self.max_waiters = max_waiters
+        # reg_no -> (newest timestamp, frozenset of message ids at it) addressed to them
+        self._latest = {}
+        # reg_no -> messages delivered for them, so waiters notice any new one
+        self._deliveries = {}
+        self._waiters = 0
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._started = False
+        self._counts = {"published": 0, "delivered": 0, "woken": 0, "timeouts": 0, "rejected": 0}
+
+    def _ensure_started(self):
+        # Started on first use so that a forking server subscribes in each worker process
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        self.notifier.start(self._deliver)
+
+    def publish(self, message):
+        """Announce a saved message to its recipient's waiting requests"""
+        self._ensure_started()
+        try:
+            self.notifier.publish(message['recipient'], (message.get('timestamp', 0), message['id']))
+            with self._lock:
+                self._counts["published"] += 1
+        except Exception as e:
+            # Clients still pick the message up on their next poll
+            print(f"Message hub publish failed: {str(e)}")
+
+    def _deliver(self, reg_no, mark):
+        timestamp, message_id = mark
+        with self._lock:
+            self._counts["delivered"] += 1
+            latest = self._latest.get(reg_no)
+            if latest is None or timestamp > latest[0]:
+                self._latest[reg_no] = (timestamp, frozenset([message_id]))
+            elif timestamp == latest[0]:
+                self._latest[reg_no] = (timestamp, latest[1] | {message_id})
+            self._deliveries[reg_no] = self._deliveries.get(reg_no, 0) + 1
+            self._changed.notify_all()
+
+    def wait(self, reg_no, since=None, timeout=MESSAGE_HUB_WAIT):
+        """
+        Wait for a message addressed to reg_no that is new to the client
+
+        Returns at once if the hub already holds a message newer than since,
+        otherwise as soon as any message is delivered for reg_no.
+
+        Args:
+            since: Mark (from parse_mark) of the newest messages the client
+                knows of; None waits for the next message
+
+        Returns:
+            tuple or None: The newest mark for reg_no, or None on timeout
+
+        Raises:
+            HubFull: If max_waiters requests are already waiting
+        """
+        self._ensure_started()
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            start = self._latest.get(reg_no)
+            if start is not None and since is not None and is_newer(start, since):
+                return start
+            if self._waiters >= self.max_waiters:
+                self._counts["rejected"] += 1
+                raise HubFull()
+
+            self._waiters += 1
+            deliveries = self._deliveries.get(reg_no, 0)
+            try:
+                while True:
+                    if self._deliveries.get(reg_no, 0) != deliveries:
+                        self._counts["woken"] += 1
+                        return self._latest[reg_no]
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._counts["timeouts"] += 1
+                        return None
+                    self._changed.wait(remaining)
+            finally:
+                self._waiters -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "notifier": type(self.notifier).__name__,
+                "waiters": self._waiters,
+                "max_waiters": self.max_waiters,
+                "recipients": len(self._latest),
+                **self._counts,
+            }
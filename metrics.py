@@ -0,0 +1,204 @@
+"""
+Stage timings for the hot paths, exported two ways:
+
+- per request, as a Server-Timing header (begin_request / server_timing_header)
+- process-wide, as latency histograms in the Prometheus text format (/metrics)
+
+Other modules can register their own histograms and gauges (read when
+/metrics is scraped) in REGISTRY.
+
+Code under measurement wraps a stage in `with stage("parse", name="..."):` or
+decorates a function with @timed("parse"). Stage timings are collected in a
+context variable, so work handed to a thread pool must be submitted through
+submit_in_context() to be counted towards the request that started it.
+"""
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds of the histogram buckets, in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0)
+
+METRIC_PREFIX = "umz_"
+
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+class Histogram:
+    """Cumulative latency histogram with fixed buckets"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[index] += 1
+                    break
+            else:
+                self.counts[-1] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        """
+        Returns:
+            tuple: (cumulative (upper bound, count) pairs ending with +Inf, sum, count)
+        """
+        with self._lock:
+            cumulative, running = [], 0
+            for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+                running += count
+                cumulative.append((bound, running))
+            return cumulative, self.sum, self.count
+
+
+class Registry:
+    def __init__(self):
+        self._histograms = {}
+        self._gauges = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, metric, labels, help_text=""):
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+                self._help.setdefault(metric, help_text)
+            return histogram
+
+    def observe(self, metric, value, help_text="", **labels):
+        self.histogram(metric, labels, help_text).observe(value)
+
+    def gauge(self, metric, labels, read, help_text=""):
+        """Register a gauge whose value is read() at render time"""
+        with self._lock:
+            self._gauges[(metric, tuple(sorted(labels.items())))] = read
+            self._help.setdefault(metric, help_text)
+
+    def render(self):
+        """Render every histogram in the Prometheus text exposition format"""
+        with self._lock:
+            items = sorted(self._histograms.items())
+        lines, last_metric = [], None
+        for (metric, labels), histogram in items:
+            name = METRIC_PREFIX + metric
+            if metric != last_metric:
+                lines.append(f"# HELP {name} {self._help.get(metric, '')}")
+                lines.append(f"# TYPE {name} histogram")
+                last_metric = metric
+            buckets, total, count = histogram.snapshot()
+            label_text = ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+            for bound, cumulative in buckets:
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = f'{label_text},le="{le}"' if label_text else f'le="{le}"'
+                lines.append(f"{name}_bucket{{{bucket_labels}}} {cumulative}")
+            suffix = f"{{{label_text}}}" if label_text else ""
+            lines.append(f"{name}_sum{suffix} {total}")
+            lines.append(f"{name}_count{suffix} {count}")
+
+        with self._lock:
+            gauges = sorted(self._gauges.items())
+        last_metric = None
+        for (metric, labels), read in gauges:
+            name = METRIC_PREFIX + metric
+            if metric != last_metric:
+                lines.append(f"# HELP {name} {self._help.get(metric, '')}")
+                lines.append(f"# TYPE {name} gauge")
+                last_metric = metric
+            label_text = ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+            lines.append(f"{name}{{{label_text}}} {read()}" if label_text else f"{name} {read()}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REGISTRY = Registry()
+
+
+def record(stage_name, seconds, name=""):
+    """Record one finished stage in the histograms and the current request's timings"""
+    REGISTRY.observe("stage_duration_seconds", seconds,
+                     "Duration of instrumented stages (UMS requests, parsing, Supabase calls)",
+                     stage=stage_name, name=name)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage_name, seconds))
+
+
+@contextmanager
+def stage(stage_name, name=""):
+    """Time the enclosed block as one occurrence of stage_name"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage_name, time.perf_counter() - start, name)
+
+
+def timed(stage_name):
+    """Decorator: time every call of the function as stage_name, labelled with its name"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name, fn.__name__):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def submit_in_context(executor, fn, *args, **kwargs):
+    """executor.submit() that runs fn in a copy of the caller's context"""
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def begin_request():
+    """Start collecting stage timings for the current request"""
+    return _request_timings.set([])
+
+
+def end_request(token):
+    _request_timings.reset(token)
+
+
+def server_timing_header():
+    """
+    Summarize the current request's stages as a Server-Timing header value
+
+    Stages that ran in parallel are summed, so their total can exceed the
+    request's wall-clock time.
+
+    Returns:
+        str or None if nothing was timed
+    """
+    timings = _request_timings.get()
+    if not timings:
+        return None
+    totals = {}
+    for stage_name, seconds in list(timings):
+        total, count = totals.get(stage_name, (0.0, 0))
+        totals[stage_name] = (total + seconds, count + 1)
+    return ", ".join(f'{stage_name};desc="{count}x";dur={total * 1000:.1f}'
+                     for stage_name, (total, count) in totals.items())
+
+
+def observe_request(endpoint, method, status, seconds):
+    REGISTRY.observe("http_request_duration_seconds", seconds,
+                     "Duration of HTTP requests handled by the app",
+                     endpoint=endpoint, method=method, status=str(status))
+
+
+def render_metrics():
+    return REGISTRY.render()
@@ -0,0 +1,144 @@
+"""
+Stale-while-revalidate cache of scraped UMS results, keyed by registration number.
+
+Each section of a student's result is stored with the time it was scraped.
+A lookup returns the cached result whenever it is younger than MAX_STALE and
+lists the sections that are past their freshness TTL; the caller serves the
+cached data right away and refreshes those sections in the background.
+"""
+import hmac
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ttl_cache import TTLCache
+from umsApi import SECTIONS, credentials_digest
+
+# How long each section counts as fresh, in seconds
+DEFAULT_SECTION_TTLS = {
+    "student_info": 3600,
+    "termwise_tgpa": 6 * 3600,
+    "subject_grades": 6 * 3600,
+    "attendance": 900,
+    "student_messages": 300,
+    "contact_info": 24 * 3600,
+    "announcements": 300,
+    "assignments": 1800,
+    "term_wise_marks": 6 * 3600,
+}
+
+
+def parse_section_ttls(value):
+    """
+    Parse overrides like "announcements=120,attendance=600"
+
+    Returns:
+        dict: Section name -> TTL in seconds (unknown sections are ignored)
+    """
+    ttls = {}
+    for item in (value or "").split(","):
+        name, _, seconds = item.partition("=")
+        name = name.strip()
+        if name in SECTIONS and seconds.strip().isdigit():
+            ttls[name] = int(seconds)
+    return ttls
+
+
+SECTION_TTLS = {**DEFAULT_SECTION_TTLS, **parse_section_ttls(os.environ.get("RESULT_CACHE_TTLS"))}
+# Past this age an entry is not served at all and /login scrapes synchronously
+MAX_STALE = int(os.environ.get("RESULT_CACHE_MAX_STALE", str(24 * 3600)))
+MAX_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", "1024"))
+REFRESH_WORKERS = int(os.environ.get("RESULT_CACHE_REFRESH_WORKERS", "2"))
+
+
+class StudentResultCache:
+    def __init__(self, section_ttls=None, max_stale=MAX_STALE, max_size=MAX_SIZE,
+                 refresh_workers=REFRESH_WORKERS):
+        self.section_ttls = section_ttls or SECTION_TTLS
+        self.max_stale = max_stale
+        self._entries = TTLCache(max_size=max_size, ttl=max_stale)
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._executor = ThreadPoolExecutor(max_workers=refresh_workers,
+                                            thread_name_prefix="result-refresh")
+
+    def lookup(self, reg_no, password, sections=None):
+        """
+        Return the cached result for the requested sections
+
+        Args:
+            reg_no: Student registration number
+            password: Password the caller supplied; must match the one the
+                cached result was scraped with
+            sections: Sections the caller needs; all when None
+
+        Returns:
+            tuple: (result, stale sections) or None if any requested section
+                is missing, too old, or the password does not match
+        """
+        entry = self._entries.get(reg_no)
+        if entry is None:
+            return None
+        if not hmac.compare_digest(entry["digest"], credentials_digest(reg_no, password)):
+            return None
+
+        now = time.time()
+        result, stale = {}, []
+        for name in sections or SECTIONS:
+            cached = entry["sections"].get(name)
+            if cached is None:
+                return None
+            data, fetched_at = cached
+            age = now - fetched_at
+            if age > self.max_stale:
+                return None
+            if age > self.section_ttls.get(name, 0):
+                stale.append(name)
+            result[name] = data
+        return result, stale
+
+    def store(self, reg_no, password, result):
+        """Merge freshly scraped sections into the student's entry"""
+        now = time.time()
+        digest = credentials_digest(reg_no, password)
+        with self._lock:
+            entry = self._entries.get(reg_no)
+            sections = dict(entry["sections"]) if entry and entry["digest"] == digest else {}
+            for name, data in result.items():
+                if name in SECTIONS:
+                    sections[name] = (data, now)
+            self._entries.set(reg_no, {"digest": digest, "sections": sections})
+
+    def invalidate(self, reg_no):
+        self._entries.pop(reg_no)
+
+    def refresh_in_background(self, reg_no, sections, refresh):
+        """
+        Run refresh(sections) on the background pool unless one is already
+        running for this student
+
+        Returns:
+            bool: True if a refresh was scheduled
+        """
+        with self._lock:
+            if reg_no in self._refreshing:
+                return False
+            self._refreshing.add(reg_no)
+
+        def run():
+            try:
+                refresh(sections)
+            except Exception as e:
+                print(f"Background refresh failed for {reg_no}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(reg_no)
+
+        self._executor.submit(run)
+        return True
+
+    def stats(self):
+        stats = self._entries.stats()
+        stats["refreshing"] = len(self._refreshing)
+        return stats
@@ -0,0 +1,252 @@
+"""
+In-memory search index over registration numbers and student names.
+
+Backs /api/search-users. Two structures answer a query:
+
+- a sorted list of registration numbers, so a prefix (what users type into
+  the search box most of the time) is found with two bisections
+- a trigram index over "reg_no name", so any substring of at least three
+  characters in either field is found from the posting set of its rarest
+  trigram, checked against the others
+
+The index is built once from Supabase and then kept fresh incrementally:
+rows saved by this process are applied directly, rows inserted elsewhere are
+picked up by id every REFRESH_SECONDS, and a full rebuild every
+REBUILD_SECONDS catches names changed by other workers.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left, insort
+
+GRAM = 3
+REFRESH_SECONDS = int(os.environ.get("SEARCH_INDEX_REFRESH", "60"))
+REBUILD_SECONDS = int(os.environ.get("SEARCH_INDEX_REBUILD", "3600"))
+# Posting sets up to this size are sorted per query instead of caching a sorted copy
+DIRECT_CHECK_SIZE = 64
+# Name stored for students who never logged in; shown, but not searchable
+PLACEHOLDER_NAME = "Not logged in yet"
+
+
+def trigrams(text):
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+class StudentSearchIndex:
+    """
+    Args:
+        load_rows: Callable taking an id and returning the rows with a larger
+            id (all rows for None), each a dict with id, registration_number,
+            name and program; usually SupabaseHelper.get_student_search_rows
+    """
+
+    def __init__(self, load_rows=None, refresh_seconds=REFRESH_SECONDS, rebuild_seconds=REBUILD_SECONDS):
+        self.load_rows = load_rows
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self._students = {}
+        self._texts = {}
+        self._grams = {}
+        # Sorted copies of posting sets, made on demand and dropped when the set changes
+        self._sorted_postings = {}
+        self._sorted_reg_nos = []
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        self.last_id = None
+        self.built_at = None
+        self.refreshed_at = None
+
+    def __len__(self):
+        return len(self._students)
+
+    # ----------------------------------------------------------------- updates
+
+    def upsert(self, reg_no, name=None, program=None):
+        """
+        Add a student or update their name/program
+
+        The placeholder name is not indexed, so it does not match searches
+        for "not", "logged" or "yet", and it does not replace a known name
+        (as saving a record does not).
+        """
+        if not reg_no:
+            return
+        reg_no = str(reg_no)
+        with self._lock:
+            if name == PLACEHOLDER_NAME:
+                known = self._students.get(reg_no, (None,))[0]
+                if known and known != PLACEHOLDER_NAME:
+                    name = known
+            searchable_name = '' if name == PLACEHOLDER_NAME else (name or '')
+            text = f"{reg_no.lower()}\x00{searchable_name.lower()}"
+            old_text = self._texts.get(reg_no)
+            if old_text is None:
+                insort(self._sorted_reg_nos, reg_no)
+            if old_text != text:
+                old_grams = trigrams(old_text) if old_text else set()
+                new_grams = trigrams(text)
+                for gram in old_grams - new_grams:
+                    self._discard_posting(gram, reg_no)
+                for gram in new_grams - old_grams:
+                    self._grams.setdefault(gram, set()).add(reg_no)
+                    self._sorted_postings.pop(gram, None)
+                self._texts[reg_no] = text
+            self._students[reg_no] = (name, program)
+
+    def remove(self, reg_no):
+        with self._lock:
+            text = self._texts.pop(reg_no, None)
+            if text is None:
+                return
+            self._students.pop(reg_no, None)
+            index = bisect_left(self._sorted_reg_nos, reg_no)
+            if index < len(self._sorted_reg_nos) and self._sorted_reg_nos[index] == reg_no:
+                del self._sorted_reg_nos[index]
+            for gram in trigrams(text):
+                self._discard_posting(gram, reg_no)
+
+    def _discard_posting(self, gram, reg_no):
+        postings = self._grams.get(gram)
+        if postings is not None:
+            postings.discard(reg_no)
+            if not postings:
+                del self._grams[gram]
+        self._sorted_postings.pop(gram, None)
+
+    def add_rows(self, rows):
+        for row in rows:
+            self.upsert(row.get("registration_number"), row.get("name"), row.get("program"))
+            row_id = row.get("id")
+            if isinstance(row_id, int) and (self.last_id is None or row_id > self.last_id):
+                self.last_id = row_id
+
+    # ----------------------------------------------------------------- refresh
+
+    def build(self):
+        """Replace the index with every row from load_rows"""
+        fresh = StudentSearchIndex()
+        fresh.add_rows(self.load_rows(None))
+        with self._lock:
+            self._students, self._texts = fresh._students, fresh._texts
+            self._grams, self._sorted_reg_nos = fresh._grams, fresh._sorted_reg_nos
+            self._sorted_postings = {}
+            self.last_id = fresh.last_id
+            self.built_at = self.refreshed_at = time.monotonic()
+
+    def refresh(self):
+        """Add rows inserted since the last build or refresh"""
+        if self.last_id is None:
+            # Row ids are not comparable; only full rebuilds can pick up new rows
+            return
+        self.add_rows(self.load_rows(self.last_id))
+        self.refreshed_at = time.monotonic()
+
+    def ensure_fresh(self):
+        """
+        Build the index on first use (blocking), then schedule incremental
+        refreshes and periodic rebuilds on a background thread
+        """
+        if self.built_at is None:
+            with self._refresh_lock:
+                if self.built_at is None:
+                    self.build()
+            return
+
+        now = time.monotonic()
+        if now - self.built_at >= self.rebuild_seconds:
+            task = self.build
+        elif now - self.refreshed_at >= self.refresh_seconds:
+            task = self.refresh
+        else:
+            return
+        if not self._refresh_lock.acquire(blocking=False):
+            return  # another request is already refreshing
+
+        def run():
+            try:
+                task()
+            except Exception as e:
+                print(f"Search index refresh failed: {str(e)}")
+                self.refreshed_at = time.monotonic()
+            finally:
+                self._refresh_lock.release()
+
+        threading.Thread(target=run, name="search-index-refresh", daemon=True).start()
+
+    # ------------------------------------------------------------------ search
+
+    def _prefix_matches(self, query, limit):
+        start = bisect_left(self._sorted_reg_nos, query)
+        matches = []
+        for reg_no in self._sorted_reg_nos[start:start + limit]:
+            if not reg_no.startswith(query):
+                break
+            matches.append(reg_no)
+        return matches
+
+    def _substring_matches(self, query, limit, exclude):
+        """
+        The limit smallest registration numbers (not in exclude) whose text
+        contains query
+
+        Walks the rarest trigram's posting list in order, so a query matching
+        thousands of students still stops after the first limit hits.
+        """
+        grams = sorted(trigrams(query), key=lambda gram: len(self._grams.get(gram, ())))
+        if not grams or grams[0] not in self._grams:
+            return []
+        rarest = grams[0]
+        others = [self._grams[gram] for gram in grams[1:] if gram in self._grams]
+        if len(others) < len(grams) - 1:
+            return []
+
+        if len(self._grams[rarest]) <= DIRECT_CHECK_SIZE:
+            candidates = sorted(self._grams[rarest])
+        else:
+            candidates = self._sorted_postings.get(rarest)
+            if candidates is None:
+                candidates = self._sorted_postings[rarest] = sorted(self._grams[rarest])
+
+        matches = []
+        for reg_no in candidates:
+            if reg_no in exclude or not all(reg_no in postings for postings in others):
+                continue
+            if query in self._texts[reg_no]:
+                matches.append(reg_no)
+                if len(matches) == limit:
+                    break
+        return matches
+
+    def search(self, query, limit=10):
+        """
+        Find students whose registration number or name contains query
+
+        Registration-number prefix matches come first, then other matches in
+        registration-number order.
+
+        Returns:
+            list: Up to limit dicts with regNo, studentName and program
+        """
+        query = query.strip().lower()
+        if not query:
+            return []
+        with self._lock:
+            matches = self._prefix_matches(query, limit)
+            if len(matches) < limit and len(query) >= GRAM:
+                matches += self._substring_matches(query, limit - len(matches), set(matches))
+            return [
+                {
+                    "regNo": reg_no,
+                    "studentName": self._students[reg_no][0] or "Unknown",
+                    "program": self._students[reg_no][1] or "N/A",
+                }
+                for reg_no in matches
+            ]
+
+    def stats(self):
+        return {
+            "students": len(self._students),
+            "grams": len(self._grams),
+            "last_id": self.last_id,
+            "age": None if self.built_at is None else round(time.monotonic() - self.built_at, 1),
+        }
@@ -2,13 +2,71 @@ import sys
 import io
 import re
 import requests
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, g, request, jsonify, send_from_directory, stream_with_context
 import os
-from umsApi import login_and_fetch_all_result
-from supabase_helper import SupabaseHelper
+import time
+from umsApi import SESSION_CACHE, credentials_digest, login_and_fetch_all_result, iter_sections, resolve_sections
+from supabase_helper import SupabaseHelper, MESSAGE_PAGE_SIZE, STUDENT_BATCH_SIZE, message_cursor
+from result_cache import StudentResultCache
+from snapshot_store import SnapshotStore
+from search_index import StudentSearchIndex
+from ums_transport import get_pool_stats
+from upstream_guard import UMS_GUARD, UpstreamUnavailable
+from singleflight import SingleFlight
+from write_behind import create_queue
+from message_hub import MessageHub, HubFull, format_mark, parse_mark
+import metrics
+from json_provider import get_json_provider_class
+from compression import compress_response, strip_encoding
 
 app = Flask(__name__)
+app.json = get_json_provider_class()(app)
 supabase = SupabaseHelper()
+result_cache = StudentResultCache()
+snapshots = SnapshotStore()
+search_index = StudentSearchIndex(load_rows=supabase.get_student_search_rows)
+# Concurrent scrapes for the same student (double clicks, several tabs) share one UMS run
+scrape_flights = SingleFlight()
+# Wakes dashboards waiting on /api/wait-messages when a message is sent to them
+message_hub = MessageHub()
+
+
+@app.before_request
+def start_request_timing():
+    g.request_started = time.perf_counter()
+    g.timing_token = metrics.begin_request()
+
+
+@app.after_request
+def add_server_timing(response):
+    header = metrics.server_timing_header()
+    if header:
+        response.headers['Server-Timing'] = header
+    started = g.get('request_started')
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe_request(endpoint, request.method, response.status_code,
+                                time.perf_counter() - started)
+    return response
+
+
+@app.after_request
+def compress(response):
+    return compress_response(response, request)
+
+
+@app.teardown_request
+def end_request_timing(exc):
+    token = g.pop('timing_token', None)
+    if token is not None:
+        metrics.end_request(token)
+
+
+# Prometheus scrape endpoint: stage and request latency histograms
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render_metrics(), mimetype='text/plain; version=0.0.4')
+
 
 # Serve static files
 @app.route('/')
@@ -24,7 +82,321 @@ def dashboard():
 def serve_static(filename):
     return send_from_directory('.', filename)
 
+# Dashboard payload keys produced by each scraper section
+FORMATTED_KEYS = {
+    "student_info": ["studentName", "regNo", "program", "section", "dateOfBirth",
+                     "aggAttendance", "cgpa", "rollNumber", "pendingFee"],
+    "termwise_tgpa": ["termData"],
+    "subject_grades": ["grades", "totalCredits"],
+    "attendance": ["detailedAttendance", "attendance", "attendanceSummary"],
+    "student_messages": ["messages"],
+    "contact_info": ["contactInfo"],
+    "announcements": ["announcements"],
+    "assignments": ["assignments"],
+    "term_wise_marks": ["term_wise_marks"],
+}
+
+
+def parse_sections(value):
+    """
+    Read the optional `sections` request parameter (list or comma-separated string)
+
+    Returns:
+        list or None: Validated section names, None for everything
+
+    Raises:
+        ValueError: If an unknown section is requested
+    """
+    if value is None or value == "" or value == []:
+        return None
+    if isinstance(value, str):
+        value = [name.strip() for name in value.split(',') if name.strip()]
+    requested, _ = resolve_sections(value)
+    return requested
+
+
+def saves_student_record(sections):
+    """The Supabase record needs student info and contact info; partial scrapes without them skip the save"""
+    return sections is None or ('student_info' in sections and 'contact_info' in sections)
+
+
+def format_student_data(result, sections=None):
+    """
+    Convert the scraper output into the dashboard payload and the slim record saved to Supabase
+
+    Args:
+        result: Output of login_and_fetch_all_result
+        sections: Scraped sections; the payload only carries their keys. None means all.
+
+    Returns:
+        tuple: (formatted_data, db_formatted_data)
+    """
+    # Extract all data components
+    student_info = result.get('student_info', {})
+    termwise_tgpa = result.get('termwise_tgpa', [])
+    subject_grades = result.get('subject_grades', [])
+    assignments = result.get('assignments', [])
+    attendance = result.get('attendance', [])
+    messages = result.get('student_messages', [])
+    contact_info = result.get('contact_info', {})
+    announcements = result.get('announcements', [])
+    attendance_summary = result.get('attendance_summary', [])
+    term_wise_marks = result.get('term_wise_marks', [])
+    # Calculate total credits
+    total_credits = 0
+    for grade in subject_grades:
+        try:
+            credits_str = grade.get('credits', '0')
+            # Extract only the numeric part from the credits string
+            numeric_credits = re.search(r'\d+\.?\d*', credits_str)
+            if numeric_credits:
+                total_credits += float(numeric_credits.group(0))
+            else:
+                total_credits += 0 # Add 0 if no numeric part found
+        except (ValueError, TypeError):
+            pass
+
+    # Format the data to match what the frontend expects
+    formatted_data = {
+        "studentName": student_info.get('StudentName', 'N/A'),
+        "regNo": student_info.get('Registrationnumber', 'N/A'),
+        "program": student_info.get('Program', 'N/A'),
+        "section": student_info.get('Section', 'N/A'),
+        "dateOfBirth": student_info.get('DateofBirth', 'N/A'),
+        "aggAttendance": student_info.get('AggAttendance', 'N/A'),
+        "cgpa": student_info.get('CGPA', 'N/A'),
+        "rollNumber": student_info.get('RollNumber', 'N/A'),
+        "pendingFee": student_info.get('PendingFee', 'N/A'),
+        "totalCredits": str(total_credits),
+        "termData": [
+            {"termId": item.get('term_id', ''), "tgpa": item.get('tgpa', '')}
+            for item in termwise_tgpa
+        ],
+        "grades": [
+            {"course": item.get('course', ''), "credits": item.get('credits', ''), "grade": item.get('grade', '')}
+            for item in subject_grades
+        ],
+        "assignments": assignments,
+        "detailedAttendance": [
+            {"course": item.get('course', ''), "attendance": item.get('attendance_percentage', '')}
+            for item in attendance
+        ],
+        "attendance": attendance,
+        "messages": [
+            {"title": item.get('title', ''), "message": item.get('message', '')}
+            for item in messages
+        ],
+        "contactInfo": {
+            "contactNumber": contact_info.get('contact_number', ''),
+            "isVerified": contact_info.get('is_verified', '')
+        },
+        "announcements": [
+            {
+                "subject": item.get('subject', ''),
+                "announcement": item.get('announcement', ''),
+                "time": item.get('time', ''),
+                "date": item.get('date', ''),
+                "uploadedBy": item.get('uploadedby', ''),
+                "employeeName": item.get('employeename', '')
+            }
+            for item in announcements
+        ],
+        "attendanceSummary": attendance_summary,
+        "term_wise_marks": term_wise_marks
+    }
+
+    # Create simplified data structure for database storage exactly as specified
+    db_formatted_data = {
+        "cgpa": student_info.get('CGPA', 'N/A'),
+        "regNo": student_info.get('Registrationnumber', 'N/A'),
+        "program": student_info.get('Program', 'N/A'),
+        "section": student_info.get('Section', 'N/A'),
+        "contactInfo": {
+            "isVerified": contact_info.get('is_verified', ''),
+            "contactNumber": contact_info.get('contact_number', '')
+        },
+        "studentName": student_info.get('StudentName', 'Not logged in yet')
+    }
+
+    if sections is not None:
+        keys = {key for name in sections for key in FORMATTED_KEYS[name]}
+        formatted_data = {key: value for key, value in formatted_data.items() if key in keys}
+
+    return formatted_data, db_formatted_data
+
+
+def write_student_record(reg_no, password, db_formatted_data):
+    """Save the student's record to Supabase and keep the search index in step"""
+    response = supabase.save_student_login(reg_no, password, db_formatted_data)
+    if response is None or (isinstance(response, dict) and 'error' in response):
+        raise RuntimeError(f"Failed to save student record for {reg_no}: {response}")
+    search_index.upsert(reg_no, db_formatted_data.get('studentName'), db_formatted_data.get('program'))
+    return response
+
+
+# Student records are saved in the background, off the login response path
+student_writes = create_queue(write_student_record, name="student-records")
+
+
+def persist_student_record(reg_no, password, db_formatted_data):
+    """Queue the student's record for saving; a newer record replaces a queued one"""
+    student_writes.submit(reg_no, reg_no, password, db_formatted_data)
+
+
+def is_login_failure(result):
+    return isinstance(result, dict) and 'error' in result and 'Login failed' in result['error']
+
+
+def cached_login_response(reg_no, error):
+    """Fall back to the last snapshot stored in Supabase when the UMS scrape fails or the upstream guard rejects it"""
+    try:
+        cached_data = supabase.get_student_data(reg_no)
+        if cached_data:
+            print(f"API call failed, using cached data for {reg_no}")
+            return jsonify({"success": True, "student_data": cached_data, "source": "cache"})
+    except:
+        pass
+
+    return jsonify({'error': 'Failed to fetch student data', 'details': str(error)}), 500
+
+
+def scrape_and_save(reg_no, password, sections=None):
+    """Scrape UMS, then update the result cache and the Supabase record"""
+    result = UMS_GUARD.call(login_and_fetch_all_result, reg_no, password, sections=sections)
+    if is_login_failure(result):
+        return result
+
+    result_cache.store(reg_no, password, result)
+
+    # Save to Supabase
+    if saves_student_record(sections):
+        _, db_formatted_data = format_student_data(result)
+        persist_student_record(reg_no, password, db_formatted_data)
+
+    return result
+
+
+def student_data_response(reg_no, formatted_data, sections=None, since_version=None):
+    """
+    Build the success response for freshly formatted data and record it as
+    the student's latest snapshot
+
+    Args:
+        since_version: Snapshot version the client already holds (the
+            `sinceVersion` body field or an If-None-Match ETag)
+
+    Returns:
+        Response: 304 when the client's ETag is current, {"unchanged": true}
+            when its sinceVersion is current, a per-section delta when its
+            version is a recent one, otherwise the full data. Responses for
+            a subset of sections without a base version are not versioned.
+    """
+    version = snapshots.update(reg_no, formatted_data)
+
+    client_etags = if_none_match_versions()
+    if version in client_etags:
+        response = app.response_class(status=304)
+        # Echo the validator of the representation the client holds
+        response.set_etag(client_etags[version])
+        return response
+
+    if since_version:
+        diff = snapshots.delta(reg_no, since_version)
+        if diff is not None:
+            version, delta = diff
+            if not delta["changed"] and not delta["removed"]:
+                return jsonify({"success": True, "unchanged": True, "version": version})
+            return jsonify({"success": True, "version": version, "baseVersion": since_version, "delta": delta})
+
+    if sections is not None:
+        return jsonify({"success": True, "student_data": formatted_data})
+
+    response = jsonify({"success": True, "student_data": formatted_data, "version": version})
+    response.set_etag(version)
+    return response
+
+
+def scrape_student_data(reg_no, password, sections=None, since_version=None):
+    """
+    Scrape UMS and build the JSON response for /login and the section endpoints
+
+    Concurrent calls with the same registration number, password and
+    sections share one scrape. The password is part of the key, so a caller
+    only gets a result that UMS accepted (or rejected) for its own credentials.
+
+    Raises:
+        UpstreamUnavailable: If the UMS circuit breaker is open or too many
+            scrapes are already in flight
+        Exception: Whatever the scrape raised; callers decide on a fallback
+    """
+    key = (reg_no, credentials_digest(reg_no, password), tuple(sections) if sections else None)
+    result = scrape_flights.do(key, lambda: scrape_and_save(reg_no, password, sections))
+
+    # Check if login failed
+    if is_login_failure(result):
+        return jsonify({"success": False, "message": "Invalid credentials"}), 401
+
+    formatted_data, _ = format_student_data(result, sections)
+    return student_data_response(reg_no, formatted_data, sections, since_version)
+
+
+def refresh_cached_result(reg_no, password, sections):
+    """Background re-scrape of stale sections for the result cache"""
+    result = UMS_GUARD.call(login_and_fetch_all_result, reg_no, password, sections=sections)
+    if is_login_failure(result):
+        # The password no longer works on UMS, so stop serving its cached result
+        result_cache.invalidate(reg_no)
+        snapshots.invalidate(reg_no)
+        return
+    result_cache.store(reg_no, password, result)
+
+    if saves_student_record(sections):
+        _, db_formatted_data = format_student_data(result)
+        persist_student_record(reg_no, password, db_formatted_data)
+
+
+def cached_result_response(reg_no, password, sections, since_version=None):
+    """
+    Serve /login from the result cache (stale-while-revalidate)
+
+    Returns:
+        Response or None if there is no usable cached result
+    """
+    cached = result_cache.lookup(reg_no, password, sections)
+    if cached is None:
+        return None
+
+    result, stale = cached
+    if stale:
+        result_cache.refresh_in_background(
+            reg_no, stale, lambda names: refresh_cached_result(reg_no, password, names))
+
+    formatted_data, _ = format_student_data(result, sections)
+    return student_data_response(reg_no, formatted_data, sections, since_version)
+
+
+def if_none_match_versions():
+    """
+    Returns:
+        dict: Snapshot version -> If-None-Match ETag sent for it; compressed
+            responses carry the version with an encoding suffix
+    """
+    return {strip_encoding(etag): etag for etag in request.if_none_match.as_set()}
+
+
+def requested_version(data):
+    """The snapshot version the client holds, from sinceVersion or If-None-Match"""
+    if data.get('sinceVersion'):
+        return str(data['sinceVersion'])
+    versions = if_none_match_versions()
+    return next(iter(versions)) if len(versions) == 1 else None
+
+
 # Login API endpoint
+#
+# Clients that kept the previous response can send its `version` back as
+# `sinceVersion` (or as If-None-Match) and get {"unchanged": true} / 304, or
+# {"delta": {"changed": {key: data}, "removed": [key]}} to merge into it.
 @app.route('/login', methods=['POST'])
 def login():
     data = request.json
@@ -33,119 +405,169 @@ def login():
     
     if not reg_no or not password:
         return jsonify({'error': 'Registration number and password are required'}), 400
+
+    try:
+        sections = parse_sections(data.get('sections'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    since_version = requested_version(data)
+
+    # Recent result for these credentials: answer now, refresh stale sections later
+    cached_response = cached_result_response(reg_no, password, sections, since_version)
+    if cached_response is not None:
+        return cached_response
     
     try:
-        # Call the API function directly
-        result = login_and_fetch_all_result(reg_no, password)
-        
-        # Check if login failed
-        if isinstance(result, dict) and 'error' in result and 'Login failed' in result['error']:
-            return jsonify({"success": False, "message": "Invalid credentials"}), 401
-        
-        # Extract all data components
-        student_info = result.get('student_info', {})
-        termwise_tgpa = result.get('termwise_tgpa', [])
-        subject_grades = result.get('subject_grades', [])
-        assignments = result.get('assignments', [])
-        attendance = result.get('attendance', [])
-        messages = result.get('student_messages', [])
-        contact_info = result.get('contact_info', {})
-        announcements = result.get('announcements', [])
-        attendance_summary = result.get('attendance_summary', [])
-        term_wise_marks = result.get('term_wise_marks', [])
-        # Calculate total credits
-        total_credits = 0
-        for grade in subject_grades:
-            try:
-                credits_str = grade.get('credits', '0')
-                # Extract only the numeric part from the credits string
-                numeric_credits = re.search(r'\d+\.?\d*', credits_str)
-                if numeric_credits:
-                    total_credits += float(numeric_credits.group(0))
-                else:
-                    total_credits += 0 # Add 0 if no numeric part found
-            except (ValueError, TypeError):
-                pass
-        
-        # Format the data to match what the frontend expects
-        formatted_data = {
-            "studentName": student_info.get('StudentName', 'N/A'),
-            "regNo": student_info.get('Registrationnumber', 'N/A'),
-            "program": student_info.get('Program', 'N/A'),
-            "section": student_info.get('Section', 'N/A'),
-            "dateOfBirth": student_info.get('DateofBirth', 'N/A'),
-            "aggAttendance": student_info.get('AggAttendance', 'N/A'),
-            "cgpa": student_info.get('CGPA', 'N/A'),
-            "rollNumber": student_info.get('RollNumber', 'N/A'),
-            "pendingFee": student_info.get('PendingFee', 'N/A'),
-            "totalCredits": str(total_credits),
-            "termData": [
-                {"termId": item.get('term_id', ''), "tgpa": item.get('tgpa', '')}
-                for item in termwise_tgpa
-            ],
-            "grades": [
-                {"course": item.get('course', ''), "credits": item.get('credits', ''), "grade": item.get('grade', '')}
-                for item in subject_grades
-            ],
-            "assignments": assignments,
-            "detailedAttendance": [
-                {"course": item.get('course', ''), "attendance": item.get('attendance_percentage', '')}
-                for item in attendance
-            ],
-            "attendance": attendance,
-            "messages": [
-                {"title": item.get('title', ''), "message": item.get('message', '')}
-                for item in messages
-            ],
-            "contactInfo": {
-                "contactNumber": contact_info.get('contact_number', ''),
-                "isVerified": contact_info.get('is_verified', '')
-            },
-            "announcements": [
-                {
-                    "subject": item.get('subject', ''),
-                    "announcement": item.get('announcement', ''),
-                    "time": item.get('time', ''),
-                    "date": item.get('date', ''),
-                    "uploadedBy": item.get('uploadedby', ''),
-                    "employeeName": item.get('employeename', '')
-                }
-                for item in announcements
-            ],
-            "attendanceSummary": attendance_summary,
-            "term_wise_marks": term_wise_marks
-        }
-        
-        # Create simplified data structure for database storage exactly as specified
-        db_formatted_data = {
-            "cgpa": student_info.get('CGPA', 'N/A'),
-            "regNo": student_info.get('Registrationnumber', 'N/A'),
-            "program": student_info.get('Program', 'N/A'),
-            "section": student_info.get('Section', 'N/A'),
-            "contactInfo": {
-                "isVerified": contact_info.get('is_verified', ''),
-                "contactNumber": contact_info.get('contact_number', '')
-            },
-            "studentName": student_info.get('StudentName', 'Not logged in yet')
-        }
-        
-        # Save to Supabase
-        supabase.save_student_login(reg_no, password, db_formatted_data)
-        
-        return jsonify({"success": True, "student_data": formatted_data})
+        return scrape_student_data(reg_no, password, sections, since_version)
     except Exception as e:
         # If API call fails, try to use cached data as fallback
+        return cached_login_response(reg_no, e)
+
+
+# Refresh endpoint: like /login but always scrapes UMS (skipping the result
+# cache), answering with unchanged / delta / full data against `sinceVersion`
+@app.route('/login/refresh', methods=['POST'])
+def refresh_login():
+    data = request.json
+    reg_no = data.get('regNo')
+    password = data.get('password')
+
+    if not reg_no or not password:
+        return jsonify({'error': 'Registration number and password are required'}), 400
+
+    try:
+        sections = parse_sections(data.get('sections'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        return scrape_student_data(reg_no, password, sections, requested_version(data))
+    except UpstreamUnavailable as e:
+        return jsonify({'error': 'UMS is unavailable, try again later', 'details': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': 'Failed to fetch student data', 'details': str(e)}), 500
+
+
+def stream_event(event, use_sse):
+    """Serialize one streaming event as an NDJSON line or a Server-Sent Event"""
+    payload = app.json.dumps(event)
+    if use_sse:
+        return f"data: {payload}\n\n"
+    return payload + "\n"
+
+
+# Streaming login endpoint: same input as /login, but every section is sent
+# as soon as its UMS fetches complete, as NDJSON lines (default) or as
+# Server-Sent Events when the client asks for text/event-stream.
+#
+#   {"section": "student_info", "data": {...dashboard keys...}}
+#   ...
+#   {"done": true, "success": true}
+#
+# A rejected login yields a single {"success": false, ...} event; a failed
+# scrape yields the Supabase snapshot as {"source": "cache", ...} if there is one.
+@app.route('/login/stream', methods=['POST'])
+def login_stream():
+    data = request.json
+    reg_no = data.get('regNo')
+    password = data.get('password')
+
+    if not reg_no or not password:
+        return jsonify({'error': 'Registration number and password are required'}), 400
+
+    try:
+        sections = parse_sections(data.get('sections'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    use_sse = (request.args.get('format') == 'sse'
+               or request.accept_mimetypes.best == 'text/event-stream')
+
+    def generate():
+        result = {}
         try:
-            cached_data = supabase.get_student_data(reg_no)
-            if cached_data:
-                print(f"API call failed, using cached data for {reg_no}")
-                return jsonify({"success": True, "student_data": cached_data, "source": "cache"})
-        except:
-            pass
-            
+            with UMS_GUARD.guarded():
+                for section, section_data in iter_sections(reg_no, password, sections=sections):
+                    if section == "error":
+                        yield stream_event({"success": False, "message": "Invalid credentials"}, use_sse)
+                        return
+                    result[section] = section_data
+                    formatted_data, _ = format_student_data(result, [section])
+                    yield stream_event({"section": section, "data": formatted_data}, use_sse)
+
+            result_cache.store(reg_no, password, result)
+            formatted_data, db_formatted_data = format_student_data(result, sections)
+            version = snapshots.update(reg_no, formatted_data)
+            if saves_student_record(sections):
+                persist_student_record(reg_no, password, db_formatted_data)
+
+            done = {"done": True, "success": True}
+            if sections is None:
+                done["version"] = version
+            yield stream_event(done, use_sse)
+        except Exception as e:
+            event = {"done": True, "success": False, "error": 'Failed to fetch student data', "details": str(e)}
+            try:
+                cached_data = supabase.get_student_data(reg_no)
+                if cached_data:
+                    print(f"API call failed, using cached data for {reg_no}")
+                    event = {"done": True, "success": True, "student_data": cached_data, "source": "cache"}
+            except:
+                pass
+            yield stream_event(event, use_sse)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream' if use_sse else 'application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+# Per-section endpoint: fetches one section (reusing the cached UMS session)
+# so a quick refresh costs one or two UMS calls instead of a full scrape
+@app.route('/api/sections/<section>', methods=['POST'])
+def get_section(section):
+    data = request.json
+    reg_no = data.get('regNo')
+    password = data.get('password')
+
+    if not reg_no or not password:
+        return jsonify({'error': 'Registration number and password are required'}), 400
+
+    try:
+        sections = parse_sections([section])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+
+    try:
+        return scrape_student_data(reg_no, password, sections)
+    except UpstreamUnavailable as e:
+        return jsonify({'error': 'UMS is unavailable, try again later', 'details': str(e)}), 503
+    except Exception as e:
         return jsonify({'error': 'Failed to fetch student data', 'details': str(e)}), 500
 
 
+# Health of the UMS upstream client
+@app.route('/api/ums-status', methods=['GET'])
+def ums_status():
+    return jsonify({
+        'pool': get_pool_stats(),
+        'sessionCache': SESSION_CACHE.stats(),
+        'resultCache': result_cache.stats(),
+        'snapshots': snapshots.stats(),
+        'searchIndex': search_index.stats(),
+        'upstream': UMS_GUARD.snapshot(),
+        'singleFlight': scrape_flights.stats(),
+        'writeBehind': student_writes.stats(),
+        'conversations': supabase.conversations.stats(),
+        'messageHub': message_hub.stats(),
+        'studentCache': supabase.student_cache_stats(),
+        'readReceipts': supabase.read_receipts.stats(),
+        'messageInserts': supabase.message_inserts.stats()
+    })
+
+
 @app.route('/get-student-info', methods=['POST'])
 def get_student_rank():
     data = request.json
@@ -170,23 +592,20 @@ def search_users():
         return jsonify({'error': 'Search query must be at least 3 characters'}), 400
     
     try:
-        # Get all registration numbers
-        all_reg_numbers = supabase.get_all_registration_numbers()
-        
-        # Filter registration numbers that contain the query
-        matching_reg_numbers = [reg_no for reg_no in all_reg_numbers if query.lower() in reg_no.lower()]
-        
-        # Get student data for matching registration numbers
-        results = []
-        for reg_no in matching_reg_numbers[:10]:  # Limit to 10 results
-            student_data = supabase.get_student_data(reg_no)
-            if student_data:
-                results.append({
-                    'regNo': reg_no,
-                    'studentName': student_data.get('studentName', 'Unknown'),
-                    'program': student_data.get('program', 'N/A')
-                })
-        
+        # Built from Supabase on first use, then refreshed in the background
+        search_index.ensure_fresh()
+        results = search_index.search(query, limit=10)  # Limit to 10 results
+
+        # Rows saved without a name: look them all up in one query
+        unnamed = [result['regNo'] for result in results if result['studentName'] == 'Unknown']
+        if unnamed:
+            students = supabase.get_students_data(unnamed)
+            for result in results:
+                student_data = students.get(result['regNo'])
+                if result['studentName'] == 'Unknown' and student_data:
+                    result['studentName'] = student_data.get('studentName', 'Unknown')
+                    result['program'] = student_data.get('program', 'N/A')
+
         return jsonify({'success': True, 'results': results})
     except Exception as e:
         return jsonify({'error': 'Failed to search users', 'details': str(e)}), 500
@@ -210,12 +629,36 @@ def send_message():
         result = supabase.save_message(sender, recipient, text)
         
         if result.get('success'):
+            message_hub.publish(result['message'])
             return jsonify({'success': True, 'message': result.get('message')})
         else:
             return jsonify({'error': 'Failed to send message', 'details': result.get('error')}), 500
     except Exception as e:
         return jsonify({'error': 'Failed to send message', 'details': str(e)}), 500
 
+@app.route('/api/wait-messages', methods=['GET'])
+def wait_messages():
+    """
+    Long-poll: answer as soon as a message newer than `since` is sent to the
+    user, or with changed=false after MESSAGE_HUB_WAIT seconds
+    """
+    user_reg_no = request.args.get('regNo')
+    since = request.args.get('since')
+    
+    if not user_reg_no:
+        return jsonify({'error': 'Registration number is required'}), 400
+    
+    try:
+        mark = message_hub.wait(user_reg_no, parse_mark(since) if since else None)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except HubFull:
+        return jsonify({'error': 'Too many waiting clients', 'retryAfter': 10}), 503
+    
+    if mark is None:
+        return jsonify({'success': True, 'changed': False, 'cursor': since})
+    return jsonify({'success': True, 'changed': True, 'cursor': format_mark(mark)})
+
 @app.route('/api/get-conversations', methods=['GET'])
 def get_conversations():
     user_reg_no = request.args.get('regNo')
@@ -229,21 +672,45 @@ def get_conversations():
     except Exception as e:
         return jsonify({'error': 'Failed to get conversations', 'details': str(e)}), 500
 
+MAX_MESSAGE_PAGE_SIZE = 200
+
+
 @app.route('/api/get-messages', methods=['GET'])
 def get_messages():
     user_reg_no = request.args.get('regNo')
     other_reg_no = request.args.get('otherRegNo')
+    before = request.args.get('before')
+    after = request.args.get('after')
     
     if not user_reg_no or not other_reg_no:
         return jsonify({'error': 'Both registration numbers are required'}), 400
+    if before and after:
+        return jsonify({'error': 'Use either before or after, not both'}), 400
+    
+    try:
+        limit = int(request.args.get('limit', MESSAGE_PAGE_SIZE))
+    except ValueError:
+        return jsonify({'error': 'limit must be a number'}), 400
+    if not 1 <= limit <= MAX_MESSAGE_PAGE_SIZE:
+        return jsonify({'error': f'limit must be between 1 and {MAX_MESSAGE_PAGE_SIZE}'}), 400
     
     try:
-        messages = supabase.get_messages(user_reg_no, other_reg_no)
+        messages, has_more = supabase.get_message_page(user_reg_no, other_reg_no, limit, before, after)
         
-        # Mark messages as read
-        supabase.mark_messages_as_read(user_reg_no, other_reg_no)
+        # Mark messages as read (in the background, and only if any are unread)
+        supabase.queue_mark_read(user_reg_no, other_reg_no)
         
-        return jsonify({'success': True, 'messages': messages})
+        return jsonify({
+            'success': True,
+            'messages': messages,
+            'hasMore': has_more,
+            'cursors': {
+                'before': message_cursor(messages[0]) if messages else before,
+                'after': message_cursor(messages[-1]) if messages else after
+            }
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to get messages', 'details': str(e)}), 500
 
@@ -324,6 +791,27 @@ def get_student_info():
             "section": "N/A"
         })
 
+# Batch version of /api/get-student-info: one Supabase query for many students
+MAX_BATCH_STUDENTS = STUDENT_BATCH_SIZE
+
+
+@app.route('/api/get-students-info', methods=['POST'])
+def get_students_info():
+    data = request.json or {}
+    reg_nos = data.get('regNos')
+
+    if not isinstance(reg_nos, list) or not reg_nos:
+        return jsonify({'error': 'regNos must be a non-empty list'}), 400
+    if len(reg_nos) > MAX_BATCH_STUDENTS:
+        return jsonify({'error': f'At most {MAX_BATCH_STUDENTS} registration numbers per request'}), 400
+
+    try:
+        students = supabase.get_students_data(reg_nos)
+        return jsonify({'success': True, 'students': students})
+    except Exception as e:
+        print(f"Error in get_students_info: {str(e)}")
+        return jsonify({'error': 'Failed to get student info', 'details': str(e)}), 500
+
 if __name__ == '__main__':
     # For local development only. In production, use gunicorn (see Procfile).
     port = int(os.environ.get("PORT", 5000))
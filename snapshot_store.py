@@ -0,0 +1,92 @@
+"""
+Versioned snapshots of each student's dashboard payload.
+
+A snapshot is the formatted /login data, hashed per top-level key
+("section") and as a whole. The version is the content hash, so a client's
+version stays valid across server restarts and two identical scrapes always
+produce the same version. The section hashes of recent versions are kept, so
+a client on an older version can be sent only the sections that changed.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from ttl_cache import TTLCache
+
+SNAPSHOT_CACHE_SIZE = int(os.environ.get("SNAPSHOT_CACHE_SIZE", "1024"))
+SNAPSHOT_TTL = int(os.environ.get("SNAPSHOT_TTL", str(7 * 24 * 3600)))
+# Older versions per student that can still be answered with a delta
+SNAPSHOT_HISTORY = int(os.environ.get("SNAPSHOT_HISTORY", "8"))
+
+
+def content_hash(value):
+    payload = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def snapshot_version(section_hashes):
+    """Version of a snapshot: a short hash over its section hashes"""
+    return content_hash(sorted(section_hashes.items()))[:20]
+
+
+class SnapshotStore:
+    def __init__(self, max_size=SNAPSHOT_CACHE_SIZE, ttl=SNAPSHOT_TTL, history=SNAPSHOT_HISTORY):
+        self.history = history
+        self._entries = TTLCache(max_size=max_size, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def update(self, reg_no, formatted_data):
+        """
+        Merge freshly formatted sections into the student's snapshot
+
+        Returns:
+            str: The snapshot version after the update
+        """
+        hashes = {key: content_hash(value) for key, value in formatted_data.items()}
+        with self._lock:
+            entry = self._entries.get(reg_no) or {"data": {}, "hashes": {}, "version": None,
+                                                   "history": OrderedDict()}
+            data = {**entry["data"], **formatted_data}
+            section_hashes = {**entry["hashes"], **hashes}
+            version = snapshot_version(section_hashes)
+
+            history = entry["history"]
+            if version != entry["version"]:
+                history[version] = section_hashes
+                history.move_to_end(version)
+                while len(history) > self.history:
+                    history.popitem(last=False)
+
+            self._entries.set(reg_no, {"data": data, "hashes": section_hashes,
+                                       "version": version, "history": history})
+            return version
+
+    def delta(self, reg_no, since_version):
+        """
+        Compare the client's version with the current snapshot
+
+        Returns:
+            tuple: (current version, delta) where delta is
+                {"changed": {section: data}, "removed": [section, ...]},
+                empty when nothing changed; or None if there is no snapshot
+                or since_version is too old to diff against
+        """
+        with self._lock:
+            entry = self._entries.get(reg_no)
+            if entry is None:
+                return None
+            base = entry["history"].get(since_version)
+            if base is None:
+                return None
+            changed = {key: entry["data"][key] for key, section_hash in entry["hashes"].items()
+                       if base.get(key) != section_hash}
+            removed = [key for key in base if key not in entry["hashes"]]
+            return entry["version"], {"changed": changed, "removed": removed}
+
+    def invalidate(self, reg_no):
+        self._entries.pop(reg_no)
+
+    def stats(self):
+        return self._entries.stats()
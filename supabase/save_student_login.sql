@@ -0,0 +1,58 @@
+-- Single round-trip save for SupabaseHelper.save_student_login.
+--
+-- Run once in the Supabase SQL editor. Until it is applied the helper keeps
+-- using its legacy SELECT-then-UPDATE/INSERT flow.
+
+-- Native upserts (on_conflict=registration_number) need a unique constraint
+create unique index if not exists student_logins_registration_number_key
+    on student_logins (registration_number);
+
+-- Insert or update a login, applying the rules the legacy flow applies in Python:
+--   * an empty p_student_info inserts a placeholder, or keeps the stored info
+--   * "Not logged in yet" never replaces a real stored studentName
+--   * a missing contactInfo keeps the stored one
+create or replace function save_student_login(
+    p_registration_number text,
+    p_password text,
+    p_student_info jsonb
+)
+returns setof student_logins
+language sql
+as $$
+    insert into student_logins as existing (registration_number, password, student_info)
+    values (
+        p_registration_number,
+        p_password,
+        case
+            when p_student_info is null or p_student_info = '{}'::jsonb then jsonb_build_object(
+                'studentName', 'Not logged in yet',
+                'regNo', p_registration_number,
+                'program', 'N/A',
+                'section', 'N/A',
+                'cgpa', 'N/A',
+                'contactInfo', jsonb_build_object('contactNumber', '', 'isVerified', '')
+            )
+            else p_student_info
+        end
+    )
+    on conflict (registration_number) do update set
+        password = excluded.password,
+        student_info = case
+            when p_student_info is null or p_student_info = '{}'::jsonb then existing.student_info
+            else p_student_info
+                || case
+                    when p_student_info->>'studentName' = 'Not logged in yet'
+                        and coalesce(nullif(existing.student_info->>'studentName', ''), 'Not logged in yet') <> 'Not logged in yet'
+                    then jsonb_build_object('studentName', existing.student_info->'studentName')
+                    else '{}'::jsonb
+                end
+                || case
+                    when p_student_info ? 'contactInfo' then '{}'::jsonb
+                    else jsonb_build_object('contactInfo', coalesce(
+                        existing.student_info->'contactInfo',
+                        '{"contactNumber": "", "isVerified": ""}'::jsonb
+                    ))
+                end
+        end
+    returning existing.*;
+$$;
@@ -1,34 +1,140 @@
 from supabase import create_client
 from supabase_config import SUPABASE_URL, SUPABASE_KEY
 import json
+import os
+import re
 import time
 import uuid
 import socket
 import random
+import threading
+from contextlib import contextmanager
+
+from conversation_store import ConversationSummaryStore
+from metrics import stage
+from ttl_cache import TTLCache
+from write_behind import GroupCommit, create_queue
+
+# Save logins with one upsert/RPC round trip instead of SELECT then UPDATE/INSERT
+SUPABASE_UPSERT = os.environ.get("SUPABASE_UPSERT", "1") != "0"
+# PostgREST / Postgres error codes meaning a single round-trip path is not set up:
+# no unique constraint for on_conflict, or no save_student_login function
+MISSING_SCHEMA_CODES = {
+    "upsert": {"42P10"},
+    "rpc": {"PGRST202", "42883"},
+}
+
+# Messages per page of a conversation, and the columns the chat view needs
+MESSAGE_PAGE_SIZE = int(os.environ.get("MESSAGE_PAGE_SIZE", "50"))
+MESSAGE_COLUMNS = 'id, sender, recipient, text, timestamp, read'
+
+# Read-through cache of student_info by registration number. Students not in
+# the table are cached (as placeholders) for the shorter negative TTL.
+STUDENT_CACHE_SIZE = int(os.environ.get("STUDENT_CACHE_SIZE", "4096"))
+STUDENT_CACHE_TTL = int(os.environ.get("STUDENT_CACHE_TTL", "600"))
+STUDENT_CACHE_NEGATIVE_TTL = int(os.environ.get("STUDENT_CACHE_NEGATIVE_TTL", "30"))
+# Registration numbers per IN query; kept well below URL length limits
+STUDENT_BATCH_SIZE = 200
+
+# Read receipts for one recipient within this many seconds share one UPDATE
+READ_RECEIPT_WINDOW = float(os.environ.get("READ_RECEIPT_WINDOW", "0.5"))
+# Most messages written by one multi-row insert
+MESSAGE_BATCH_SIZE = int(os.environ.get("MESSAGE_BATCH_SIZE", "50"))
+
+_CURSOR_ID = re.compile(r'^[0-9A-Za-z-]+$')
+
+
+def message_cursor(message):
+    """Opaque keyset cursor for a message: its (timestamp, id)"""
+    return f"{message.get('timestamp', 0)}_{message.get('id')}"
+
+
+def parse_message_cursor(cursor):
+    """
+    Returns:
+        tuple: (timestamp, message id)
+        
+    Raises:
+        ValueError: If the cursor was not made by message_cursor
+    """
+    timestamp, _, message_id = cursor.partition('_')
+    if not _CURSOR_ID.match(message_id):
+        raise ValueError(f"Invalid message cursor: {cursor}")
+    return int(timestamp), message_id
+
+
+def merge_read_receipts(queued, new):
+    """Combine two queued (recipient, senders) read receipts; senders None means all"""
+    recipient_reg_no, senders = queued
+    if senders is None or new[1] is None:
+        return recipient_reg_no, None
+    return recipient_reg_no, senders | new[1]
+
+
+def placeholder_student_info(reg_no):
+    """student_info returned for students that are not in student_logins"""
+    return {
+        "studentName": f"User {reg_no}",
+        "regNo": reg_no,
+        "program": "N/A",
+        "section": "N/A",
+        "cgpa": "N/A",
+        "contactInfo": {
+            "contactNumber": "",
+            "isVerified": ""
+        }
+    }
+
 
 class SupabaseHelper:
     def __init__(self):
         self.supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+        # Each single round-trip path is switched off the first time it fails
+        # because the database lacks the unique constraint or function from
+        # supabase/save_student_login.sql
+        self.upsert_enabled = SUPABASE_UPSERT
+        self.rpc_enabled = SUPABASE_UPSERT
+        self.conversations = ConversationSummaryStore()
+        # reg_no -> (found, student_info)
+        self.student_cache = TTLCache(max_size=STUDENT_CACHE_SIZE, ttl=STUDENT_CACHE_TTL)
+        self.student_cache_negative_hits = 0
+        # reg_no -> [generation, lookups in flight] for students being read
+        # from Supabase; a save bumps the generation, so a lookup that may
+        # have read the row before the save does not cache it
+        self._student_loads = {}
+        self._student_lock = threading.Lock()
+        self.read_receipts = create_queue(self._write_read_receipts, name="read-receipts",
+                                          delay=READ_RECEIPT_WINDOW, merge=merge_read_receipts)
+        # Messages sent while an insert is in progress are inserted together
+        self.message_inserts = GroupCommit(self._insert_messages, name="message-inserts",
+                                           max_batch=MESSAGE_BATCH_SIZE)
     
-    def _execute_with_retry(self, operation, max_retries=3):
+    def _execute_with_retry(self, operation, max_retries=3, errors=None):
         """
         Execute a Supabase operation with retry logic
         
         Args:
             operation: Function to execute
             max_retries: Maximum number of retries
+            errors: List the final exception is appended to when the
+                operation fails, for callers that need to tell failures apart
             
         Returns:
             The result of the operation or None if all retries fail
         """
+        # e.g. "save_student_login.check_exists"
+        name = ".".join(operation.__qualname__.replace(".<locals>", "").split(".")[-2:])
         retries = 0
         while retries < max_retries:
             try:
-                return operation()
+                with stage("supabase", name):
+                    return operation()
             except socket.error as e:
                 retries += 1
                 if retries >= max_retries:
                     print(f"Failed after {max_retries} retries: {str(e)}")
+                    if errors is not None:
+                        errors.append(e)
                     return None
                 
                 # Exponential backoff with jitter
@@ -37,12 +143,18 @@ class SupabaseHelper:
                 time.sleep(wait_time)
             except Exception as e:
                 print(f"Unexpected error: {str(e)}")
+                if errors is not None:
+                    errors.append(e)
                 return None
     
     def save_student_login(self, reg_no, password, student_data):
         """
         Save student login data to Supabase
         
+        Uses a single upsert (or the save_student_login database function when
+        existing data has to be merged in) and falls back to the legacy
+        check-then-write flow if that path is not available.
+        
         Args:
             reg_no: Student registration number
             password: Student password (consider hashing in production)
@@ -51,6 +163,81 @@ class SupabaseHelper:
         Returns:
             dict: Response from Supabase
         """
+        try:
+            return self._write_student_login(reg_no, password, student_data)
+        finally:
+            # Even a failed write may have reached the database
+            self._invalidate_student(reg_no)
+    
+    def _write_student_login(self, reg_no, password, student_data):
+        if student_data is not None and not isinstance(student_data, dict):
+            return self._save_student_login_legacy(reg_no, password, student_data)
+        
+        errors = []
+        path, response = self._upsert_student_login(reg_no, password, student_data, errors)
+        if path is None:
+            return self._save_student_login_legacy(reg_no, password, student_data)
+        if response is not None:
+            return response
+
+        error = errors[-1] if errors else None
+        if getattr(error, 'code', None) not in MISSING_SCHEMA_CODES[path]:
+            # Timeouts, 5xx and connection errors say nothing about the schema
+            return {"error": f"Supabase {path} save failed: {error}"}
+
+        print(f"Supabase {path} save is not set up ({error.code}), using the legacy save flow from now on")
+        setattr(self, f"{path}_enabled", False)
+        return self._save_student_login_legacy(reg_no, password, student_data)
+    
+    def _upsert_student_login(self, reg_no, password, student_data, errors=None):
+        """
+        Save a login in one round trip
+        
+        When the keep-existing rules (a real studentName over "Not logged in
+        yet", the stored contactInfo when none is given, the stored
+        student_info when the new one is empty) cannot change the result, a
+        native upsert on registration_number is enough; otherwise the
+        save_student_login function applies them inside the database.
+        
+        Args:
+            errors: List the exception is appended to if the save fails
+        
+        Returns:
+            tuple: (path, response) where path is "upsert", "rpc" or None if
+                neither path is enabled for this save
+        """
+        if student_data and 'regNo' not in student_data and reg_no:
+            student_data['regNo'] = reg_no
+        
+        needs_merge = not student_data or student_data.get('studentName') == 'Not logged in yet' \
+            or 'contactInfo' not in student_data
+        
+        if not needs_merge and self.upsert_enabled:
+            def upsert_record():
+                return self.supabase.table('student_logins') \
+                .upsert({
+                    'registration_number': reg_no,
+                    'password': password,
+                    'student_info': student_data
+                }, on_conflict='registration_number') \
+                .execute()
+            
+            return 'upsert', self._execute_with_retry(upsert_record, errors=errors)
+        
+        if needs_merge and self.rpc_enabled:
+            def merge_record():
+                return self.supabase.rpc('save_student_login', {
+                    'p_registration_number': reg_no,
+                    'p_password': password,
+                    'p_student_info': student_data or {}
+                }).execute()
+            
+            return 'rpc', self._execute_with_retry(merge_record, errors=errors)
+        
+        return None, None
+    
+    def _save_student_login_legacy(self, reg_no, password, student_data):
+        """Check whether the student exists, then update or insert (two round trips)"""
         try:
             # Check if student already exists
             def check_exists():
@@ -137,51 +324,148 @@ class SupabaseHelper:
     
     def get_student_data(self, reg_no):
         """
-        Retrieve student data from Supabase
+        Retrieve student data from Supabase, through the student cache
         
         Args:
             reg_no: Student registration number
             
         Returns:
-            dict: Student data or None if not found
+            dict: Student data, or a placeholder record if not found
         """
+        cached = self._cached_student(reg_no)
+        if cached is not None:
+            return cached
+        
         try:
-            def fetch_data():
-                return self.supabase.table('student_logins') \
-                .select('student_info') \
-                .eq('registration_number', reg_no) \
-                .execute()
-            
-            response = self._execute_with_retry(fetch_data)
-            
-            if response and response.data and len(response.data) > 0:
-                return response.data[0]['student_info']
-            
-            # If no data found, create a placeholder record
-            placeholder_data = {
-                "studentName": f"User {reg_no}",
-                        "regNo": reg_no,
-                        "program": "N/A",
-                        "section": "N/A",
-                        "cgpa": "N/A",
-                        "contactInfo": {
-                            "contactNumber": "",
-                            "isVerified": ""
-                        }
-                    }
-                    
-            # Return placeholder data instead of None
-            return placeholder_data
+            with self._loading_students([reg_no]) as generations:
+                def fetch_data():
+                    return self.supabase.table('student_logins') \
+                    .select('student_info') \
+                    .eq('registration_number', reg_no) \
+                    .execute()
+                
+                response = self._execute_with_retry(fetch_data)
+                
+                if response and response.data and len(response.data) > 0:
+                    return self._cache_student(reg_no, response.data[0]['student_info'], generations[reg_no])
+                
+                # Return placeholder data instead of None; only a completed lookup is cached
+                if response is not None:
+                    return self._cache_student(reg_no, None, generations[reg_no])
+                return placeholder_student_info(reg_no)
         except Exception as e:
             print(f"Error retrieving from Supabase: {str(e)}")
             # Return a placeholder record instead of None
-            return {
-                "studentName": f"User {reg_no}",
-                "regNo": reg_no,
-                "program": "N/A",
-                "section": "N/A"
-            }
-            
+            return placeholder_student_info(reg_no)
+    
+    def _cached_student(self, reg_no):
+        """Cached student_info (or placeholder) for reg_no, or None on a miss"""
+        entry = self.student_cache.get(reg_no)
+        if entry is None:
+            return None
+        found, student_info = entry
+        if not found:
+            self.student_cache_negative_hits += 1
+        return student_info
+    
+    @contextmanager
+    def _loading_students(self, reg_nos):
+        """
+        Register lookups of reg_nos for the duration of the block
+
+        Yields:
+            dict: Registration number -> generation to pass to _cache_student
+        """
+        with self._student_lock:
+            generations = {}
+            for reg_no in reg_nos:
+                entry = self._student_loads.setdefault(reg_no, [0, 0])
+                entry[1] += 1
+                generations[reg_no] = entry[0]
+        try:
+            yield generations
+        finally:
+            with self._student_lock:
+                for reg_no in reg_nos:
+                    entry = self._student_loads[reg_no]
+                    entry[1] -= 1
+                    if not entry[1]:
+                        del self._student_loads[reg_no]
+    
+    def _invalidate_student(self, reg_no):
+        """Drop the cached student and keep lookups already in flight from caching"""
+        with self._student_lock:
+            entry = self._student_loads.get(reg_no)
+            if entry is not None:
+                entry[0] += 1
+            self.student_cache.pop(reg_no)
+    
+    def _cache_student(self, reg_no, student_info, generation):
+        """
+        Cache a lookup result unless the student was saved since the lookup
+        started; None or empty means not found
+
+        Returns:
+            What get_student_data returns for the result
+        """
+        if student_info:
+            entry = (True, student_info)
+        else:
+            entry = (False, placeholder_student_info(reg_no))
+        with self._student_lock:
+            if self._student_loads[reg_no][0] == generation:
+                ttl = None if entry[0] else STUDENT_CACHE_NEGATIVE_TTL
+                self.student_cache.set(reg_no, entry, ttl=ttl)
+        return entry[1]
+    
+    def student_cache_stats(self):
+        return {**self.student_cache.stats(), "negative_hits": self.student_cache_negative_hits}
+    
+    def get_students_data(self, reg_nos):
+        """
+        Retrieve several students' data, from the student cache and one
+        Supabase query for the rest
+
+        Args:
+            reg_nos: Registration numbers to look up
+
+        Returns:
+            dict: Registration number -> student data, with the same
+                placeholder get_student_data returns for students not found
+        """
+        reg_nos = list(dict.fromkeys(str(reg_no) for reg_no in reg_nos if reg_no))
+        students = {}
+        for reg_no in reg_nos:
+            cached = self._cached_student(reg_no)
+            if cached is not None:
+                students[reg_no] = cached
+        missing = [reg_no for reg_no in reg_nos if reg_no not in students]
+        
+        try:
+            with self._loading_students(missing) as generations:
+                for start in range(0, len(missing), STUDENT_BATCH_SIZE):
+                    chunk = missing[start:start + STUDENT_BATCH_SIZE]
+
+                    def fetch_data():
+                        return self.supabase.table('student_logins') \
+                        .select('registration_number, student_info') \
+                        .in_('registration_number', chunk) \
+                        .execute()
+
+                    response = self._execute_with_retry(fetch_data)
+                    if response is None:
+                        continue
+                    found = {row['registration_number']: row.get('student_info') for row in response.data or []}
+                    for reg_no in chunk:
+                        students[reg_no] = self._cache_student(reg_no, found.get(reg_no), generations[reg_no])
+        except Exception as e:
+            print(f"Error retrieving students from Supabase: {str(e)}")
+
+        for reg_no in reg_nos:
+            if reg_no not in students:
+                students[reg_no] = placeholder_student_info(reg_no)
+        return students
+
     # def bulk_insert_registration_numbers(self, reg_numbers, placeholder_password="temp_password"):
     #     """
     #     Bulk insert registration numbers into Supabase
@@ -289,6 +573,48 @@ class SupabaseHelper:
             print(f"Error getting registration numbers: {str(e)}")
             return []
 
+    def get_student_search_rows(self, after_id=None):
+        """
+        Get the fields the search index needs for every student, paging by id
+
+        Args:
+            after_id: Only return rows with a larger id (all rows when None)
+
+        Returns:
+            list: Dicts with id, registration_number, name and program
+        """
+        try:
+            rows = []
+            page_size = 1000
+            last_id = after_id
+
+            while True:
+                def fetch_page():
+                    query = self.supabase.table('student_logins') \
+                    .select('id, registration_number, name:student_info->>studentName, program:student_info->>program') \
+                    .order('id') \
+                    .limit(page_size)
+                    if last_id is not None:
+                        query = query.gt('id', last_id)
+                    return query.execute()
+
+                response = self._execute_with_retry(fetch_page)
+
+                if not response or not response.data:
+                    break
+
+                rows.extend(response.data)
+
+                if len(response.data) < page_size:
+                    break
+
+                last_id = response.data[-1].get('id')
+
+            return rows
+        except Exception as e:
+            print(f"Error getting student search rows: {str(e)}")
+            return []
+
     def check_registration_number(self, reg_no):
         """
         Check if a specific registration number exists in the database
@@ -347,15 +673,11 @@ class SupabaseHelper:
                 'read': False
             }
             
-            # Insert the message
-            def insert_message():
-                return self.supabase.table('messages') \
-                .insert(message) \
-                .execute()
-            
-            result = self._execute_with_retry(insert_message)
+            # Insert the message, batched with concurrent sends
+            result = self.message_inserts.submit(message)
             
             if result:
+                self.conversations.record_message(message)
                 return {
                     'success': True,
                     'message': message
@@ -372,6 +694,21 @@ class SupabaseHelper:
                 'error': str(e)
             }
     
+    def _insert_messages(self, messages):
+        """
+        Insert a batch of messages with one multi-row insert
+        
+        Returns:
+            list: The insert response, or None if it failed, once per message
+        """
+        def insert_messages():
+            return self.supabase.table('messages') \
+            .insert(messages) \
+            .execute()
+        
+        result = self._execute_with_retry(insert_messages)
+        return [result] * len(messages)
+    
     def get_messages(self, user_reg_no, other_reg_no=None):
         """
         Get messages for a user
@@ -420,6 +757,74 @@ class SupabaseHelper:
             print(f"Error getting messages from Supabase: {str(e)}")
             return []
     
+    def get_message_page(self, user_reg_no, other_reg_no, limit=MESSAGE_PAGE_SIZE, before=None, after=None,
+                         columns=MESSAGE_COLUMNS):
+        """
+        Get one page of a conversation, keyset-paginated on (timestamp, id)
+        
+        Without a cursor this is the latest page. `before` pages back to older
+        messages; `after` fetches the messages newer than the cursor, as when
+        polling an open chat. Message ids are random, so a message saved later
+        in the cursor's second can sort before the cursor: `after` therefore
+        returns every message from that second on (except the cursor's own)
+        and callers skip the ones they already hold.
+        
+        Args:
+            user_reg_no: User's registration number
+            other_reg_no: Other user's registration number
+            limit: Maximum number of messages
+            before: Cursor (from message_cursor) of the oldest message held
+            after: Cursor of the newest message held
+            columns: Columns to select
+            
+        Returns:
+            tuple: (messages oldest first, whether more messages lie beyond
+                the page in the direction fetched)
+            
+        Raises:
+            ValueError: If a cursor is malformed
+        """
+        cursor = parse_message_cursor(after or before) if (after or before) else None
+        participants = sorted([user_reg_no, other_reg_no])
+        conversation_id = f"{participants[0]}_{participants[1]}"
+        
+        try:
+            query = self.supabase.table('messages') \
+                .select(columns) \
+                .eq('conversation_id', conversation_id)
+            
+            # Newer pages are read oldest first, older and latest pages newest first
+            newest_first = not after
+            if after:
+                timestamp, message_id = cursor
+                query = query.gte('timestamp', timestamp).neq('id', message_id)
+            elif before:
+                # Older messages are never inserted, so (timestamp, id) is a stable order here
+                timestamp, message_id = cursor
+                query = query.or_(f"timestamp.lt.{timestamp},and(timestamp.eq.{timestamp},id.lt.{message_id})")
+            
+            # One extra row tells whether there is another page
+            query = query \
+                .order('timestamp', desc=newest_first) \
+                .order('id', desc=newest_first) \
+                .limit(limit + 1)
+            
+            def fetch_page():
+                return query.execute()
+            
+            response = self._execute_with_retry(fetch_page)
+            messages = response.data if response and response.data else []
+            
+            has_more = len(messages) > limit
+            messages = messages[:limit]
+            if newest_first:
+                messages.reverse()
+            
+            return messages, has_more
+        except Exception as e:
+            print(f"Error getting messages from Supabase: {str(e)}")
+            return [], False
+    
     def mark_messages_as_read(self, recipient_reg_no, sender_reg_no=None):
         """
         Mark messages as read
@@ -444,6 +849,8 @@ class SupabaseHelper:
                 return query.execute()
                 
             result = self._execute_with_retry(mark_read)
+            if result is not None:
+                self.conversations.mark_read(recipient_reg_no, sender_reg_no)
             
             return {
                 'success': True,
@@ -456,10 +863,56 @@ class SupabaseHelper:
                 'error': str(e)
             }
     
+    def queue_mark_read(self, recipient_reg_no, sender_reg_no=None):
+        """
+        Mark messages as read in the background
+        
+        Skipped when the conversation summaries show nothing unread. Receipts
+        for one recipient within READ_RECEIPT_WINDOW seconds are written with
+        a single UPDATE. The summaries are only updated once it succeeds, so
+        after a failed write the next call queues the receipt again.
+        
+        Args:
+            recipient_reg_no: Recipient's registration number
+            sender_reg_no: Optional sender's registration number to filter messages
+            
+        Returns:
+            bool: Whether an update was queued
+        """
+        if self.conversations.unread_count(recipient_reg_no, sender_reg_no) == 0:
+            return False
+        
+        senders = frozenset([sender_reg_no]) if sender_reg_no else None
+        self.read_receipts.submit(recipient_reg_no, recipient_reg_no, senders)
+        return True
+    
+    def _write_read_receipts(self, recipient_reg_no, sender_reg_nos):
+        """Write queued read receipts: all of the recipient's messages, or those from sender_reg_nos"""
+        query = self.supabase.table('messages') \
+            .update({'read': True}) \
+            .eq('recipient', recipient_reg_no) \
+            .eq('read', False)
+        
+        if sender_reg_nos is not None:
+            query = query.in_('sender', sorted(sender_reg_nos))
+        
+        def mark_read():
+            return query.execute()
+        
+        result = self._execute_with_retry(mark_read)
+        if result is None:
+            raise RuntimeError(f"Failed to mark messages as read for {recipient_reg_no}")
+        
+        for sender_reg_no in sender_reg_nos or [None]:
+            self.conversations.mark_read(recipient_reg_no, sender_reg_no)
+    
     def get_conversations(self, user_reg_no):
         """
         Get all conversations for a user
         
+        Served from the in-memory summaries, which are loaded from the user's
+        messages on first use and after they expire.
+        
         Args:
             user_reg_no: User's registration number
             
@@ -467,6 +920,10 @@ class SupabaseHelper:
             list: List of conversations with latest message and unread count
         """
         try:
+            conversations = self.conversations.conversations(user_reg_no)
+            if conversations is not None:
+                return conversations
+            
             # Get all messages where user is sender or recipient
             def fetch_messages():
                 return self.supabase.table('messages') \
@@ -474,58 +931,13 @@ class SupabaseHelper:
                 .or_(f"sender.eq.{user_reg_no},recipient.eq.{user_reg_no}") \
                 .execute()
             
+            self.conversations.begin_seed(user_reg_no)
             response = self._execute_with_retry(fetch_messages)
             
-            if not response or not response.data:
+            if not response:
                 return []
             
-            # Group messages by conversation
-            conversations = {}
-            for message in response.data:
-                # Ensure the user is part of this conversation
-                if message.get('sender') != user_reg_no and message.get('recipient') != user_reg_no:
-                    continue
-                    
-                conv_id = message.get('conversation_id')
-                if conv_id not in conversations:
-                    conversations[conv_id] = {
-                        'messages': [],
-                        'unread_count': 0,
-                        'other_user': None
-                    }
-                
-                conversations[conv_id]['messages'].append(message)
-                
-                # Count unread messages
-                if message.get('recipient') == user_reg_no and not message.get('read'):
-                    conversations[conv_id]['unread_count'] += 1
-                
-                # Determine the other user in the conversation
-                if message.get('sender') != user_reg_no:
-                    conversations[conv_id]['other_user'] = message.get('sender')
-                elif message.get('recipient') != user_reg_no:
-                    conversations[conv_id]['other_user'] = message.get('recipient')
-            
-            # Format the response
-            result = []
-            for conv_id, data in conversations.items():
-                # Sort messages by timestamp
-                sorted_messages = sorted(data['messages'], key=lambda x: x.get('timestamp', 0))
-                latest_message = sorted_messages[-1] if sorted_messages else None
-                
-                if latest_message and data['other_user']:
-                    result.append({
-                        'conversation_id': conv_id,
-                        'other_user': data['other_user'],
-                        'latest_message': latest_message,
-                        'unread_count': data['unread_count'],
-                        'timestamp': latest_message.get('timestamp', 0)
-                    })
-            
-            # Sort conversations by latest message timestamp (most recent first)
-            result.sort(key=lambda x: x.get('timestamp', 0), reverse=True)
-            
-            return result
+            return self.conversations.seed(user_reg_no, response.data or [])
         except Exception as e:
             print(f"Error getting conversations from Supabase: {str(e)}")
             return []
@@ -553,6 +965,7 @@ class SupabaseHelper:
             response = self._execute_with_retry(delete_messages)
             
             if response:
+                self.conversations.remove_conversation(user1_reg_no, user2_reg_no)
                 deleted_count = len(response.data) if hasattr(response, 'data') else 0
                 return {
                     "success": True,
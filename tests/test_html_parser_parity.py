@@ -0,0 +1,178 @@
+"""
+Every umsApi extractor must give the same output under lxml and
+html.parser, so UMS_HTML_PARSER only changes speed.
+
+Runs over each synthetic fixture profile, truncated copies of them (UMS
+pages cut off mid-response), hand-written malformed markup for every
+extractor (block elements inside <p>, stray and unclosed <tr>/<td>,
+unclosed containers) and, when UMS_FIXTURES_DIR is set, a directory of
+recorded responses (see benchmarks/ums_fixtures.py).
+"""
+import json
+import os
+import sys
+
+import pytest
+
+import umsApi
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from bench_pipeline import extractor_cases  # noqa: E402
+from ums_fixtures import PROFILES, build_fixtures, load_fixtures  # noqa: E402
+
+pytest.importorskip("lxml")
+
+FIXTURE_SETS = [(profile, lambda profile=profile: build_fixtures(profile)) for profile in sorted(PROFILES)]
+if os.environ.get("UMS_FIXTURES_DIR"):
+    FIXTURE_SETS.append(("recorded", lambda: load_fixtures(os.environ["UMS_FIXTURES_DIR"])))
+
+
+# WebMethod responses whose "d" is JSON rather than markup
+NOT_MARKUP = {"GetStudentBasicInformation", "GetStudentContactNo"}
+
+
+def cut(text):
+    return text[:len(text) * 2 // 3]
+
+
+def truncated(fixtures):
+    """The fixtures with every page and WebMethod markup cut off two thirds in"""
+    result = {}
+    for name, text in fixtures.items():
+        if name in NOT_MARKUP:
+            result[name] = text
+        elif text.lstrip().startswith("{"):
+            response = json.loads(text)
+            result[name] = json.dumps({**response, "d": cut(response["d"])})
+        else:
+            result[name] = cut(text)
+    return result
+
+
+def run_extractors(monkeypatch, fixtures, parser):
+    monkeypatch.setattr(umsApi, "HTML_PARSER", parser)
+    return {name: fn() for name, _, fn in extractor_cases(fixtures)}
+
+
+@pytest.mark.parametrize("truncate", [False, True], ids=["whole", "truncated"])
+@pytest.mark.parametrize("label, load", FIXTURE_SETS, ids=[label for label, _ in FIXTURE_SETS])
+def test_extractors_match_across_parsers(monkeypatch, label, load, truncate):
+    fixtures = load()
+    if truncate:
+        fixtures = truncated(fixtures)
+    lxml_output = run_extractors(monkeypatch, fixtures, "lxml")
+    html_parser_output = run_extractors(monkeypatch, fixtures, "html.parser")
+    for name in lxml_output:
+        assert lxml_output[name] == html_parser_output[name], name
+
+
+def test_unknown_parser_is_rejected():
+    with pytest.raises(ValueError):
+        umsApi.select_html_parser("selectolax")
+    assert umsApi.select_html_parser("html.parser") == "html.parser"
+    assert umsApi.select_html_parser("") in umsApi.HTML_PARSERS
+
+
+VIEWSTATE = ('<input type="hidden" name="__VIEWSTATE" value="vs">'
+             '<input type="hidden" name="__EVENTVALIDATION" value="ev">')
+
+
+def form(body):
+    return f"<html><body><form>{body}</form></body></html>"
+
+
+def row(cells, cell="<td>{}</td>", css="rgRow"):
+    return f'<tr class="{css}">' + "".join(cell.format(i) for i in range(cells))
+
+
+THEORY_TABLE = '<table id="ctl00_cphHeading_rgAssignment_ctl00">'
+PRACTICAL_TABLE = '<table id="ctl00_cphHeading_gvPracticalComponent_ctl00">'
+TERM_ANCHOR = '<a class="btn btn-link collapsed text-left" data-target="#collapse1">Term Id : 1</a>'
+
+# Extractor -> inputs as it receives them
+MALFORMED = {
+    "build_login_payload": [
+        form(f'<p>{VIEWSTATE}<div><input type="hidden" name="__VIEWSTATEGENERATOR" value="g"></div></p>'),
+        form(f"<table><tr>{VIEWSTATE}<td>x</table>"),
+        f"<div><table>{VIEWSTATE}",
+    ],
+    "is_login_form": [
+        form('<p><div><input id="TxtpwdAutoId_8767" type="password"></div></p>'),
+        '<table><td><input id="TxtpwdAutoId_8767">',
+        "<p>Welcome<div>dashboard</div></p><td>stray",
+    ],
+    "build_view_all_payload": [
+        form(f'<p>{VIEWSTATE}<div><input type="hidden" name="x" value="1"></div></p>'),
+        form(f'<table><td>{VIEWSTATE}</td><input type="hidden" name="y" value="2"></table>'),
+        f"<div><table><tr>{VIEWSTATE}",
+    ],
+    "parse_assignments": [
+        THEORY_TABLE + row(11, "<td>{}") + "</table>",
+        THEORY_TABLE + row(11, "<td><p>c{0}<div>d{0}</div></p></td>") + "</tr></table>",
+        THEORY_TABLE + '<tr class="rgRow"><td>a</td><table><tr><td>n</td></tr></table>'
+        + "".join(f"<td>{i}</td>" for i in range(10)) + "</tr></table>",
+        THEORY_TABLE + "<td>stray</td>" + row(11) + "</tr></table>",
+        "<div>" + PRACTICAL_TABLE + row(18, css="rgAltRow"),
+    ],
+    "parse_attendance": [
+        '<div class="mycoursesdiv"><p class="font-weight-medium">C1'
+        '<div class="c100"><span>90%</span></div></p></div>',
+        '<div class="mycoursesdiv"><p class="font-weight-medium">C1<div class="c100"><span>90%</span></div>',
+        '<div class="mycoursesdiv"><table><td><p class="font-weight-medium">C1</td></table>'
+        '<div class="c100"><span>90%</div></div>',
+    ],
+    "parse_student_messages": [
+        '<div class="mycoursesdiv"><p class="font-weight-medium">T'
+        '<p class="text-small text-muted">Body<div>more</div></p></div>',
+        '<div class="mycoursesdiv"><span class="font-weight-medium">T</span>'
+        '<p class="text-small text-muted">Body<table><tr><td>x</td></tr></table></p></div>',
+        '<div class="mycoursesdiv"><span class="font-weight-medium">T</span><p class="text-small text-muted">Body',
+    ],
+    "parse_student_contact": ["98xxxxxx01", "98xxxxxx01:Y:extra", ""],
+    "parse_announcements": [
+        [{"subject": "s", "announcement": "&lt;p&gt;Hello&lt;div&gt;world&lt;/div&gt;&lt;/p&gt;"}],
+        [{"subject": "s", "announcement": "<td>stray</td><p>unclosed<table><tr><td>cell"}],
+        [{"subject": "s", "announcement": "<ul><li>one<li>two</ul><p>three"}],
+    ],
+    "parse_attendance_summary": [
+        "<tr><td>C1<p>x<div>y</div></p></td><td>1</td>",
+        "<table><td>stray</td><tr><td>C2</td><td>10",
+    ],
+    "parse_term_wise_marks": [
+        TERM_ANCHOR + '<div id="collapse1"><p><h4>CSE101</h4>'
+        "<table><tr><td>CA</td><td>10</td><td>20</td></tr></table></p></div>",
+        TERM_ANCHOR + '<div id="collapse1"><h4>CSE101<table><tr><td>CA<td>10<td>20</table></div>',
+        '<div id="collapse2"><h4>CSE102</h4><td>stray</td><table><tr><td>CA</td><td>10</td><td>20</td>',
+    ],
+    "parse_student_basic_info": [
+        json.dumps({"d": [{"StudentName": "<p>A<div>B</div></p>", "Program": "<td>x"}]}),
+        '{"d": [{"StudentName": "A"',
+    ],
+    "parse_result_page": [
+        '<table><tr><td colspan="6"><p>TermId: 1; <div>TGPA: 8.1</div></p></td></tr></table>',
+        '<table><tr class="rgRow"><td>1</td><td>x</td><td><p>CSE101<div>Programming</div></p></td>'
+        "<td>4</td><td>A</td></tr></table>",
+        '<table><tr class="rgRow"><td>1<td>x<td>CSE101 Programming<td>4<td>A</table>',
+        '<td colspan="6"><p>TermId: 2; TGPA: 7.5',
+    ],
+}
+
+
+def call_extractor(name, markup):
+    if name == "build_login_payload":
+        return umsApi.build_login_payload(markup, "12345678", "password")
+    return getattr(umsApi, name)(markup)
+
+
+def test_every_extractor_has_malformed_cases():
+    assert set(MALFORMED) == {name for name, _, _ in extractor_cases(build_fixtures("small"))}
+
+
+@pytest.mark.parametrize("name, markup", [(name, markup) for name, cases in MALFORMED.items() for markup in cases],
+                         ids=[f"{name}-{i}" for name, cases in MALFORMED.items() for i in range(len(cases))])
+def test_malformed_markup_matches_across_parsers(monkeypatch, name, markup):
+    monkeypatch.setattr(umsApi, "HTML_PARSER", "lxml")
+    lxml_output = call_extractor(name, markup)
+    monkeypatch.setattr(umsApi, "HTML_PARSER", "html.parser")
+    assert lxml_output == call_extractor(name, markup)
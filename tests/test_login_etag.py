@@ -0,0 +1,70 @@
+"""
+Conditional /login requests against compressed responses: the ETag a client
+got with a gzip or brotli body has to validate (304) and serve as the base
+of a delta just like the plain version it was made from.
+"""
+import gzip
+import json
+
+import pytest
+
+import server
+from compression import supported_encodings
+
+REG_NO = "12100001"
+
+
+def scrape_result(announcement):
+    return {
+        "student_info": {"StudentName": "Aarav Sharma", "Registrationnumber": REG_NO, "CGPA": "8.1"},
+        "contact_info": {"contact_number": "98xxxxxx01", "is_verified": "Y"},
+        # Enough text that the response is compressed
+        "announcements": [{"subject": f"Notice {i}", "announcement": announcement * 20} for i in range(10)],
+    }
+
+
+@pytest.fixture
+def scraped(monkeypatch):
+    result = {"value": scrape_result("Classes resume on Monday. ")}
+    monkeypatch.setattr(server, "login_and_fetch_all_result",
+                        lambda reg_no, password, sections=None: result["value"])
+    monkeypatch.setattr(server, "persist_student_record", lambda *args: None)
+    server.snapshots.invalidate(REG_NO)
+    return result
+
+
+def refresh(client, encoding, etag=None):
+    headers = {"Accept-Encoding": encoding}
+    if etag:
+        headers["If-None-Match"] = etag
+    return client.post("/login/refresh", json={"regNo": REG_NO, "password": "secret"}, headers=headers)
+
+
+@pytest.mark.parametrize("encoding", ["identity", *supported_encodings()])
+def test_if_none_match_with_current_etag_is_304(scraped, encoding):
+    client = server.app.test_client()
+    first = refresh(client, encoding)
+    assert first.status_code == 200
+    etag, _ = first.get_etag()
+    if encoding != "identity":
+        assert first.headers["Content-Encoding"] == encoding
+        assert etag.endswith(f"-{encoding}")
+
+    second = refresh(client, encoding, first.headers["ETag"])
+    assert second.status_code == 304
+    assert second.get_etag()[0] == etag
+
+
+def test_if_none_match_with_old_compressed_etag_gets_delta(scraped):
+    client = server.app.test_client()
+    first = refresh(client, "gzip")
+    version = json.loads(gzip.decompress(first.get_data()))["version"]
+    assert first.get_etag()[0] == f"{version}-gzip"
+
+    scraped["value"] = scrape_result("Classes are cancelled on Monday. ")
+    second = refresh(client, "gzip", first.headers["ETag"])
+    assert second.status_code == 200
+    body = json.loads(gzip.decompress(second.get_data()))
+    assert body["baseVersion"] == version
+    assert set(body["delta"]["changed"]) == {"announcements"}
+    assert body["delta"]["removed"] == []
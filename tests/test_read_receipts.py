@@ -0,0 +1,64 @@
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from bench_student_save import helper  # noqa: E402
+
+READER, SENDER = "12100001", "12100002"
+
+
+class MessagesTable:
+    """supabase.table('messages') for read receipts, failing while client.down is set"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def __getattr__(self, name):
+        # update / eq / in_ just build the query
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        self.client.writes += 1
+        if self.client.down:
+            raise RuntimeError("statement timeout")
+        return SimpleNamespace(data=[{"id": "m1"}])
+
+
+class FakeClient:
+    def __init__(self):
+        self.down = False
+        self.writes = 0
+
+    def table(self, name):
+        assert name == "messages"
+        return MessagesTable(self)
+
+
+def unread_instance():
+    client = FakeClient()
+    instance = helper(client, True)
+    instance.conversations.begin_seed(READER)
+    instance.conversations.seed(READER, [{
+        "id": "m1", "conversation_id": f"{READER}_{SENDER}", "sender": SENDER, "recipient": READER,
+        "text": "hi", "timestamp": 100, "read": False,
+    }])
+    return client, instance
+
+
+def test_failed_receipt_keeps_the_messages_unread_and_is_retried():
+    client, instance = unread_instance()
+    client.down = True
+
+    assert instance.queue_mark_read(READER, SENDER)
+    instance.read_receipts.flush()
+    assert instance.read_receipts.stats()["failed"] == 1
+    assert instance.conversations.unread_count(READER, SENDER) == 1
+
+    client.down = False
+    assert instance.queue_mark_read(READER, SENDER)
+    instance.read_receipts.flush()
+    assert client.writes == 2
+    assert instance.conversations.unread_count(READER, SENDER) == 0
+    assert not instance.queue_mark_read(READER, SENDER)
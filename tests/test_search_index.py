@@ -0,0 +1,21 @@
+from search_index import PLACEHOLDER_NAME, StudentSearchIndex
+
+
+def test_placeholder_names_are_not_searchable():
+    index = StudentSearchIndex()
+    index.upsert("12100001", PLACEHOLDER_NAME, "N/A")
+    index.upsert("12100002", "Aarav Sharma", "B.Tech. (CSE)")
+
+    for query in ("not", "logged", "yet", "not logged in"):
+        assert index.search(query) == []
+    assert index.search("12100001") == [{"regNo": "12100001", "studentName": PLACEHOLDER_NAME, "program": "N/A"}]
+    assert [match["regNo"] for match in index.search("sharma")] == ["12100002"]
+
+
+def test_placeholder_does_not_replace_a_known_name():
+    index = StudentSearchIndex()
+    index.upsert("12100001", "Aarav Sharma", "B.Tech. (CSE)")
+    index.upsert("12100001", PLACEHOLDER_NAME, "B.Tech. (CSE)")
+
+    assert index.search("aarav")[0]["studentName"] == "Aarav Sharma"
+    assert index.search("yet") == []
@@ -0,0 +1,135 @@
+"""
+SupabaseHelper.save_student_login only gives up its single round-trip paths
+when the database says they are not set up, not on ordinary failures.
+"""
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+from postgrest.exceptions import APIError
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from bench_student_save import FakeSupabase, FakeTable, helper, student  # noqa: E402
+
+REG_NO = "12100001"
+
+
+class FailingSupabase(FakeSupabase):
+    """FakeSupabase whose upsert and RPC fail with the given PostgREST error codes"""
+
+    def __init__(self, upsert_code=None, rpc_code=None):
+        super().__init__(0)
+        self.upsert_code = upsert_code
+        self.rpc_code = rpc_code
+
+    def table(self, name):
+        table = super().table(name)
+        if self.upsert_code:
+            error = APIError({"code": self.upsert_code, "message": "failed"})
+            table.upsert = lambda values, on_conflict=None: SimpleNamespace(
+                execute=lambda: (_ for _ in ()).throw(error))
+        return table
+
+    def rpc(self, name, params):
+        if self.rpc_code:
+            error = APIError({"code": self.rpc_code, "message": "failed"})
+            return SimpleNamespace(execute=lambda: (_ for _ in ()).throw(error))
+        return super().rpc(name, params)
+
+
+# Statement timeout, PostgREST connection error, internal error
+@pytest.mark.parametrize("code", ["57014", "PGRST000", "XX000"])
+def test_transient_upsert_failure_keeps_the_upsert_path(code):
+    client = FailingSupabase(upsert_code=code)
+    instance = helper(client, True)
+
+    response = instance.save_student_login(REG_NO, "secret", student(REG_NO))
+    assert "error" in response
+    assert instance.upsert_enabled
+    assert REG_NO not in client.rows
+
+
+def test_missing_unique_constraint_switches_to_legacy_saves():
+    client = FailingSupabase(upsert_code="42P10")
+    instance = helper(client, True)
+
+    response = instance.save_student_login(REG_NO, "secret", student(REG_NO))
+    assert response.data
+    assert not instance.upsert_enabled
+    assert instance.rpc_enabled
+    assert client.rows[REG_NO]["student_info"]["studentName"] == "Aarav Sharma"
+
+
+@pytest.mark.parametrize("code", ["PGRST202", "42883"])
+def test_missing_function_switches_merges_to_legacy_saves(code):
+    client = FailingSupabase(rpc_code=code)
+    instance = helper(client, True)
+
+    instance.save_student_login(REG_NO, "secret", None)
+    assert not instance.rpc_enabled
+    assert instance.upsert_enabled
+    assert client.rows[REG_NO]["student_info"]["studentName"] == "Not logged in yet"
+
+
+def test_transient_rpc_failure_keeps_the_rpc_path():
+    client = FailingSupabase(rpc_code="57014")
+    instance = helper(client, True)
+
+    assert "error" in instance.save_student_login(REG_NO, "secret", None)
+    assert instance.rpc_enabled
+
+
+def test_lookup_racing_a_save_does_not_cache_the_old_row():
+    import threading
+
+    client = FakeSupabase(0)
+    instance = helper(client, True)
+    instance.save_student_login(REG_NO, "secret", student(REG_NO, "Old Name"))
+
+    selected, saved = threading.Event(), threading.Event()
+    table = client.table
+
+    def slow_table(name):
+        fake = table(name)
+        select = fake.select
+
+        def select_then_wait(columns):
+            # Read the old row, then finish only after the save completed
+            query = select(columns)
+            execute = query.execute
+
+            def run():
+                rows = execute()
+                selected.set()
+                saved.wait(1)
+                return rows
+            query.execute = run
+            return query
+        fake.select = select_then_wait
+        return fake
+
+    client.table = slow_table
+    reader = threading.Thread(target=instance.get_student_data, args=(REG_NO,))
+    reader.start()
+    selected.wait(1)
+    client.table = table
+    instance.save_student_login(REG_NO, "secret", student(REG_NO, "New Name"))
+    saved.set()
+    reader.join()
+
+    assert instance.get_student_data(REG_NO)["studentName"] == "New Name"
+    assert instance._student_loads == {}
+
+
+def test_failed_lookup_returns_the_full_placeholder():
+    client = FakeSupabase(0)
+    instance = helper(client, True)
+    # A row without student_info makes the lookup itself raise
+    query = SimpleNamespace(eq=lambda column, value: query, execute=lambda: SimpleNamespace(data=[{}]))
+    client.table = lambda name: SimpleNamespace(select=lambda columns: query)
+
+    from supabase_helper import placeholder_student_info
+
+    assert instance.get_student_data(REG_NO) == placeholder_student_info(REG_NO)
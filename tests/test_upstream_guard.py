@@ -0,0 +1,168 @@
+import threading
+import time
+
+import pytest
+
+from upstream_guard import (CLOSED, HALF_OPEN, OPEN, AdaptiveLimiter, CircuitBreaker, UpstreamGuard,
+                            UpstreamUnavailable)
+
+
+def tripped_breaker(**kwargs):
+    breaker = CircuitBreaker(failure_rate_threshold=0.5, min_requests=2, window_seconds=60,
+                             open_seconds=0.05, **kwargs)
+    breaker.record(False)
+    breaker.record(False)
+    assert breaker.state == OPEN
+    return breaker
+
+
+# ------------------------------------------------------------- CircuitBreaker
+
+def test_breaker_opens_at_failure_rate():
+    breaker = CircuitBreaker(failure_rate_threshold=0.5, min_requests=4, window_seconds=60)
+    for success in (True, False, True):
+        breaker.record(success)
+    assert breaker.state == CLOSED
+    breaker.record(False)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.snapshot()["rejected"] == 1
+
+
+def test_breaker_needs_min_requests():
+    breaker = CircuitBreaker(failure_rate_threshold=0.5, min_requests=10)
+    for _ in range(9):
+        breaker.record(False)
+    assert breaker.state == CLOSED
+
+
+def test_breaker_half_open_probe_closes_or_reopens():
+    breaker = tripped_breaker(half_open_probes=1)
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.record(True)
+    assert breaker.state == CLOSED
+
+    breaker = tripped_breaker(half_open_probes=1)
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record(False)
+    assert breaker.state == OPEN
+    assert breaker.times_opened == 2
+
+
+def test_breaker_cancel_probe_frees_the_slot():
+    breaker = tripped_breaker(half_open_probes=1)
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.cancel_probe()
+    assert breaker.allow()
+
+
+# ------------------------------------------------------------ AdaptiveLimiter
+
+def test_limiter_rejects_when_full():
+    limiter = AdaptiveLimiter(initial_limit=2, min_limit=1, max_limit=4)
+    assert limiter.acquire(0) and limiter.acquire(0)
+    assert not limiter.acquire(0.01)
+    assert limiter.snapshot()["rejected"] == 1
+    limiter.release()
+    assert limiter.acquire(0)
+
+
+def test_limiter_wakes_a_waiter_on_release():
+    limiter = AdaptiveLimiter(initial_limit=1, min_limit=1, max_limit=4)
+    assert limiter.acquire(0)
+    threading.Timer(0.05, limiter.release).start()
+    assert limiter.acquire(1)
+
+
+def test_limiter_grows_on_fast_calls_and_shrinks_on_slow_ones():
+    limiter = AdaptiveLimiter(initial_limit=4, min_limit=2, max_limit=5, target_latency=1)
+    for _ in range(20):
+        limiter.acquire(0)
+        limiter.release(0.1, True)
+    assert limiter.limit == 5
+
+    limiter.acquire(0)
+    limiter.release(2.0, True)
+    assert limiter.limit == pytest.approx(3.5)
+    # At most one cut per target interval
+    limiter.acquire(0)
+    limiter.release(2.0, False)
+    assert limiter.limit == pytest.approx(3.5)
+
+
+# -------------------------------------------------------------- UpstreamGuard
+
+def test_guard_records_outcomes():
+    guard = UpstreamGuard(CircuitBreaker(failure_rate_threshold=0.5, min_requests=2), AdaptiveLimiter())
+    assert guard.call(lambda: 42) == 42
+    with pytest.raises(RuntimeError):
+        guard.call(lambda: (_ for _ in ()).throw(RuntimeError("down")))
+    assert guard.breaker.state == OPEN
+    with pytest.raises(UpstreamUnavailable):
+        guard.call(lambda: 42)
+    assert guard.limiter.in_flight == 0
+
+
+def test_guard_rejects_when_limiter_is_full_and_gives_back_the_probe():
+    guard = UpstreamGuard(tripped_breaker(half_open_probes=1), AdaptiveLimiter(initial_limit=1, min_limit=1),
+                          queue_timeout=0.01)
+    time.sleep(0.06)
+    guard.limiter.acquire(0)
+    with pytest.raises(UpstreamUnavailable):
+        guard.call(lambda: 42)
+    guard.limiter.release()
+    assert guard.call(lambda: 42) == 42
+    assert guard.breaker.state == CLOSED
+
+
+def test_abandoned_half_open_probe_does_not_wedge_the_breaker():
+    guard = UpstreamGuard(tripped_breaker(half_open_probes=1), AdaptiveLimiter())
+    time.sleep(0.06)
+
+    def stream():
+        with guard.guarded():
+            yield "first section"
+            yield "second section"
+
+    # A /login/stream client that disconnects after the first section
+    sections = stream()
+    next(sections)
+    sections.close()
+
+    assert guard.limiter.in_flight == 0
+    assert guard.call(lambda: 42) == 42
+    assert guard.breaker.state == CLOSED
+
+
+def test_fetch_errors_handled_by_fetchers_fail_the_scrape():
+    import requests
+
+    import umsApi
+
+    class TimingOutSession:
+        def get(self, *args, **kwargs):
+            raise requests.Timeout("read timed out")
+
+        post = get
+
+    guard = UpstreamGuard(CircuitBreaker(failure_rate_threshold=0.5, min_requests=2), AdaptiveLimiter())
+    for _ in range(2):
+        # The fetchers run on worker threads and still return a (partial) result
+        sections = guard.call(umsApi.fetch_sections, TimingOutSession(), "12100001", max_workers=4,
+                              names=["assignments", "announcements", "attendance_summary", "term_wise_marks"])
+        assert all(value == [] for value in sections.values())
+    assert guard.breaker.state == OPEN
+
+
+def test_record_fetch_error_outside_a_scrape_is_ignored():
+    from upstream_guard import record_fetch_error
+
+    record_fetch_error(RuntimeError("not in a scrape"))
+    guard = UpstreamGuard(CircuitBreaker(failure_rate_threshold=0.5, min_requests=1), AdaptiveLimiter())
+    assert guard.call(lambda: 42) == 42
+    assert guard.breaker.state == CLOSED
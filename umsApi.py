@@ -1,13 +1,96 @@
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
 import re
 import json
 import html
+from html.parser import HTMLParser
 import urllib3
+import os
+import hashlib
+import hmac
+from bisect import bisect_left, bisect_right
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from ttl_cache import TTLCache
+from ums_transport import new_session
+from metrics import stage, timed, submit_in_context
+from upstream_guard import record_fetch_error
 
 # Disable SSL warnings that will appear when verify=False is used
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# Upper bound on simultaneous UMS requests made for a single login.
+# Keep this small so a burst of logins stays polite to ums.lpu.in.
+MAX_PARALLEL_FETCHES = int(os.environ.get("UMS_MAX_PARALLEL_FETCHES", "4"))
+
+# Authenticated sessions are reused across logins of the same student until
+# they expire here or UMS bounces a data call back to the login form
+SESSION_TTL = int(os.environ.get("UMS_SESSION_TTL", "900"))
+SESSION_CACHE_SIZE = int(os.environ.get("UMS_SESSION_CACHE_SIZE", "256"))
+SESSION_CACHE = TTLCache(max_size=SESSION_CACHE_SIZE, ttl=SESSION_TTL)
+
+# Point UMS_BASE_URL at a stand-in server (see benchmarks/ums_standin.py) to
+# run the pipeline without the live portal
+BASE_URL = os.environ.get("UMS_BASE_URL", "https://ums.lpu.in/lpuums/")
+UMS_ORIGIN = "{0.scheme}://{0.netloc}".format(urlsplit(BASE_URL))
+LOGIN_URL = BASE_URL
+DASHBOARD_URL = BASE_URL + "StudentDashboard.aspx"
+RESULT_URL = BASE_URL + "frmStudentResult.aspx"
+ASSIGNMENT_URL = BASE_URL + "frmstudentdownloadassignment.aspx"
+
+# HTML parser backend for the extractors that only read form fields and flat
+# text: "lxml" (C-accelerated) or "html.parser" (pure Python). Left unset,
+# lxml is used when it is installed.
+PREFERRED_HTML_PARSER = os.environ.get("UMS_HTML_PARSER", "")
+
+# Headers used for the StudentDashboard.aspx WebMethods
+AJAX_HEADERS = {
+    "Content-Type": "application/json; charset=UTF-8",
+    "X-Requested-With": "XMLHttpRequest",
+    "Referer": DASHBOARD_URL
+}
+
+
+HTML_PARSERS = ("lxml", "html.parser")
+
+
+def select_html_parser(preferred=None):
+    """
+    Pick the BeautifulSoup tree builder for the extractors that follow HTML_PARSER
+
+    Args:
+        preferred: "lxml" or "html.parser"; empty/None means lxml if available
+
+    Returns:
+        str: Name of a parser that is installed
+
+    Raises:
+        ValueError: If preferred names any other parser
+    """
+    if preferred and preferred not in HTML_PARSERS:
+        raise ValueError(f"Unsupported UMS_HTML_PARSER {preferred!r}; use one of {', '.join(HTML_PARSERS)}")
+    if preferred == "html.parser":
+        return "html.parser"
+    try:
+        import lxml  # noqa: F401
+        return "lxml"
+    except ImportError:
+        if preferred == "lxml":
+            print("lxml is not installed, falling back to html.parser")
+        return "html.parser"
+
+
+HTML_PARSER = select_html_parser(PREFERRED_HTML_PARSER)
+
+# Extractors that read the text of nested elements always use html.parser.
+# lxml repairs malformed nesting differently (it closes a <p> before a <div>,
+# and closes an unclosed <td> at the next one), which changes their output.
+NESTING_HTML_PARSER = "html.parser"
+
+
+def make_soup(markup, parser=None):
+    return BeautifulSoup(markup, parser or HTML_PARSER)
+
 
 def get_field(soup, name):
     field = soup.find("input", {"name": name})
@@ -24,85 +107,96 @@ def get_hidden_inputs(soup):
     return hidden_inputs
 
 
-def get_assignments_data(session):
-    try:
-        base_url = "https://ums.lpu.in/lpuums/"
-        assignment_url = base_url + "frmstudentdownloadassignment.aspx"
-        headers = {
-            "User-Agent": "Mozilla/5.0",
-            "Referer": assignment_url
-        }
+# ---------------------------------------------------------------------------
+# Parsers
+#
+# These take the raw text UMS returned and never touch the network, so they
+# can be timed and checked against saved pages on their own.
+# ---------------------------------------------------------------------------
 
-        # Get assignment page
-        response = session.get(assignment_url, headers=headers)
-        soup = BeautifulSoup(response.text, 'html.parser')
+@timed("parse")
+def build_login_payload(login_page_html, reg_no, password):
+    soup = make_soup(login_page_html)
+    return {
+        "__EVENTTARGET": "",
+        "__EVENTARGUMENT": "",
+        "__LASTFOCUS": "",
+        "__VIEWSTATE": get_field(soup, "__VIEWSTATE"),
+        "__VIEWSTATEGENERATOR": get_field(soup, "__VIEWSTATEGENERATOR"),
+        "__EVENTVALIDATION": get_field(soup, "__EVENTVALIDATION"),
+        "txtU": reg_no,
+        "TxtpwdAutoId_8767": password,
+        "iBtnLogins150203125": "Login"
+    }
 
-        # Get all hidden inputs for post back
-        hidden_inputs = get_hidden_inputs(soup)
 
-        # Prepare "View All" button post data
-        view_all_data = {
-            "ctl00$cphHeading$Button1": "View All",
-            **hidden_inputs
-        }
+@timed("parse")
+def is_login_form(page_html):
+    """Return True if the page is the UMS login form (i.e. we are not logged in)"""
+    soup = make_soup(page_html)
+    return soup.find("input", {"id": "TxtpwdAutoId_8767"}) is not None
 
-        # Submit the "View All" post request
-        response = session.post(assignment_url, data=view_all_data, headers=headers)
-        soup = BeautifulSoup(response.text, 'html.parser')
 
-        results = []
+@timed("parse")
+def build_view_all_payload(assignment_page_html):
+    soup = make_soup(assignment_page_html)
 
-        # Theory assignments
-        theory_table = soup.find('table', {'id': 'ctl00_cphHeading_rgAssignment_ctl00'})
-        if theory_table:
-            rows = theory_table.find_all('tr', {'class': ['rgRow', 'rgAltRow']})
-            for row in rows:
-                cells = row.find_all('td')
-                if len(cells) >= 11:
-                    marks_obtained = cells[9].get_text(strip=True)
-                    max_marks = cells[10].get_text(strip=True)
-                    if marks_obtained and max_marks:
-                        results.append({
-                            "Course Code": cells[1].get_text(strip=True),
-                            "Type": "Theory",
-                            "Obtained Marks": marks_obtained,
-                            "Total Marks": max_marks
-                        })
-
-        # Practical assignments
-        practical_table = soup.find('table', {'id': 'ctl00_cphHeading_gvPracticalComponent_ctl00'})
-        if practical_table:
-            rows = practical_table.find_all('tr', {'class': ['rgRow', 'rgAltRow']})
-            for row in rows:
-                cells = row.find_all('td')
-                if len(cells) >= 18:
-                    total_obtained = cells[16].get_text(strip=True)
-                    total_max = cells[17].get_text(strip=True)
-                    if total_obtained and total_max:
-                        results.append({
-                            "Course Code": cells[1].get_text(strip=True),
-                            "Type": "Practical",
-                            "Obtained Marks": total_obtained,
-                            "Total Marks": total_max
-                        })
-
-        return results
+    # Get all hidden inputs for post back
+    hidden_inputs = get_hidden_inputs(soup)
 
-    except Exception as e:
-        print(f"[Assignment error]: {e}")
-        return []
+    # Prepare "View All" button post data
+    return {
+        "ctl00$cphHeading$Button1": "View All",
+        **hidden_inputs
+    }
 
 
-def get_attendance(session):
-    url = "https://ums.lpu.in/lpuums/StudentDashboard.aspx/GetStudentCourses"
-    headers = {
-        "Content-Type": "application/json; charset=UTF-8",
-        "X-Requested-With": "XMLHttpRequest",
-        "Referer": "https://ums.lpu.in/lpuums/StudentDashboard.aspx"
-    }
-    response = session.post(url, headers=headers, data="{}")
-    html_content = json.loads(response.text)['d']
-    soup = BeautifulSoup(html_content, "html.parser")
+@timed("parse")
+def parse_assignments(page_html):
+    soup = make_soup(page_html, NESTING_HTML_PARSER)
+
+    results = []
+
+    # Theory assignments
+    theory_table = soup.find('table', {'id': 'ctl00_cphHeading_rgAssignment_ctl00'})
+    if theory_table:
+        rows = theory_table.find_all('tr', {'class': ['rgRow', 'rgAltRow']})
+        for row in rows:
+            cells = row.find_all('td')
+            if len(cells) >= 11:
+                marks_obtained = cells[9].get_text(strip=True)
+                max_marks = cells[10].get_text(strip=True)
+                if marks_obtained and max_marks:
+                    results.append({
+                        "Course Code": cells[1].get_text(strip=True),
+                        "Type": "Theory",
+                        "Obtained Marks": marks_obtained,
+                        "Total Marks": max_marks
+                    })
+
+    # Practical assignments
+    practical_table = soup.find('table', {'id': 'ctl00_cphHeading_gvPracticalComponent_ctl00'})
+    if practical_table:
+        rows = practical_table.find_all('tr', {'class': ['rgRow', 'rgAltRow']})
+        for row in rows:
+            cells = row.find_all('td')
+            if len(cells) >= 18:
+                total_obtained = cells[16].get_text(strip=True)
+                total_max = cells[17].get_text(strip=True)
+                if total_obtained and total_max:
+                    results.append({
+                        "Course Code": cells[1].get_text(strip=True),
+                        "Type": "Practical",
+                        "Obtained Marks": total_obtained,
+                        "Total Marks": total_max
+                    })
+
+    return results
+
+
+@timed("parse")
+def parse_attendance(html_content):
+    soup = make_soup(html_content, NESTING_HTML_PARSER)
     attendance_data = []
     for course_div in soup.select(".mycoursesdiv"):
         attendance = course_div.select_one(".c100 span")
@@ -115,16 +209,9 @@ def get_attendance(session):
     return attendance_data
 
 
-def get_student_messages(session):
-    url = "https://ums.lpu.in/lpuums/StudentDashboard.aspx/GetStudentMessages"
-    headers = {
-        "Content-Type": "application/json; charset=UTF-8",
-        "X-Requested-With": "XMLHttpRequest",
-        "Referer": "https://ums.lpu.in/lpuums/StudentDashboard.aspx"
-    }
-    response = session.post(url, headers=headers, data="{}")
-    html_content = json.loads(response.text)['d']
-    soup = BeautifulSoup(html_content, "html.parser")
+@timed("parse")
+def parse_student_messages(html_content):
+    soup = make_soup(html_content, NESTING_HTML_PARSER)
     messages = []
     for div in soup.select(".mycoursesdiv"):
         title = div.select_one(".font-weight-medium")
@@ -137,15 +224,7 @@ def get_student_messages(session):
     return messages
 
 
-def get_student_contact(session):
-    url = "https://ums.lpu.in/lpuums/StudentDashboard.aspx/GetStudentContactNo"
-    headers = {
-        "Content-Type": "application/json; charset=UTF-8",
-        "X-Requested-With": "XMLHttpRequest",
-        "Referer": "https://ums.lpu.in/lpuums/StudentDashboard.aspx"
-    }
-    response = session.post(url, headers=headers, data="{}")
-    contact_data = json.loads(response.text)['d']
+def parse_student_contact(contact_data):
     contact_parts = contact_data.split(":")
     return {
         "contact_number": contact_parts[0] if contact_parts else "",
@@ -159,7 +238,7 @@ def clean_announcement_text(raw_html):
         return ""
     try:
         decoded_html = html.unescape(raw_html)
-        soup = BeautifulSoup(decoded_html, "html.parser")
+        soup = make_soup(decoded_html)
         text = soup.get_text(separator=" ", strip=True)
         text = re.sub(r'\s+', ' ', text)
         return text.strip()
@@ -168,329 +247,313 @@ def clean_announcement_text(raw_html):
         return raw_html
 
 
-def get_announcement_details(session, reg_no):
-    url = "https://ums.lpu.in/lpuums/StudentDashboard.aspx/AnnouncementDetails"
-    headers = {
-        "Content-Type": "application/json; charset=UTF-8",
-        "X-Requested-With": "XMLHttpRequest",
-        "Referer": "https://ums.lpu.in/lpuums/StudentDashboard.aspx",
-        "Origin": "https://ums.lpu.in"
-    }
-    payload = {
-        "LoginId": reg_no,
-        "Type": "S"
-    }
+@timed("parse")
+def parse_announcements(announcements_raw):
+    announcements = []
+    for ann in announcements_raw:
+        announcements.append({
+            "subject": ann.get("subject", ""),
+            "announcement": clean_announcement_text(ann.get("announcement", "")),
+            "time": ann.get("time", ""),
+            "date": ann.get("date", ""),
+            "announcementid": ann.get("announcementid", ""),
+            "uploadedby": ann.get("uploadedby", ""),
+            "employeename": ann.get("employeename", "")
+        })
+    return announcements
 
-    try:
-        response = session.post(url, headers=headers, json=payload)
-        if response.status_code != 200:
-            print("Failed to fetch announcements.")
-            return []
 
-        data = response.json()
-        announcements_raw = data.get("d", [])
-
-        announcements = []
-        for ann in announcements_raw:
-            announcements.append({
-                "subject": ann.get("subject", ""),
-                "announcement": clean_announcement_text(ann.get("announcement", "")),
-                "time": ann.get("time", ""),
-                "date": ann.get("date", ""),
-                "announcementid": ann.get("announcementid", ""),
-                "uploadedby": ann.get("uploadedby", ""),
-                "employeename": ann.get("employeename", "")
-            })
+class AttendanceSummaryTokenizer(HTMLParser):
+    """
+    Streaming tokenizer for the StudentAttendanceSummary payload
 
-        return announcements
+    Collects the text of every <td> in a row chunk without building a tree,
+    matching what get_text(strip=True) returns on the html.parser tree: an end
+    tag closes everything opened after its matching start tag, stray end tags
+    are ignored, and script/style/template text is skipped.
+    """
 
-    except Exception as e:
-        print("Error while parsing announcements:", str(e))
-        return []
+    VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input",
+                 "link", "meta", "param", "source", "track", "wbr"}
+    HIDDEN_TEXT_TAGS = {"script", "style", "template"}
 
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.cells = []
+        self._open_tags = []
+        self._text = []
 
-def get_student_attendance_summary(session, dashboard_url):
-    headers = {
-        "Content-Type": "application/json; charset=UTF-8",
-        "X-Requested-With": "XMLHttpRequest",
-        "Referer": dashboard_url
-    }
-    
-    try:
-        # First, access the dashboard page to simulate the user being on the page
-        dashboard_response = session.get(dashboard_url, headers={"Referer": dashboard_url})
-        dashboard_soup = BeautifulSoup(dashboard_response.text, 'html.parser')
-        
-        # Find the button that triggers the attendance summary request
-        # This step is to ensure we follow the intended user flow
-        info_button = dashboard_soup.find("i", {"class": "iconsminds-information"})
-        
-        if not info_button:
-            # If the button isn't found, we can still attempt to get the data directly
-            pass
-
-        # Now, make the request to get the attendance summary
-        summary_url = "https://ums.lpu.in/lpuums/StudentDashboard.aspx/StudentAttendanceSummary"
-        response = session.post(summary_url, headers=headers, data="{}")
-        response.raise_for_status()
-        
-        html_content = response.json()['d']
-        
-        # The HTML is malformed, with `<tr>` used as a separator.
-        # We split the content by `<tr>` to get individual row data.
-        row_chunks = html_content.split('<tr>')
-        
-        attendance_summary = []
-        processed_courses = set()
-
-        for chunk in row_chunks:
-            if not chunk.strip():
+    def reset(self):
+        super().reset()
+        self.cells = []
+        self._open_tags = []
+        self._text = []
+
+    def row_cells(self, chunk):
+        """Tokenize one row chunk and return the text of its cells"""
+        self.reset()
+        # The chunk is read as if wrapped in <table><tr>...</tr></table>
+        self._open_tags = [("table", None), ("tr", None)]
+        self.feed(chunk)
+        self.close()
+        self._flush_text()
+        return ["".join(cell) for cell in self.cells]
+
+    def _flush_text(self):
+        # Adjacent data events form one string in the tree; strip it as a whole
+        if not self._text:
+            return
+        text = "".join(self._text).strip()
+        self._text = []
+        if not text:
+            return
+        if any(tag in self.HIDDEN_TEXT_TAGS for tag, _ in self._open_tags):
+            return
+        for _, cell_index in self._open_tags:
+            if cell_index is not None:
+                self.cells[cell_index].append(text)
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_text()
+        if tag in self.VOID_TAGS:
+            return
+        if tag == "td":
+            self.cells.append([])
+            self._open_tags.append(("td", len(self.cells) - 1))
+        else:
+            self._open_tags.append((tag, None))
+
+    def handle_startendtag(self, tag, attrs):
+        self._flush_text()
+        if tag == "td":
+            self.cells.append([])
+
+    def handle_endtag(self, tag):
+        self._flush_text()
+        for depth in range(len(self._open_tags) - 1, -1, -1):
+            if self._open_tags[depth][0] == tag:
+                del self._open_tags[depth:]
+                return
+
+    def handle_data(self, data):
+        self._text.append(data)
+
+    def handle_comment(self, data):
+        self._flush_text()
+
+    def unknown_decl(self, data):
+        self._flush_text()
+        if data.startswith("CDATA["):
+            self._text.append(data[len("CDATA["):])
+            self._flush_text()
+
+
+@timed("parse")
+def parse_attendance_summary(html_content):
+    # The HTML is malformed, with `<tr>` used as a separator.
+    # We split the content by `<tr>` and run every row chunk through one tokenizer.
+    tokenizer = AttendanceSummaryTokenizer()
+
+    attendance_summary = []
+    processed_courses = set()
+
+    for chunk in html_content.split('<tr>'):
+        if not chunk.strip():
+            continue
+
+        cells = tokenizer.row_cells(chunk)
+
+        if len(cells) >= 6:
+            course_name = cells[0]
+
+            # Skip aggregate row and duplicates
+            if "Aggregate Attendance" in course_name or course_name in processed_courses:
                 continue
 
-            # Re-wrap the chunk in a table structure for proper parsing
-            soup = BeautifulSoup(f"<table><tr>{chunk}</tr></table>", 'html.parser')
-            cells = soup.find_all('td')
-
-            if len(cells) >= 6:
-                course_name = cells[0].get_text(strip=True)
-
-                # Skip aggregate row and duplicates
-                if "Aggregate Attendance" in course_name or course_name in processed_courses:
-                    continue
-                
-                last_attended = cells[1].get_text(strip=True)
-                duty_leaves = cells[2].get_text(strip=True)
-                delivered = cells[3].get_text(strip=True)
-                attended = cells[4].get_text(strip=True)
-                
-                attendance_summary.append({
-                    "course_name": course_name,
-                    "last_attended": last_attended,
-                    "attended": attended,
-                    "delivered": delivered,
-                    "duty_leaves": duty_leaves
-                })
-                processed_courses.add(course_name)
-                
-        return attendance_summary
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching attendance summary: {e}")
-        return []
-    except (KeyError, json.JSONDecodeError) as e:
-        print(f"Error parsing attendance summary JSON: {e}")
-        return []
+            attendance_summary.append({
+                "course_name": course_name,
+                "last_attended": cells[1],
+                "attended": cells[4],
+                "delivered": cells[3],
+                "duty_leaves": cells[2]
+            })
+            processed_courses.add(course_name)
 
+    return attendance_summary
 
-def get_term_wise_marks(session):
+
+TERM_SECTION_CLASS = "btn btn-link collapsed text-left"
+
+
+def index_term_wise_marks_document(soup):
     """
-    Extract term-wise marks by simulating the iconsminds-information button click
-    and processing the returned HTML content
+    Walk the term-wise marks tree once and index what the extractor needs
+
+    Every tag gets its document-order position, so "the next table after this
+    h4" and "the h4s inside this collapse div" become bisect lookups instead of
+    fresh searches over the document.
+
+    Returns:
+        dict: anchors (term headers in order), divs (id -> (div, start, end)),
+            h4s/h4_positions and tables/table_positions in document order
     """
-    url = "https://ums.lpu.in/lpuums/StudentDashboard.aspx/TermWiseMarks"
-    headers = {
-        "Content-Type": "application/json; charset=UTF-8",
-        "X-Requested-With": "XMLHttpRequest",
-        "Referer": "https://ums.lpu.in/lpuums/StudentDashboard.aspx"
+    anchors = []
+    divs = {}
+    h4s, h4_positions = [], []
+    tables, table_positions = [], []
+
+    position = 0
+    # (div id whose subtree is being walked or None, start position, children iterator)
+    stack = [(None, 0, iter(soup.contents))]
+    while stack:
+        div_id, start, children = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            if div_id is not None:
+                div, _, _ = divs[div_id]
+                divs[div_id] = (div, start, position)
+            continue
+        if not isinstance(child, Tag):
+            continue
+
+        position += 1
+        name = child.name
+        tracked_id = None
+        if name == "a":
+            if " ".join(child.get("class", [])) == TERM_SECTION_CLASS:
+                anchors.append(child)
+        elif name == "div":
+            element_id = child.get("id")
+            # soup.find() returns the first match, so keep the first div per id
+            if element_id and element_id not in divs:
+                divs[element_id] = (child, position, position)
+                tracked_id = element_id
+        elif name == "h4":
+            h4s.append(child)
+            h4_positions.append(position)
+        elif name == "table":
+            tables.append(child)
+            table_positions.append(position)
+
+        if child.contents:
+            stack.append((tracked_id, position, iter(child.contents)))
+
+    return {
+        "anchors": anchors,
+        "divs": divs,
+        "h4s": h4s,
+        "h4_positions": h4_positions,
+        "tables": tables,
+        "table_positions": table_positions,
     }
-    
-    try:
-        response = session.post(url, headers=headers, data="{}")
-        response.raise_for_status()
-        
-        # Parse the JSON response
-        json_data = response.json()
-        html_content = json_data.get('d', '')
-        
-        # The HTML might be escaped in the JSON
-        html_content = html.unescape(html_content)
-        
-        # Parse the HTML content
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # Initialize the result structure
-        term_wise_marks = []
-        
-        # Find all term sections
-        term_sections = soup.find_all('a', {'class': 'btn btn-link collapsed text-left'})
-        
-        for section in term_sections:
-            # Extract term ID from the section header
-            term_id_match = re.search(r'Term Id : (\d+)', section.get_text(strip=True))
-            term_id = term_id_match.group(1) if term_id_match else "Unknown"
-            
-            # Find the corresponding collapse div that contains the courses
-            collapse_id = section.get('data-target', '')
-            if not collapse_id:
-                continue
-                
-            collapse_id = collapse_id.replace('#', '')
-            collapse_div = soup.find('div', {'id': collapse_id})
-            
-            if not collapse_div:
+
+
+@timed("parse")
+def parse_term_wise_marks(html_content):
+    # The HTML might be escaped in the JSON
+    html_content = html.unescape(html_content)
+
+    # Parse the HTML content and index it in a single traversal
+    soup = make_soup(html_content, NESTING_HTML_PARSER)
+    index = index_term_wise_marks_document(soup)
+    divs = index["divs"]
+    h4s, h4_positions = index["h4s"], index["h4_positions"]
+    tables, table_positions = index["tables"], index["table_positions"]
+
+    # The same table can follow several headers; parse its rows only once
+    components_by_table = {}
+
+    def table_components(table):
+        key = id(table)
+        if key not in components_by_table:
+            components = []
+            for row in table.find_all('tr'):
+                cells = row.find_all('td')
+                if len(cells) >= 3:  # Type, Marks, Weightage
+                    components.append({
+                        "type": cells[0].get_text(strip=True),
+                        "marks": cells[1].get_text(strip=True),
+                        "weightage": cells[2].get_text(strip=True)
+                    })
+            components_by_table[key] = components
+        return components_by_table[key]
+
+    def term_courses(div_id):
+        entry = divs.get(div_id)
+        if not entry:
+            return None
+        _, start, end = entry
+
+        courses = []
+        # Course headers inside the collapse div, each paired with the first
+        # table that follows it in the document
+        first = bisect_right(h4_positions, start)
+        last = bisect_left(h4_positions, end + 1)
+        for h4_index in range(first, last):
+            table_index = bisect_right(table_positions, h4_positions[h4_index])
+            if table_index == len(tables):
                 continue
-                
-            # Create a term object
-            term_data = {
-                "term_id": term_id,
-                "courses": []
-            }
-            
-            # Find all courses in this term
-            course_sections = collapse_div.find_all('h4')
-            
-            for course_section in course_sections:
-                course_name = course_section.get_text(strip=True)
-                
-                # Find the table that follows this course header
-                table = course_section.find_next('table')
-                if not table:
-                    continue
-                    
-                course_data = {
-                    "course_name": course_name,
-                    "components": []
-                }
-                
-                # Process rows in the table
-                rows = table.find_all('tr')
-                for row in rows:
-                    cells = row.find_all('td')
-                    if len(cells) >= 3:  # Type, Marks, Weightage
-                        component_type = cells[0].get_text(strip=True)
-                        marks = cells[1].get_text(strip=True)
-                        weightage = cells[2].get_text(strip=True) if len(cells) > 2 else ""
-                        
-                        course_data["components"].append({
-                            "type": component_type,
-                            "marks": marks,
-                            "weightage": weightage
-                        })
-                
-                if course_data["components"]:
-                    term_data["courses"].append(course_data)
-            
-            if term_data["courses"]:
-                term_wise_marks.append(term_data)
-        
-        # If no term sections were found with the expected structure, try an alternative approach
-        if not term_wise_marks:
-            # Try to find term IDs directly
-            term_id_matches = re.findall(r'collapse(\d+)', html_content)
-            
-            for term_id in term_id_matches:
-                # Find all course sections for this term
-                term_section = soup.find('div', {'id': f'collapse{term_id}'})
-                
-                if not term_section:
-                    continue
-                    
-                term_data = {
-                    "term_id": term_id,
-                    "courses": []
-                }
-                
-                # Find all h4 elements (course headers) in this term section
-                course_headers = term_section.find_all('h4')
-                
-                for header in course_headers:
-                    course_name = header.get_text(strip=True)
-                    
-                    # Find the table that follows this course header
-                    table = header.find_next('table')
-                    if not table:
-                        continue
-                        
-                    course_data = {
-                        "course_name": course_name,
-                        "components": []
-                    }
-                    
-                    # Process rows in the table
-                    rows = table.find_all('tr')
-                    for row in rows:
-                        cells = row.find_all('td')
-                        if len(cells) >= 3:  # Type, Marks, Weightage
-                            component_type = cells[0].get_text(strip=True)
-                            marks = cells[1].get_text(strip=True)
-                            weightage = cells[2].get_text(strip=True) if len(cells) > 2 else ""
-                            
-                            course_data["components"].append({
-                                "type": component_type,
-                                "marks": marks,
-                                "weightage": weightage
-                            })
-                    
-                    if course_data["components"]:
-                        term_data["courses"].append(course_data)
-                
-                if term_data["courses"]:
-                    term_wise_marks.append(term_data)
-        
-        return term_wise_marks
-    
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching term-wise marks: {e}")
-        return []
-    except (KeyError, json.JSONDecodeError) as e:
-        print(f"Error parsing term-wise marks JSON: {e}")
-        return []
-    except Exception as e:
-        print(f"Unexpected error processing term-wise marks: {e}")
-        return []
 
+            components = table_components(tables[table_index])
+            if components:
+                courses.append({
+                    "course_name": h4s[h4_index].get_text(strip=True),
+                    "components": [dict(component) for component in components]
+                })
+        return courses
 
-def login_and_fetch_all_result(reg_no, password):
-    session = requests.Session()
-    # Disable SSL certificate verification
-    session.verify = False
+    term_wise_marks = []
 
-    # Step 1: Get Login Page
-    login_url = "https://ums.lpu.in/lpuums/"
-    response = session.get(login_url)
-    soup = BeautifulSoup(response.text, "html.parser")
+    for section in index["anchors"]:
+        # Extract term ID from the section header
+        term_id_match = re.search(r'Term Id : (\d+)', section.get_text(strip=True))
+        term_id = term_id_match.group(1) if term_id_match else "Unknown"
 
-    # Step 2: Prepare Login Payload
-    payload = {
-        "__EVENTTARGET": "",
-        "__EVENTARGUMENT": "",
-        "__LASTFOCUS": "",
-        "__VIEWSTATE": get_field(soup, "__VIEWSTATE"),
-        "__VIEWSTATEGENERATOR": get_field(soup, "__VIEWSTATEGENERATOR"),
-        "__EVENTVALIDATION": get_field(soup, "__EVENTVALIDATION"),
-        "txtU": reg_no,
-        "TxtpwdAutoId_8767": password,
-        "iBtnLogins150203125": "Login"
-    }
+        # The collapse div that contains the courses
+        collapse_id = section.get('data-target', '')
+        if not collapse_id:
+            continue
 
-    # Step 3: Login
-    post_response = session.post(login_url, data=payload)
-    post_soup = BeautifulSoup(post_response.text, "html.parser")
-    if post_soup.find("input", {"id": "TxtpwdAutoId_8767"}):
-        return {"error": "Login failed. Check credentials."}
+        courses = term_courses(collapse_id.replace('#', ''))
+        if courses:
+            term_wise_marks.append({"term_id": term_id, "courses": courses})
 
-    # Step 4: Fetch Student Info
-    student_info_url = "https://ums.lpu.in/lpuums/StudentDashboard.aspx/GetStudentBasicInformation"
-    headers = {
-        "Content-Type": "application/json; charset=UTF-8",
-        "X-Requested-With": "XMLHttpRequest"
-    }
-    info_response = session.post(student_info_url, headers=headers, data="{}")
+    # If no term sections were found with the expected structure, try the term IDs directly
+    if not term_wise_marks:
+        for term_id in re.findall(r'collapse(\d+)', html_content):
+            courses = term_courses(f'collapse{term_id}')
+            if courses:
+                term_wise_marks.append({"term_id": term_id, "courses": courses})
+
+    return term_wise_marks
+
+
+@timed("parse")
+def parse_student_basic_info(info_text):
     student_info = {}
     try:
-        info_json = info_response.json()
+        info_json = json.loads(info_text)
         student_list = info_json.get("d", [])
         if student_list and isinstance(student_list, list):
             student_info = {k: v for k, v in student_list[0].items()
                           if v not in [None, "", "null"] and k != "StudentPicture"}
     except:
         pass
+    return student_info
+
 
-    # Step 5: Get Result Page
-    result_url = "https://ums.lpu.in/lpuums/frmStudentResult.aspx"
-    result_response = session.get(result_url)
-    result_soup = BeautifulSoup(result_response.text, "html.parser")
+@timed("parse")
+def parse_result_page(page_html):
+    """
+    Extract term-wise TGPA and subject grades from the result page
+
+    Returns:
+        tuple: (termwise_tgpa, subject_grades)
+    """
+    result_soup = make_soup(page_html, NESTING_HTML_PARSER)
 
-    # Step 6: Term-wise TGPA
+    # Term-wise TGPA
     termwise_tgpa = []
     tds = result_soup.find_all("td", colspan="6")
     for td in tds:
@@ -503,7 +566,7 @@ def login_and_fetch_all_result(reg_no, password):
                     "tgpa": match.group(2)
                 })
 
-    # Step 7: Subject Grades
+    # Subject Grades
     subject_grades = []
     rows = result_soup.find_all("tr", {"class": ["rgRow", "rgAltRow"]})
     for row in rows:
@@ -520,17 +583,10 @@ def login_and_fetch_all_result(reg_no, password):
                 "grade": grade
             })
 
-    # Step 8: Fetch Additional Data
-    attendance = get_attendance(session)
-    messages = get_student_messages(session)
-    contact_info = get_student_contact(session)
-    announcements = get_announcement_details(session, reg_no)
-    assignments = get_assignments_data(session)
-    dashboard_url = "https://ums.lpu.in/lpuums/StudentDashboard.aspx"
-    attendance_summary = get_student_attendance_summary(session, dashboard_url)
-    term_wise_marks = get_term_wise_marks(session)
-
-    # Combine attendance data
+    return termwise_tgpa, subject_grades
+
+
+def combine_attendance(attendance, attendance_summary):
     summary_map = {item['course_name']: item for item in attendance_summary}
     combined_attendance = []
     for att_item in attendance:
@@ -556,25 +612,476 @@ def login_and_fetch_all_result(reg_no, password):
                 "delivered": "N/A",
                 "duty_leaves": "N/A"
             })
+    return combined_attendance
 
-    # Final Output
-    output = {
-        "student_info": student_info,
-        "termwise_tgpa": termwise_tgpa,
-        "subject_grades": subject_grades,
-        "attendance": combined_attendance,
-        "student_messages": messages,
-        "contact_info": contact_info,
-        "announcements": announcements,
-        "assignments": assignments,
-        "term_wise_marks": term_wise_marks
-    }
+
+# Output sections of login_and_fetch_all_result -> fetchers they need
+SECTION_FETCHERS = {
+    "student_info": ("student_info",),
+    "termwise_tgpa": ("result_page",),
+    "subject_grades": ("result_page",),
+    "attendance": ("attendance", "attendance_summary"),
+    "student_messages": ("student_messages",),
+    "contact_info": ("contact_info",),
+    "announcements": ("announcements",),
+    "assignments": ("assignments",),
+    "term_wise_marks": ("term_wise_marks",),
+}
+SECTIONS = tuple(SECTION_FETCHERS)
+
+
+def resolve_sections(sections=None):
+    """
+    Validate requested output sections and work out which fetchers they need
+
+    Args:
+        sections: Iterable of names from SECTIONS, or None for all of them
+
+    Returns:
+        tuple: (sections, fetcher names) as lists in canonical order
+
+    Raises:
+        ValueError: If an unknown section is requested
+    """
+    if sections is None:
+        sections = SECTIONS
+    unknown = [name for name in sections if name not in SECTION_FETCHERS]
+    if unknown:
+        raise ValueError(f"Unknown section(s): {', '.join(unknown)}")
+
+    requested = [name for name in SECTIONS if name in sections]
+    fetchers = []
+    for name in requested:
+        for fetcher in SECTION_FETCHERS[name]:
+            if fetcher not in fetchers:
+                fetchers.append(fetcher)
+    return requested, fetchers
+
+
+def build_output(data, sections=None):
+    """Assemble the result dict for the requested sections from the fetched data"""
+    requested, _ = resolve_sections(sections)
+    output = {}
+    for name in requested:
+        if name == "termwise_tgpa":
+            output[name] = data["result_page"][0]
+        elif name == "subject_grades":
+            output[name] = data["result_page"][1]
+        elif name == "attendance":
+            output[name] = combine_attendance(data["attendance"], data["attendance_summary"])
+        else:
+            output[name] = data[name]
     return output
 
+
+# ---------------------------------------------------------------------------
+# Blocking fetchers (requests.Session)
+# ---------------------------------------------------------------------------
+
+def get_assignments_data(session):
+    try:
+        headers = {
+            "User-Agent": "Mozilla/5.0",
+            "Referer": ASSIGNMENT_URL
+        }
+
+        # Get assignment page
+        response = session.get(ASSIGNMENT_URL, headers=headers)
+        view_all_data = build_view_all_payload(response.text)
+
+        # Submit the "View All" post request
+        response = session.post(ASSIGNMENT_URL, data=view_all_data, headers=headers)
+        return parse_assignments(response.text)
+
+    except Exception as e:
+        print(f"[Assignment error]: {e}")
+        record_fetch_error(e)
+        return []
+
+
+def get_attendance(session):
+    url = DASHBOARD_URL + "/GetStudentCourses"
+    response = session.post(url, headers=AJAX_HEADERS, data="{}")
+    html_content = json.loads(response.text)['d']
+    return parse_attendance(html_content)
+
+
+def get_student_messages(session):
+    url = DASHBOARD_URL + "/GetStudentMessages"
+    response = session.post(url, headers=AJAX_HEADERS, data="{}")
+    html_content = json.loads(response.text)['d']
+    return parse_student_messages(html_content)
+
+
+def get_student_contact(session):
+    url = DASHBOARD_URL + "/GetStudentContactNo"
+    response = session.post(url, headers=AJAX_HEADERS, data="{}")
+    contact_data = json.loads(response.text)['d']
+    return parse_student_contact(contact_data)
+
+
+def get_announcement_details(session, reg_no):
+    url = DASHBOARD_URL + "/AnnouncementDetails"
+    headers = {
+        **AJAX_HEADERS,
+        "Origin": UMS_ORIGIN
+    }
+    payload = {
+        "LoginId": reg_no,
+        "Type": "S"
+    }
+
+    try:
+        response = session.post(url, headers=headers, json=payload)
+        if response.status_code != 200:
+            print("Failed to fetch announcements.")
+            record_fetch_error(f"AnnouncementDetails returned HTTP {response.status_code}")
+            return []
+
+        data = response.json()
+        return parse_announcements(data.get("d", []))
+
+    except Exception as e:
+        print("Error while parsing announcements:", str(e))
+        record_fetch_error(e)
+        return []
+
+
+def get_student_attendance_summary(session, dashboard_url, visit_dashboard=False):
+    """
+    Fetch the per-course attendance summary
+
+    Args:
+        session: Logged-in requests.Session
+        dashboard_url: Dashboard URL, sent as the Referer
+        visit_dashboard: GET the dashboard page first, like a browser would.
+            The page is not needed to read the summary, so this is off by default.
+    """
+    headers = {
+        "Content-Type": "application/json; charset=UTF-8",
+        "X-Requested-With": "XMLHttpRequest",
+        "Referer": dashboard_url
+    }
+
+    try:
+        if visit_dashboard:
+            session.get(dashboard_url, headers={"Referer": dashboard_url})
+
+        summary_url = DASHBOARD_URL + "/StudentAttendanceSummary"
+        response = session.post(summary_url, headers=headers, data="{}")
+        response.raise_for_status()
+
+        html_content = response.json()['d']
+        return parse_attendance_summary(html_content)
+    except requests.exceptions.RequestException as e:
+        print(f"Error fetching attendance summary: {e}")
+        record_fetch_error(e)
+        return []
+    except (KeyError, json.JSONDecodeError) as e:
+        print(f"Error parsing attendance summary JSON: {e}")
+        record_fetch_error(e)
+        return []
+
+
+def get_term_wise_marks(session):
+    """
+    Extract term-wise marks by simulating the iconsminds-information button click
+    and processing the returned HTML content
+    """
+    url = DASHBOARD_URL + "/TermWiseMarks"
+
+    try:
+        response = session.post(url, headers=AJAX_HEADERS, data="{}")
+        response.raise_for_status()
+
+        # Parse the JSON response
+        json_data = response.json()
+        html_content = json_data.get('d', '')
+        return parse_term_wise_marks(html_content)
+
+    except requests.exceptions.RequestException as e:
+        print(f"Error fetching term-wise marks: {e}")
+        record_fetch_error(e)
+        return []
+    except (KeyError, json.JSONDecodeError) as e:
+        print(f"Error parsing term-wise marks JSON: {e}")
+        record_fetch_error(e)
+        return []
+    except Exception as e:
+        print(f"Unexpected error processing term-wise marks: {e}")
+        record_fetch_error(e)
+        return []
+
+
+def get_student_basic_info(session):
+    url = DASHBOARD_URL + "/GetStudentBasicInformation"
+    headers = {
+        "Content-Type": "application/json; charset=UTF-8",
+        "X-Requested-With": "XMLHttpRequest"
+    }
+    info_response = session.post(url, headers=headers, data="{}")
+    return parse_student_basic_info(info_response.text)
+
+
+def get_result_data(session):
+    """
+    Fetch the result page and extract term-wise TGPA and subject grades
+
+    Returns:
+        tuple: (termwise_tgpa, subject_grades)
+    """
+    result_response = session.get(RESULT_URL)
+    return parse_result_page(result_response.text)
+
+
+def get_section_fetchers(reg_no):
+    """
+    Map each post-login section to the call that fetches it.
+
+    Every entry is independent of the others and can run on its own thread;
+    calls that must happen in order (e.g. the assignments GET followed by the
+    "View All" postback) live inside a single fetcher.
+    """
+    return {
+        "student_info": get_student_basic_info,
+        "result_page": get_result_data,
+        "attendance": get_attendance,
+        "student_messages": get_student_messages,
+        "contact_info": get_student_contact,
+        "announcements": lambda session: get_announcement_details(session, reg_no),
+        "assignments": get_assignments_data,
+        "attendance_summary": lambda session: get_student_attendance_summary(session, DASHBOARD_URL),
+        "term_wise_marks": get_term_wise_marks,
+    }
+
+
+def iter_fetchers(session, reg_no, max_workers=None, names=None):
+    """
+    Run the section fetchers for an authenticated session, yielding each
+    result as soon as it is ready
+
+    Args:
+        session: Logged-in requests.Session (its cookie jar is shared by all workers)
+        reg_no: Student registration number
+        max_workers: Maximum number of parallel UMS requests; defaults to
+            MAX_PARALLEL_FETCHES. Use 1 to fetch strictly one after another.
+        names: Fetcher names to run (see SECTION_FETCHERS); all when None
+
+    Yields:
+        tuple: (fetcher name, fetched data) in completion order
+    """
+    fetchers = {name: fetch for name, fetch in get_section_fetchers(reg_no).items()
+                if names is None or name in names}
+    if max_workers is None:
+        max_workers = MAX_PARALLEL_FETCHES
+    max_workers = max(1, min(max_workers, len(fetchers) or 1))
+
+    def run(name, fetch):
+        with stage("ums_fetch", name):
+            return fetch(session)
+
+    if max_workers == 1:
+        for name, fetch in fetchers.items():
+            yield name, run(name, fetch)
+        return
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        # Workers inherit the request's context so their timings count towards it
+        futures = {submit_in_context(executor, run, name, fetch): name for name, fetch in fetchers.items()}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        # If the consumer stops early, don't start fetches nobody will read
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def fetch_sections(session, reg_no, max_workers=None, names=None):
+    """
+    Run the section fetchers for an authenticated session
+
+    Returns:
+        dict: Fetcher name -> fetched data (see iter_fetchers for the arguments)
+    """
+    return dict(iter_fetchers(session, reg_no, max_workers=max_workers, names=names))
+
+
+def credentials_digest(reg_no, password):
+    return hashlib.sha256(f"{reg_no}:{password}".encode("utf-8")).hexdigest()
+
+
+def get_cached_session(reg_no, password):
+    """
+    Return the cached authenticated session for a student, if any
+
+    The session is only handed out when the password matches the one it was
+    opened with, so a wrong password never rides on someone else's login.
+    """
+    entry = SESSION_CACHE.get(reg_no)
+    if entry is None:
+        return None
+    digest, session = entry
+    if not hmac.compare_digest(digest, credentials_digest(reg_no, password)):
+        return None
+    return session
+
+
+def cache_session(reg_no, password, session):
+    SESSION_CACHE.set(reg_no, (credentials_digest(reg_no, password), session))
+
+
+def invalidate_session(reg_no):
+    SESSION_CACHE.pop(reg_no)
+
+
+def is_login_redirect(response):
+    """Return True if UMS answered a data call with the login form (session expired)"""
+    text = response.text
+    if text.lstrip().startswith("{"):
+        return False
+    return "TxtpwdAutoId_8767" in text
+
+
+def watch_for_expiry(session):
+    """
+    Flag the session as expired as soon as any response is the login form
+
+    The check runs as a response hook, so a cached session is validated by
+    the data calls themselves and a live one costs no extra request.
+    """
+    session.ums_expired = False
+
+    def check_response(response, *args, **kwargs):
+        if is_login_redirect(response):
+            session.ums_expired = True
+
+    session.hooks["response"].append(check_response)
+
+
+@timed("ums_login")
+def login(reg_no, password):
+    """
+    Log in to UMS with a fresh session
+
+    Returns:
+        requests.Session or None if the credentials were rejected
+    """
+    session = new_session()
+
+    # Step 1: Get Login Page
+    response = session.get(LOGIN_URL)
+
+    # Step 2: Prepare Login Payload
+    payload = build_login_payload(response.text, reg_no, password)
+
+    # Step 3: Login
+    post_response = session.post(LOGIN_URL, data=payload)
+    if is_login_form(post_response.text):
+        return None
+
+    watch_for_expiry(session)
+    return session
+
+
+def iter_fetched(reg_no, password, fetcher_names, max_workers=None):
+    """
+    Log in (or reuse a cached session) and yield fetcher results as they complete
+
+    If UMS bounces a cached session back to the login form, the session is
+    dropped, a fresh login is made and only the fetchers that have not yet
+    produced a result are run again.
+
+    Yields:
+        tuple: (fetcher name, fetched data), or ("error", message) once if
+            the credentials were rejected
+    """
+    pending = list(fetcher_names)
+
+    session = get_cached_session(reg_no, password)
+    if session is not None:
+        try:
+            for name, value in iter_fetchers(session, reg_no, max_workers=max_workers, names=pending):
+                if session.ums_expired:
+                    break
+                pending.remove(name)
+                yield name, value
+        except Exception:
+            if not session.ums_expired:
+                raise
+        if not session.ums_expired:
+            return
+        # UMS bounced us to the login form: drop the session and log in again
+        invalidate_session(reg_no)
+
+    session = login(reg_no, password)
+    if session is None:
+        yield "error", "Login failed. Check credentials."
+        return
+    cache_session(reg_no, password, session)
+
+    yield from iter_fetchers(session, reg_no, max_workers=max_workers, names=pending)
+
+
+def iter_sections(reg_no, password, max_workers=None, sections=None):
+    """
+    Scrape the student's data, yielding each output section as soon as every
+    fetch it depends on has completed
+
+    Args:
+        reg_no: Student registration number
+        password: UMS password
+        max_workers: Maximum number of parallel UMS requests
+        sections: Output sections to fetch (see SECTIONS); all when None
+
+    Yields:
+        tuple: (section name, data), or ("error", message) once if the
+            credentials were rejected
+    """
+    requested, fetcher_names = resolve_sections(sections)
+    remaining = list(requested)
+    fetched = {}
+
+    for name, value in iter_fetched(reg_no, password, fetcher_names, max_workers=max_workers):
+        if name == "error":
+            yield name, value
+            return
+        fetched[name] = value
+
+        ready = [section for section in remaining
+                 if all(fetcher in fetched for fetcher in SECTION_FETCHERS[section])]
+        for section in ready:
+            remaining.remove(section)
+            yield section, build_output(fetched, [section])[section]
+
+
+def login_and_fetch_all_result(reg_no, password, max_workers=None, sections=None):
+    """
+    Log in to UMS (or reuse a cached session) and scrape the student's data
+
+    Args:
+        reg_no: Student registration number
+        password: UMS password
+        max_workers: Maximum number of parallel UMS requests
+        sections: Output sections to fetch (see SECTIONS); all when None
+
+    Returns:
+        dict: Section name -> data, or {"error": ...} if the login was rejected
+    """
+    requested, _ = resolve_sections(sections)
+
+    output = {}
+    for name, value in iter_sections(reg_no, password, max_workers=max_workers, sections=requested):
+        if name == "error":
+            return {"error": value}
+        output[name] = value
+
+    # Final Output, in the usual section order
+    return {name: output[name] for name in requested}
+
 # This section is commented out to allow the server to use the function directly
 # If you want to test this script directly, uncomment the following lines:
 
 # reg_no = input("Enter your registration number: ")
 # password = input("Enter your password: ")
 # result = login_and_fetch_all_result(reg_no, password)
-# print(json.dumps(result, indent=4, ensure_ascii=False))
\ No newline at end of file
+# print(json.dumps(result, indent=4, ensure_ascii=False))
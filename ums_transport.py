@@ -0,0 +1,124 @@
+"""
+Process-wide HTTP transport for ums.lpu.in.
+
+Every per-student requests.Session mounts the same PooledAdapter, so TCP/TLS
+connections to UMS are kept alive and reused across logins while each
+session keeps its own cookie jar.
+"""
+import os
+import socket
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+from metrics import stage
+
+# Number of hosts to keep pools for and connections kept per host
+POOL_CONNECTIONS = int(os.environ.get("UMS_POOL_CONNECTIONS", "4"))
+POOL_MAXSIZE = int(os.environ.get("UMS_POOL_MAXSIZE", "32"))
+# Block instead of opening throwaway connections once a pool is exhausted
+POOL_BLOCK = os.environ.get("UMS_POOL_BLOCK", "false").lower() == "true"
+# Enable TCP keep-alive probes on pooled sockets so idle connections survive NAT/LB timeouts
+TCP_KEEPALIVE = os.environ.get("UMS_TCP_KEEPALIVE", "true").lower() == "true"
+# Per-request (connect, read) timeouts in seconds, used when the caller sets none
+CONNECT_TIMEOUT = float(os.environ.get("UMS_CONNECT_TIMEOUT", "10"))
+READ_TIMEOUT = float(os.environ.get("UMS_READ_TIMEOUT", "30"))
+
+
+class PooledAdapter(HTTPAdapter):
+    """
+    HTTPAdapter meant to be shared by many sessions
+
+    Adds a default timeout and TCP keep-alive, and ignores close() from
+    individual sessions so one student's session cannot tear down the
+    shared pool.
+    """
+
+    def __init__(self, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), tcp_keepalive=TCP_KEEPALIVE, **kwargs):
+        self.timeout = timeout
+        self.tcp_keepalive = tcp_keepalive
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        if self.tcp_keepalive:
+            pool_kwargs["socket_options"] = HTTPConnection.default_socket_options + [
+                (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            ]
+        super().init_poolmanager(connections, maxsize, block=block, **pool_kwargs)
+
+    def send(self, request, timeout=None, stream=False, **kwargs):
+        if timeout is None:
+            timeout = self.timeout
+        # Label by page or WebMethod name, e.g. "GetStudentCourses"
+        endpoint = request.path_url.split("?", 1)[0].rstrip("/").rsplit("/", 1)[-1] or "/"
+        with stage("ums_request", endpoint):
+            response = super().send(request, timeout=timeout, stream=stream, **kwargs)
+            if not stream:
+                # Read the body here so the timing covers the whole download
+                response.content
+        return response
+
+    def close(self):
+        # Sessions come and go; the shared pool lives for the whole process
+        pass
+
+    def close_pool(self):
+        super().close()
+
+    def stats(self):
+        """
+        Returns:
+            dict: Connections opened (misses), requests served on reused
+                connections (hits) and the number of host pools
+        """
+        requests_made = 0
+        connections_opened = 0
+        pools = self.poolmanager.pools
+        pool_list = [pool for pool in (pools.get(key) for key in pools.keys()) if pool is not None]
+        for pool in pool_list:
+            requests_made += pool.num_requests
+            connections_opened += pool.num_connections
+        return {
+            "pools": len(pool_list),
+            "requests": requests_made,
+            "hits": requests_made - connections_opened,
+            "misses": connections_opened,
+            "pool_maxsize": self._pool_maxsize,
+        }
+
+
+_adapter = None
+_adapter_lock = threading.Lock()
+
+
+def get_adapter():
+    """Return the process-wide adapter, creating it on first use"""
+    global _adapter
+    with _adapter_lock:
+        if _adapter is None:
+            _adapter = PooledAdapter(pool_connections=POOL_CONNECTIONS,
+                                     pool_maxsize=POOL_MAXSIZE,
+                                     pool_block=POOL_BLOCK)
+        return _adapter
+
+
+def new_session():
+    """
+    Create a requests.Session with its own cookie jar on the shared pool
+
+    Returns:
+        requests.Session: SSL verification is disabled, as UMS requires
+    """
+    session = requests.Session()
+    adapter = get_adapter()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    # Disable SSL certificate verification
+    session.verify = False
+    return session
+
+
+def get_pool_stats():
+    return get_adapter().stats()
@@ -0,0 +1,264 @@
+"""
+Circuit breaker and adaptive concurrency limiter for the UMS upstream.
+
+UMS_GUARD wraps every scrape. While ums.lpu.in is failing, the breaker opens
+and calls fail fast with UpstreamUnavailable, so callers can serve the
+Supabase snapshot instead of tying up workers. The limiter caps the number
+of concurrent scrapes and adapts that cap to the observed latency.
+
+Some fetchers handle their own errors and return no data, so one missing
+section does not fail the whole scrape. They report those errors with
+record_fetch_error(), and a scrape that had any counts as a failure.
+"""
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Circuit breaker
+FAILURE_RATE_THRESHOLD = float(os.environ.get("UMS_BREAKER_FAILURE_RATE", "0.5"))
+MIN_REQUESTS = int(os.environ.get("UMS_BREAKER_MIN_REQUESTS", "10"))
+WINDOW_SECONDS = float(os.environ.get("UMS_BREAKER_WINDOW", "60"))
+OPEN_SECONDS = float(os.environ.get("UMS_BREAKER_OPEN_SECONDS", "30"))
+HALF_OPEN_PROBES = int(os.environ.get("UMS_BREAKER_HALF_OPEN_PROBES", "2"))
+
+# Adaptive concurrency limit
+INITIAL_LIMIT = int(os.environ.get("UMS_CONCURRENCY_INITIAL", "16"))
+MIN_LIMIT = int(os.environ.get("UMS_CONCURRENCY_MIN", "2"))
+MAX_LIMIT = int(os.environ.get("UMS_CONCURRENCY_MAX", "64"))
+TARGET_LATENCY = float(os.environ.get("UMS_TARGET_LATENCY", "8"))
+QUEUE_TIMEOUT = float(os.environ.get("UMS_QUEUE_TIMEOUT", "2"))
+
+# Errors fetchers handled themselves during the current guarded scrape
+_fetch_errors = contextvars.ContextVar("ums_fetch_errors", default=None)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class UpstreamUnavailable(Exception):
+    """Raised instead of calling UMS when the breaker is open or the limiter is full"""
+
+
+def record_fetch_error(error):
+    """
+    Count an upstream error a fetcher caught (timeout, connection error, bad
+    response) against the guarded scrape it ran in, if any
+    """
+    errors = _fetch_errors.get()
+    if errors is not None:
+        errors.append(error)
+
+
+class CircuitBreaker:
+    """
+    Opens when the failure rate over the last WINDOW_SECONDS reaches the
+    threshold (with at least MIN_REQUESTS calls), stays open for
+    OPEN_SECONDS, then lets a few probe calls through (half-open) and closes
+    again once one of them succeeds.
+    """
+
+    def __init__(self, failure_rate_threshold=FAILURE_RATE_THRESHOLD, min_requests=MIN_REQUESTS,
+                 window_seconds=WINDOW_SECONDS, open_seconds=OPEN_SECONDS,
+                 half_open_probes=HALF_OPEN_PROBES):
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_requests = min_requests
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._outcomes = deque()
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    def _trim(self, now):
+        while self._outcomes and self._outcomes[0][0] < now - self.window_seconds:
+            self._outcomes.popleft()
+
+    def _open(self, now):
+        self.state = OPEN
+        self.opened_at = now
+        self.times_opened += 1
+        self._outcomes.clear()
+        self._probes = 0
+
+    def allow(self):
+        """Return True if a call may go to UMS now"""
+        now = time.monotonic()
+        with self._lock:
+            if self.state == OPEN and now - self.opened_at >= self.open_seconds:
+                self.state = HALF_OPEN
+                self._probes = 0
+            if self.state == HALF_OPEN:
+                if self._probes < self.half_open_probes:
+                    self._probes += 1
+                    return True
+            elif self.state == CLOSED:
+                return True
+            self.rejected += 1
+            return False
+
+    def cancel_probe(self):
+        """Give back a half-open probe slot taken by allow() for a call that never ran"""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def record(self, success):
+        now = time.monotonic()
+        with self._lock:
+            if self.state == HALF_OPEN:
+                if success:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._open(now)
+                return
+            if self.state == OPEN:
+                return
+
+            self._outcomes.append((now, success))
+            self._trim(now)
+            total = len(self._outcomes)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            if total >= self.min_requests and failures / total >= self.failure_rate_threshold:
+                self._open(now)
+
+    def snapshot(self):
+        with self._lock:
+            self._trim(time.monotonic())
+            total = len(self._outcomes)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            return {
+                "state": self.state,
+                "failure_rate": failures / total if total else 0.0,
+                "window_requests": total,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit that follows UMS latency (AIMD)
+
+    Each call that finishes under TARGET_LATENCY nudges the limit up by
+    1/limit; a slow or failed call cuts it by 30%, at most once per target
+    interval so one burst of slow calls does not collapse it to the minimum.
+    """
+
+    def __init__(self, initial_limit=INITIAL_LIMIT, min_limit=MIN_LIMIT, max_limit=MAX_LIMIT,
+                 target_latency=TARGET_LATENCY):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.in_flight = 0
+        self.rejected = 0
+        self.latency_ewma = 0.0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout=QUEUE_TIMEOUT):
+        """Wait up to timeout seconds for a slot; return False if none freed up"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.rejected += 1
+                    return False
+                self._condition.wait(remaining)
+            self.in_flight += 1
+            return True
+
+    def release(self, latency=None, success=True):
+        now = time.monotonic()
+        with self._condition:
+            self.in_flight -= 1
+            if latency is not None:
+                self.latency_ewma = latency if not self.latency_ewma else 0.8 * self.latency_ewma + 0.2 * latency
+                if success and latency <= self.target_latency:
+                    self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+                elif now - self._last_decrease >= self.target_latency:
+                    self.limit = max(self.min_limit, self.limit * 0.7)
+                    self._last_decrease = now
+            self._condition.notify()
+
+    def snapshot(self):
+        with self._condition:
+            return {
+                "limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "rejected": self.rejected,
+                "latency_ewma": round(self.latency_ewma, 3),
+                "target_latency": self.target_latency,
+            }
+
+
+class UpstreamGuard:
+    def __init__(self, breaker=None, limiter=None, queue_timeout=QUEUE_TIMEOUT):
+        self.breaker = breaker or CircuitBreaker()
+        self.limiter = limiter or AdaptiveLimiter()
+        self.queue_timeout = queue_timeout
+
+    @contextmanager
+    def guarded(self):
+        """
+        Context manager around one UMS scrape
+
+        The scrape fails if it raises or if a fetcher inside it called
+        record_fetch_error().
+
+        Raises:
+            UpstreamUnavailable: On entry, if the breaker is open or no
+                concurrency slot frees up within queue_timeout
+        """
+        if not self.breaker.allow():
+            raise UpstreamUnavailable("UMS circuit breaker is open")
+        if not self.limiter.acquire(self.queue_timeout):
+            self.breaker.cancel_probe()
+            raise UpstreamUnavailable("Too many concurrent UMS requests")
+
+        start = time.monotonic()
+        outcome = None
+        # Fetchers on worker threads run in a copy of this context and share the list
+        errors = []
+        previous_errors = _fetch_errors.get()
+        _fetch_errors.set(errors)
+        try:
+            yield
+            outcome = not errors
+        except Exception:
+            outcome = False
+            raise
+        finally:
+            _fetch_errors.set(previous_errors)
+            latency = time.monotonic() - start
+            if outcome is None:
+                # Abandoned (e.g. a streaming client went away): free the slot,
+                # and the half-open probe slot so the breaker can still close
+                self.limiter.release()
+                self.breaker.cancel_probe()
+            else:
+                self.limiter.release(latency, outcome)
+                self.breaker.record(outcome)
+
+    def call(self, fn, *args, **kwargs):
+        with self.guarded():
+            return fn(*args, **kwargs)
+
+    def snapshot(self):
+        return {
+            "breaker": self.breaker.snapshot(),
+            "limiter": self.limiter.snapshot(),
+        }
+
+
+UMS_GUARD = UpstreamGuard()
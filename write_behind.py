@@ -0,0 +1,298 @@
+"""
+Write-behind queue for database writes that do not need to finish before the
+response is sent, such as saving a student's record after a login.
+
+Writes are keyed (by registration number for student records). A write
+submitted while an earlier one for the same key is still waiting replaces
+it, so a burst of logins by one student costs one database write. The queue
+holds at most max_pending keys; when it is full, submit() waits up to
+put_timeout for room and then does the write itself, which slows producers
+down instead of dropping writes. Queued writes are flushed at interpreter
+exit.
+
+A queue can also hold writes back for a short delay to gather more of them
+per key, and merge them instead of keeping only the latest (read receipts).
+
+GroupCommit covers writes the caller has to wait for, such as message
+inserts: writes arriving while one is in progress are done together in one
+multi-row write as soon as it finishes.
+"""
+import atexit
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import REGISTRY
+
+WRITE_BEHIND_MAX_PENDING = int(os.environ.get("WRITE_BEHIND_MAX_PENDING", "1000"))
+WRITE_BEHIND_WORKERS = int(os.environ.get("WRITE_BEHIND_WORKERS", "2"))
+# Seconds submit() waits for room in a full queue before writing inline
+WRITE_BEHIND_PUT_TIMEOUT = float(os.environ.get("WRITE_BEHIND_PUT_TIMEOUT", "1"))
+# Seconds the exit handler waits for queued writes
+WRITE_BEHIND_FLUSH_TIMEOUT = float(os.environ.get("WRITE_BEHIND_FLUSH_TIMEOUT", "10"))
+
+
+class WriteBehindQueue:
+    """
+    Args:
+        write: Callable doing one write; called with the args given to submit()
+        name: Label for the queue's metrics and worker threads
+        delay: Seconds a write waits in the queue before a worker takes it
+        merge: Callable (queued args, new args) -> args used when a write is
+            submitted for a queued key; by default the new args replace the old
+    """
+
+    def __init__(self, write, name="write-behind", max_pending=WRITE_BEHIND_MAX_PENDING,
+                 workers=WRITE_BEHIND_WORKERS, put_timeout=WRITE_BEHIND_PUT_TIMEOUT, delay=0, merge=None):
+        self.write = write
+        self.name = name
+        self.max_pending = max_pending
+        self.workers = workers
+        self.put_timeout = put_timeout
+        self.delay = delay
+        self.merge = merge
+        # key -> (args, submitted at); oldest first
+        self._pending = OrderedDict()
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._threads = []
+        self._closed = False
+        # Number of flush() calls waiting; while any are, delayed writes are due at once
+        self._flushing = 0
+        self._counts = {"submitted": 0, "coalesced": 0, "written": 0, "failed": 0, "inline": 0}
+        self._wait_histogram = REGISTRY.histogram(
+            "write_behind_wait_seconds", {"queue": name},
+            "Time writes spent queued before a worker started them")
+        self._write_histogram = REGISTRY.histogram(
+            "write_behind_write_seconds", {"queue": name},
+            "Duration of write-behind writes")
+        REGISTRY.gauge("write_behind_pending", {"queue": name}, lambda: len(self._pending),
+                       "Writes waiting in the write-behind queue")
+
+    def submit(self, key, *args):
+        """
+        Queue a write, replacing any queued write for the same key
+
+        Writes inline when the queue is closed or stays full for put_timeout.
+        """
+        with self._lock:
+            if not self._closed:
+                self._start_workers()
+                self._counts["submitted"] += 1
+                if key in self._pending:
+                    # Keep the queue position (and wait time) of the first write
+                    queued_args, submitted_at = self._pending[key]
+                    if self.merge is not None:
+                        args = self.merge(queued_args, args)
+                    self._pending[key] = (args, submitted_at)
+                    self._counts["coalesced"] += 1
+                    return
+
+                deadline = time.monotonic() + self.put_timeout
+                while len(self._pending) >= self.max_pending and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._changed.wait(remaining)
+
+                if len(self._pending) < self.max_pending and not self._closed:
+                    self._pending[key] = (args, time.monotonic())
+                    self._changed.notify_all()
+                    return
+            self._counts["inline"] += 1
+
+        self._run(args)
+
+    def _start_workers(self):
+        # Started on first use so that a forking server starts them in each worker process
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"{self.name}-{len(self._threads)}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _next(self):
+        """
+        Returns:
+            tuple: (oldest queued key that is due and not being written, or
+                None; seconds until that key is due, or None)
+        """
+        now = time.monotonic()
+        for key, (_, submitted_at) in self._pending.items():
+            if key in self._in_flight:
+                continue
+            wait = submitted_at + self.delay - now
+            if wait <= 0 or self._flushing:
+                return key, None
+            # Later keys were queued later, so none of them is due either
+            return None, wait
+        return None, None
+
+    def _work(self):
+        while True:
+            with self._lock:
+                key, wait = self._next()
+                while key is None:
+                    if self._closed and not self._pending:
+                        return
+                    self._changed.wait(wait)
+                    key, wait = self._next()
+                args, submitted_at = self._pending.pop(key)
+                self._in_flight.add(key)
+                self._changed.notify_all()
+
+            self._wait_histogram.observe(time.monotonic() - submitted_at)
+            try:
+                self._run(args)
+            finally:
+                with self._lock:
+                    self._in_flight.discard(key)
+                    self._changed.notify_all()
+
+    def _run(self, args):
+        start = time.perf_counter()
+        try:
+            self.write(*args)
+            outcome = "written"
+        except Exception as e:
+            print(f"{self.name} write failed: {str(e)}")
+            outcome = "failed"
+        self._write_histogram.observe(time.perf_counter() - start)
+        with self._lock:
+            self._counts[outcome] += 1
+
+    def flush(self, timeout=None):
+        """
+        Wait until every queued write has finished
+
+        Returns:
+            bool: False if writes were still queued or running at the timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            self._flushing += 1
+            self._changed.notify_all()
+            try:
+                while self._pending or self._in_flight:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._changed.wait(remaining)
+                return True
+            finally:
+                self._flushing -= 1
+
+    def close(self, timeout=WRITE_BEHIND_FLUSH_TIMEOUT):
+        """Flush queued writes and stop the workers; later writes run inline"""
+        flushed = self.flush(timeout)
+        with self._lock:
+            self._closed = True
+            self._changed.notify_all()
+            if not flushed:
+                print(f"{self.name}: {len(self._pending)} writes still queued at shutdown")
+        return flushed
+
+    def stats(self):
+        with self._lock:
+            _, wait_total, wait_count = self._wait_histogram.snapshot()
+            _, write_total, write_count = self._write_histogram.snapshot()
+            return {
+                "pending": len(self._pending),
+                "in_flight": len(self._in_flight),
+                "max_pending": self.max_pending,
+                **self._counts,
+                "avg_wait_ms": round(wait_total / wait_count * 1000, 1) if wait_count else None,
+                "avg_write_ms": round(write_total / write_count * 1000, 1) if write_count else None,
+            }
+
+
+def create_queue(write, name="write-behind", **kwargs):
+    """Create a queue that is flushed when the interpreter exits"""
+    queue = WriteBehindQueue(write, name=name, **kwargs)
+    atexit.register(queue.close)
+    return queue
+
+
+class GroupCommit:
+    """
+    Batch concurrent writes the caller waits for into multi-row writes
+
+    One batch is written at a time. The first write to arrive goes out on its
+    own straight away; writes arriving meanwhile are collected (up to
+    max_batch per batch) and written together when it finishes, so a burst
+    costs a few round trips instead of one per write, and a lone write is not
+    delayed at all.
+
+    Args:
+        write_batch: Callable taking a list of items, writing them and
+            returning a list with one result per item
+        name: Label for the stats
+    """
+
+    def __init__(self, write_batch, name="group-commit", max_batch=100):
+        self.write_batch = write_batch
+        self.name = name
+        self.max_batch = max_batch
+        # Batch new items join, or None
+        self._open = None
+        self._writing = False
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._counts = {"items": 0, "batches": 0, "largest_batch": 0}
+
+    def submit(self, item):
+        """
+        Write item as part of the next batch
+
+        Returns:
+            The result write_batch gave for item
+
+        Raises:
+            Exception: Whatever write_batch raised for the item's batch
+        """
+        with self._lock:
+            batch = self._open
+            if batch is None:
+                batch = self._open = {"items": [], "results": None, "error": None, "done": False}
+            index = len(batch["items"])
+            batch["items"].append(item)
+            if len(batch["items"]) >= self.max_batch:
+                self._open = None
+
+            while self._writing and not batch["done"]:
+                self._changed.wait()
+            if not batch["done"]:
+                # This thread writes the batch for everyone in it
+                if self._open is batch:
+                    self._open = None
+                self._writing = True
+                leader = True
+            else:
+                leader = False
+
+        if leader:
+            try:
+                batch["results"] = self.write_batch(batch["items"])
+            except Exception as e:
+                batch["error"] = e
+            finally:
+                with self._lock:
+                    batch["done"] = True
+                    self._writing = False
+                    self._counts["items"] += len(batch["items"])
+                    self._counts["batches"] += 1
+                    self._counts["largest_batch"] = max(self._counts["largest_batch"], len(batch["items"]))
+                    self._changed.notify_all()
+
+        if batch["error"] is not None:
+            raise batch["error"]
+        return batch["results"][index]
+
+    def stats(self):
+        with self._lock:
+            batches = self._counts["batches"]
+            return {
+                **self._counts,
+                "avg_batch": round(self._counts["items"] / batches, 2) if batches else None,
+            }